@@ -0,0 +1,130 @@
+"""
+Adaptive Quality Controller
+Honors performance.target_fps / max_latency_ms / adaptive_quality from
+ai_config.json. Measures end-to-end latency (capture -> published result)
+and inference time per frame, and steps through quality levels:
+
+    lower inference input size -> pause face/ALPR enrichment -> skip frames
+
+When there is headroom again it steps back up, one level at a time.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+
+class AdaptiveQualityController:
+    """
+    Feedback controller with hysteresis.
+    Level 0 is full quality; higher levels are cheaper.
+    """
+
+    LEVELS = [
+        {"imgsz": 640, "enrichment": True, "frame_stride": 1},
+        {"imgsz": 512, "enrichment": True, "frame_stride": 1},
+        {"imgsz": 416, "enrichment": True, "frame_stride": 1},
+        {"imgsz": 416, "enrichment": False, "frame_stride": 1},
+        {"imgsz": 320, "enrichment": False, "frame_stride": 1},
+        {"imgsz": 320, "enrichment": False, "frame_stride": 2},
+        {"imgsz": 320, "enrichment": False, "frame_stride": 3},
+    ]
+
+    def __init__(
+        self,
+        target_fps: float = 30,
+        max_latency_ms: float = 100,
+        enabled: bool = True,
+        smoothing: float = 0.2,
+        hold_frames: int = 15,
+        headroom: float = 0.6
+    ):
+        self.target_fps = target_fps
+        self.max_latency_ms = max_latency_ms
+        self.frame_budget_ms = 1000.0 / target_fps if target_fps else float("inf")
+        self.enabled = enabled
+        self.smoothing = smoothing      # EWMA weight of the newest sample
+        self.hold_frames = hold_frames  # Frames to wait after a change before re-evaluating
+        self.headroom = headroom        # Step up only below this fraction of the budgets
+
+        self.lock = threading.Lock()
+        self.level = 0
+        self.latency_ms = 0.0     # EWMA end-to-end latency
+        self.inference_ms = 0.0   # EWMA processing time per frame
+        self.frames_since_change = 0
+        self.changes = 0
+        self.last_change = None   # {"time", "from", "to", "reason"}
+
+    @classmethod
+    def from_config(cls, performance: Optional[Dict]) -> "AdaptiveQualityController":
+        performance = performance or {}
+        return cls(
+            target_fps=performance.get("target_fps", 30),
+            max_latency_ms=performance.get("max_latency_ms", 100),
+            enabled=performance.get("adaptive_quality", True)
+        )
+
+    @property
+    def settings(self) -> Dict:
+        return self.LEVELS[self.level]
+
+    @property
+    def imgsz(self) -> int:
+        return self.settings["imgsz"]
+
+    @property
+    def enrichment(self) -> bool:
+        return self.settings["enrichment"]
+
+    def should_process(self, frame_seq: int, last_processed_seq: int) -> bool:
+        """Frame skipping: process only every `frame_stride`-th captured frame"""
+        return frame_seq - last_processed_seq >= self.settings["frame_stride"]
+
+    def record(self, captured_at: float, inference_ms: float):
+        """Feed one processed frame (capture timestamp + processing time)"""
+        latency_ms = (time.time() - captured_at) * 1000
+
+        with self.lock:
+            if self.latency_ms == 0.0:
+                self.latency_ms, self.inference_ms = latency_ms, inference_ms
+            else:
+                a = self.smoothing
+                self.latency_ms = a * latency_ms + (1 - a) * self.latency_ms
+                self.inference_ms = a * inference_ms + (1 - a) * self.inference_ms
+
+            self.frames_since_change += 1
+            if not self.enabled or self.frames_since_change < self.hold_frames:
+                return
+
+            if self.latency_ms > self.max_latency_ms or self.inference_ms > self.frame_budget_ms:
+                if self.level < len(self.LEVELS) - 1:
+                    reason = (f"latency {self.latency_ms:.0f}ms > {self.max_latency_ms:.0f}ms"
+                              if self.latency_ms > self.max_latency_ms
+                              else f"inference {self.inference_ms:.0f}ms > {self.frame_budget_ms:.0f}ms budget")
+                    self._set_level(self.level + 1, reason)
+            elif (self.latency_ms < self.max_latency_ms * self.headroom
+                  and self.inference_ms < self.frame_budget_ms * self.headroom):
+                if self.level > 0:
+                    self._set_level(self.level - 1, "headroom available")
+
+    def _set_level(self, level: int, reason: str):
+        print(f"🎚️  Adaptive quality: level {self.level} -> {level} ({reason})")
+        self.last_change = {"time": time.time(), "from": self.level, "to": level, "reason": reason}
+        self.level = level
+        self.frames_since_change = 0
+        self.changes += 1
+
+    def get_status(self) -> Dict:
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "level": self.level,
+                "max_level": len(self.LEVELS) - 1,
+                "settings": dict(self.settings),
+                "target_fps": self.target_fps,
+                "max_latency_ms": self.max_latency_ms,
+                "latency_ms": round(self.latency_ms, 1),
+                "inference_ms": round(self.inference_ms, 1),
+                "changes": self.changes,
+                "last_change": self.last_change
+            }
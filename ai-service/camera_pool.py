@@ -0,0 +1,296 @@
+"""
+Camera Pool - Multi-camera capture with cross-camera batched inference
+Manages N ThreadedCamera sources that share a single VisionEngine model.
+The latest frame from every camera is collected into one batch and sent
+through a single forward pass; per-camera results are routed back with
+their camera id.
+"""
+
+import threading
+import time
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+from motion_gate import MotionGate
+from vision_engine import (
+    ThreadedCamera, VisionEngine, ResultPublisher, TrackState, boxes_to_arrays
+)
+
+
+def parse_video_sources(value: str) -> Dict[str, Union[int, str]]:
+    """
+    Parse VIDEO_SOURCES, e.g. "gate=http://10.0.0.5:8080/video,lobby=0,rtsp://..."
+    Entries without an explicit id are named cam0, cam1, ...
+    """
+    sources = {}
+    for idx, entry in enumerate(e.strip() for e in value.split(",")):
+        if not entry:
+            continue
+        camera_id, sep, src = entry.partition("=")
+        # "=" only names a camera when it appears before any URL scheme
+        if not sep or "://" in camera_id:
+            camera_id, src = f"cam{idx}", entry
+        src = src.strip()
+        sources[camera_id.strip()] = int(src) if src.isdigit() else src
+    return sources
+
+
+class IoUTracker:
+    """
+    Lightweight per-camera tracker for batched inference.
+    ultralytics keeps one tracker per predictor, so `model.track` on a batch
+    of unrelated cameras would mix their tracks; each camera gets its own
+    greedy IoU matcher instead.
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = 30):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.next_id = 1
+        self.boxes = np.zeros((0, 4), np.float32)
+        self.classes = np.zeros(0, np.int64)
+        self.ids = np.zeros(0, np.int64)
+        self.ages = np.zeros(0, np.int64)
+
+    @staticmethod
+    def _iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+        y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+        x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+        y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+        inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+        area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+        return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+    def update(self, xyxy: np.ndarray, cls_ids: np.ndarray) -> np.ndarray:
+        """Assign a track id to every detection; returns ids aligned with `xyxy`"""
+        ids = np.full(len(xyxy), -1, np.int64)
+        matched_tracks = np.zeros(len(self.ids), bool)
+
+        if len(xyxy) and len(self.ids):
+            iou = self._iou_matrix(xyxy, self.boxes)
+            iou[cls_ids[:, None] != self.classes[None, :]] = 0.0  # Never match across classes
+            # Greedy: best pairs first
+            for flat in np.argsort(-iou, axis=None):
+                d, t = divmod(int(flat), iou.shape[1])
+                if iou[d, t] < self.iou_threshold:
+                    break
+                if ids[d] >= 0 or matched_tracks[t]:
+                    continue
+                ids[d] = self.ids[t]
+                matched_tracks[t] = True
+
+        # Age out unmatched tracks, refresh matched ones
+        keep = ~matched_tracks & (self.ages + 1 < self.max_age)
+        new = ids < 0
+        ids[new] = np.arange(self.next_id, self.next_id + int(new.sum()))
+        self.next_id += int(new.sum())
+
+        self.boxes = np.concatenate([self.boxes[keep], xyxy.astype(np.float32)])
+        self.classes = np.concatenate([self.classes[keep], cls_ids])
+        self.ids = np.concatenate([self.ids[keep], ids])
+        self.ages = np.concatenate([self.ages[keep] + 1, np.zeros(len(xyxy), np.int64)])
+        return ids
+
+
+class CameraPool:
+    """
+    Runs many cameras through one model.
+    The engine's own camera becomes the primary camera of the pool, so code
+    that reads `vision_engine.camera` / `vision_engine.results` keeps working.
+    """
+
+    def __init__(
+        self,
+        engine: VisionEngine,
+        sources: Dict[str, Union[int, str]],
+        batch_size: int = 8,
+        conf: float = 0.5
+    ):
+        self.engine = engine
+        self.batch_size = max(1, batch_size)
+        self.conf = conf
+        self.frame_event = threading.Event()
+
+        self.cameras: Dict[str, ThreadedCamera] = {engine.camera_id: engine.camera}
+        self.results: Dict[str, ResultPublisher] = {engine.camera_id: engine.results}
+        self.states: Dict[str, TrackState] = {engine.camera_id: engine.state}
+        engine.camera.frame_listener = self.frame_event
+
+        for camera_id, source in sources.items():
+            if camera_id in self.cameras:
+                continue
+            self.cameras[camera_id] = ThreadedCamera(
+                source, frame_listener=self.frame_event, ring_slots=engine.ring_slots, mirror=engine.mirror
+            )
+            self.results[camera_id] = ResultPublisher()
+            self.states[camera_id] = TrackState()
+
+        self.trackers: Dict[str, IoUTracker] = {cid: IoUTracker() for cid in self.cameras}
+        self.gates: Dict[str, MotionGate] = {
+            cid: engine.motion_gate if cid == engine.camera_id else MotionGate.from_config(engine.motion_config)
+            for cid in self.cameras
+        }
+        self.last_seq: Dict[str, int] = {cid: 0 for cid in self.cameras}
+
+        # Every per-camera result is also published here (fan-in for /api/ai/stream).
+        # One batch publishes up to one result per camera; keep a few batches so
+        # the stream pump can drain all of them
+        self.all_results = ResultPublisher(history=max(64, 4 * len(self.cameras)))
+
+        self.running = False
+        self.thread = None
+        self.batches = 0
+        self.frames_processed = 0
+        self.last_batch_size = 0
+        self.last_batch_ms = 0.0
+
+        print(f"🎥 Camera Pool: {len(self.cameras)} cameras, batch size {self.batch_size}")
+
+    def start(self):
+        for camera in self.cameras.values():
+            camera.start()
+        # The pool replaces VisionEngine.start(), so it owns the suspect watcher too
+        self.engine.face_recognizer.start_watching()
+        if self.running: return
+        self.running = True
+        self.thread = threading.Thread(target=self._batch_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        self.frame_event.set()
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        for camera in self.cameras.values():
+            camera.stop()
+        self.engine.face_recognizer.stop_watching()
+
+    def _collect(self) -> List[Tuple[str, np.ndarray, int, float, object]]:
+        """
+        Latest unseen frame from each camera, with its full-resolution frame
+        held for crops (the ring can wrap while the batch is inferred;
+        released by _release).
+        Static cameras are answered from their last detections right away
+        and never enter the batch.
+        """
+        pending = []
+        quality = self.engine.quality
+        for camera_id, camera in self.cameras.items():
+            frame, seq, captured_at = camera.wait_for_frame(self.last_seq[camera_id], timeout=0)
+            if frame is None or not quality.should_process(seq, self.last_seq[camera_id]):
+                continue
+            self.last_seq[camera_id] = seq
+
+            last_detections = self.states[camera_id].last_detections
+            if not self.gates[camera_id].should_run(frame, last_detections is not None):
+                self._publish(camera_id, frame, seq, last_detections, {"motion_skipped": True})
+                continue
+            held_frame = camera.hold_full_frame(seq) if quality.enrichment else None
+            pending.append((camera_id, frame, seq, captured_at, held_frame))
+        return pending
+
+    def _release(self, pending: List[Tuple[str, np.ndarray, int, float, object]]):
+        for camera_id, _, seq, _, held_frame in pending:
+            if held_frame is not None:
+                self.cameras[camera_id].release_full_frame(seq)
+
+    def _batch_loop(self):
+        print("🧠 Batched Inference Loop Started")
+        while self.running:
+            try:
+                if not self.frame_event.wait(timeout=0.5):
+                    continue
+                self.frame_event.clear()
+
+                pending = self._collect()
+                try:
+                    for i in range(0, len(pending), self.batch_size):
+                        self._run_batch(pending[i:i + self.batch_size])
+                finally:
+                    self._release(pending)
+            except Exception as e:
+                print(f"Batch Inference Error: {e}")
+                time.sleep(0.5)
+        print("🧠 Batched Inference Loop Stopped")
+
+    def _run_batch(self, batch: List[Tuple[str, np.ndarray, int, float, object]]):
+        engine = self.engine
+        quality = engine.quality
+        frames = [frame for _, frame, _, _, _ in batch]
+
+        start = time.time()
+        outputs = [None] * len(batch)
+        if engine.is_ready and engine.model:
+            # One forward pass for the whole batch
+            outputs = engine.model.predict(
+                frames, conf=self.conf, verbose=False, max_det=20, imgsz=quality.imgsz
+            )
+        self.last_batch_ms = (time.time() - start) * 1000
+        self.last_batch_size = len(batch)
+        self.batches += 1
+        self.frames_processed += len(batch)
+
+        for (camera_id, frame, seq, _, held_frame), output in zip(batch, outputs):
+            state = self.states[camera_id]
+            detections = []
+            if output is not None:
+                xyxy, confs, cls_ids, _ = boxes_to_arrays(output.boxes)
+                track_ids = self.trackers[camera_id].update(xyxy, cls_ids)
+                detections = engine.build_detections(
+                    frame, xyxy, confs, cls_ids, track_ids, output.names, self.cameras[camera_id], state,
+                    enrichment=quality.enrichment, frame_seq=seq, held_frame=held_frame
+                )
+                state.last_detections = detections
+
+            self._publish(camera_id, frame, seq, detections, {
+                "batch_size": len(batch),
+                "batch_latency_ms": round(self.last_batch_ms, 2),
+                "motion_skipped": False
+            })
+
+        # Per-frame cost of the batch; latency measured from the oldest capture
+        oldest_capture = min(captured_at for _, _, _, captured_at, _ in batch)
+        quality.record(oldest_capture, (time.time() - start) * 1000 / len(batch))
+
+    def _publish(self, camera_id: str, frame: np.ndarray, seq: int, detections: List[Dict], extra_stats: Dict):
+        camera = self.cameras[camera_id]
+        result = {
+            "frame": frame,
+            "camera_id": camera_id,
+            "frame_seq": seq,
+            "detections": detections,
+            "stats": {
+                "fps": camera.fps,
+                "status": camera.status,
+                "res": f"{camera.resolution[0]}x{camera.resolution[1]}",
+                **extra_stats
+            }
+        }
+        self.results[camera_id].publish(result)
+        self.all_results.publish(dict(result))
+        if self.engine.detection_log and detections:
+            self.engine.detection_log.append(camera_id, detections, frame_id=seq)
+
+    def get_stats(self) -> Dict:
+        return {
+            "cameras": {
+                camera_id: {
+                    "source": str(camera.source),
+                    "status": camera.status,
+                    "fps": camera.fps,
+                    "res": f"{camera.resolution[0]}x{camera.resolution[1]}",
+                    "seq": self.results[camera_id].seq,
+                    "motion_gate": self.gates[camera_id].get_stats()
+                }
+                for camera_id, camera in self.cameras.items()
+            },
+            "batch_size": self.batch_size,
+            "batches": self.batches,
+            "frames_processed": self.frames_processed,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_latency_ms": round(self.last_batch_ms, 2),
+            "adaptive_quality": self.engine.quality.get_status()
+        }
@@ -0,0 +1,138 @@
+"""
+Compute Executor - Off-loop execution for CPU-heavy work
+Keeps YOLO, Haar cascades, EasyOCR, model loading and JPEG encoding off the
+uvicorn event loop so REST, MJPEG and WebSocket traffic stay responsive.
+
+- Thread pool for work that releases the GIL (OpenCV, PyTorch, ONNX Runtime)
+- Optional process pool for pure-Python, picklable work
+- Bounded queueing: callers beyond the queue limit wait for admission and
+  are rejected with ExecutorOverloaded after `admission_timeout`
+- Exposes queue depth and wait time for /api/ai/status
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ExecutorOverloaded(Exception):
+    """Raised when the executor queue stays full for longer than the admission timeout"""
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict):
+    """Runs inside the worker; reports when execution actually started"""
+    started_at = time.time()
+    return fn(*args, **kwargs), started_at
+
+
+class ComputeExecutor:
+    """
+    Bounded executor shared by every async handler in main.py
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_queue: int = 32,
+        process_workers: int = 0,
+        admission_timeout: float = 5.0
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.process_workers = process_workers
+        self.admission_timeout = admission_timeout
+
+        self.thread_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="compute")
+        self.process_pool = ProcessPoolExecutor(max_workers=process_workers) if process_workers > 0 else None
+
+        # Admission control: at most max_workers running + max_queue waiting
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self._stats_lock = threading.Lock()
+        self.in_flight = 0  # Submitted and not finished (queued + running)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._wait_times = deque(maxlen=200)  # seconds, most recent tasks
+        self._run_times = deque(maxlen=200)
+
+        logger.info(f"⚙️  Compute executor: {max_workers} threads, queue {max_queue}, "
+                    f"{process_workers} processes")
+
+    async def run(self, fn: Callable, *args, process: bool = False, **kwargs) -> Any:
+        """
+        Run `fn(*args, **kwargs)` off the event loop and await its result.
+
+        Args:
+            process: Use the process pool (fn and args must be picklable)
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers + self.max_queue)
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.admission_timeout)
+        except asyncio.TimeoutError:
+            with self._stats_lock:
+                self.rejected += 1
+            raise ExecutorOverloaded(
+                f"Compute queue full ({self.in_flight} tasks in flight)"
+            )
+
+        pool = self.process_pool if (process and self.process_pool) else self.thread_pool
+        submitted_at = time.time()
+        with self._stats_lock:
+            self.in_flight += 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            result, started_at = await loop.run_in_executor(pool, _timed_call, fn, args, kwargs)
+        except BaseException:
+            with self._stats_lock:
+                self.in_flight -= 1
+                self.failed += 1
+            raise
+        finally:
+            self._slots.release()
+
+        finished_at = time.time()
+        with self._stats_lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self._wait_times.append(max(0.0, started_at - submitted_at))
+            self._run_times.append(max(0.0, finished_at - started_at))
+        return result
+
+    def get_stats(self) -> Dict:
+        """Queue depth and wait time statistics"""
+        with self._stats_lock:
+            waits = list(self._wait_times)
+            runs = list(self._run_times)
+            in_flight = self.in_flight
+
+        # Pool threads pick up work as soon as they are free, so anything past
+        # the worker count is waiting in the queue
+        busy = min(in_flight, self.max_workers)
+        return {
+            "workers": self.max_workers,
+            "process_workers": self.process_workers,
+            "in_flight": in_flight,
+            "queue_depth": max(0, in_flight - busy),
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(sum(waits) / len(waits) * 1000, 2) if waits else 0.0,
+            "max_wait_ms": round(max(waits) * 1000, 2) if waits else 0.0,
+            "avg_run_ms": round(sum(runs) / len(runs) * 1000, 2) if runs else 0.0
+        }
+
+    def shutdown(self):
+        self.thread_pool.shutdown(wait=False, cancel_futures=True)
+        if self.process_pool:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
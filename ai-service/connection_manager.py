@@ -0,0 +1,293 @@
+"""
+Connection Manager - WebSocket fan-out with per-client send queues
+Every connected console gets its own bounded outbound queue and sender
+task, so one slow or dead laptop never stalls the others.
+
+Drop policy by message type:
+- critical_alert / connection: never dropped
+- frame_analysis: coalesced per camera (only the newest unsent one is kept)
+- anything else: dropped oldest-first when the queue is full
+
+Each client picks its wire format when it connects (see wire_format.py):
+JSON text frames by default, binary msgpack if it asks for it. A message is
+encoded at most once per format, however many clients receive it.
+
+Clients that connect with `?delta=1` get `frame_delta` messages (track
+add/update/remove against the last frame they received, see track_delta.py)
+instead of full `frame_analysis` messages.
+
+A `subscribe` message narrows cameras, threat level, channels and rate per
+client (see subscription.py); unwanted messages are never queued.
+
+Clients whose oldest queued message is older than `max_lag` seconds, or
+whose socket does not accept a message within `send_timeout`, are
+disconnected.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from fastapi import WebSocket
+
+from subscription import Subscription
+from track_delta import TrackDeltaEncoder
+from wire_format import JSON, encode, negotiate
+
+NEVER_DROP = {"critical_alert", "connection"}
+COALESCE = {"frame_analysis"}
+
+
+class OutboundMessage:
+    """A message shared by all clients; serialized at most once per wire format"""
+    __slots__ = ("message", "type", "_encoded", "version", "deltas", "views")
+
+    def __init__(self, message: Dict):
+        self.message = message
+        self.type = message.get("type")
+        self._encoded = {}
+        self.version = None  # Track-state version, set for frame_analysis
+        self.deltas: Dict[Optional[int], "OutboundMessage"] = {}  # base version -> frame_delta
+        self.views: Dict[tuple, "OutboundMessage"] = {}  # subscription view key -> filtered frame
+
+    def encoded(self, fmt: str):
+        payload = self._encoded.get(fmt)
+        if payload is None:
+            payload = self._encoded[fmt] = encode(self.message, fmt)
+        return payload
+
+
+class ClientConnection:
+    """One WebSocket with its own outbound queue and sender task"""
+
+    def __init__(self, websocket: WebSocket, max_queue: int, fmt: str = JSON, delta: bool = False):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.format = fmt
+        self.delta = delta
+        self.subscription = Subscription()
+        self.bases: Dict[tuple, int] = {}  # delta stream key -> last track-state version sent
+        self.queue = deque()  # [coalesce_key, OutboundMessage, enqueued_at]
+        self.pending: Dict[tuple, list] = {}  # coalesce_key -> queued entry
+        self.ready = asyncio.Event()
+        self.sender: Optional[asyncio.Task] = None
+        self.connected_at = time.time()
+        self.closed = False
+
+        self.sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.filtered = 0  # Not queued because of the subscription
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    def enqueue(self, outbound: OutboundMessage):
+        now = time.monotonic()
+
+        if outbound.type in COALESCE:
+            key = (outbound.type, outbound.message.get("camera_id"))
+            entry = self.pending.get(key)
+            if entry is not None:
+                # Replace the unsent one in place; its queue position (and age) is kept
+                entry[1] = outbound
+                self.coalesced += 1
+                return
+            entry = [key, outbound, now]
+            self.pending[key] = entry
+        else:
+            entry = [None, outbound, now]
+
+        if len(self.queue) >= self.max_queue and outbound.type not in NEVER_DROP:
+            if not self._drop_one():
+                self.dropped += 1  # Queue is all must-deliver messages; drop the newcomer
+                if entry[0] is not None:
+                    self.pending.pop(entry[0], None)
+                return
+
+        self.queue.append(entry)
+        self.ready.set()
+
+    def _drop_one(self) -> bool:
+        """Drop the oldest droppable entry"""
+        for entry in self.queue:
+            if entry[1].type not in NEVER_DROP:
+                self.queue.remove(entry)
+                if entry[0] is not None:
+                    self.pending.pop(entry[0], None)
+                self.dropped += 1
+                return True
+        return False
+
+    @property
+    def lag_seconds(self) -> float:
+        """Age of the oldest unsent message"""
+        return time.monotonic() - self.queue[0][2] if self.queue else 0.0
+
+    def get_stats(self) -> Dict:
+        client = self.websocket.client
+        return {
+            "client": f"{client.host}:{client.port}" if client else None,
+            "format": self.format,
+            "delta": self.delta,
+            "subscription": None if self.subscription.is_default else self.subscription.to_dict(),
+            "connected_for_s": round(time.time() - self.connected_at, 1),
+            "queue_depth": len(self.queue),
+            "lag_ms": round(self.lag_seconds * 1000, 1),
+            "last_send_lag_ms": round(self.last_lag_ms, 1),
+            "max_send_lag_ms": round(self.max_lag_ms, 1),
+            "sent": self.sent,
+            "bytes_sent": self.bytes_sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "filtered": self.filtered
+        }
+
+
+class ConnectionManager:
+    def __init__(
+        self,
+        max_queue: int = 64,
+        max_lag: float = 5.0,
+        send_timeout: float = 2.0,
+        delta: Optional[Dict] = None
+    ):
+        self.max_queue = max_queue
+        self.max_lag = max_lag
+        self.send_timeout = send_timeout
+        self.delta_encoder = TrackDeltaEncoder(**(delta or {}))
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.lagging_disconnects = 0
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
+
+    async def connect(self, websocket: WebSocket) -> ClientConnection:
+        fmt, subprotocol = negotiate(websocket)
+        await websocket.accept(subprotocol=subprotocol)
+        delta = websocket.query_params.get("delta", "").lower() in ("1", "true")
+        client = ClientConnection(websocket, self.max_queue, fmt, delta)
+        client.sender = asyncio.create_task(self._sender(client))
+        self.clients[websocket] = client
+        print(f"✅ Client connected ({fmt}{', delta' if delta else ''}). Total: {len(self.clients)}")
+        return client
+
+    def disconnect(self, websocket: WebSocket):
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        client.closed = True
+        if client.sender and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+        print(f"❌ Client disconnected. Total: {len(self.clients)}")
+
+    async def _drop_client(self, client: ClientConnection, reason: str):
+        print(f"⚠️ Disconnecting lagging client ({reason})")
+        self.lagging_disconnects += 1
+        self.disconnect(client.websocket)
+        try:
+            await client.websocket.close(code=1013)  # Try again later
+        except Exception:
+            pass
+
+    async def _sender(self, client: ClientConnection):
+        while not client.closed:
+            await client.ready.wait()
+            client.ready.clear()
+            while client.queue:
+                key, outbound, enqueued_at = client.queue.popleft()
+                if key is not None:
+                    client.pending.pop(key, None)
+                if outbound.type == "frame_analysis" and not client.subscription.is_default:
+                    outbound = self._view_for(client, outbound)
+                if client.delta and outbound.version is not None and "detections" in outbound.message:
+                    outbound = self._delta_for(client, outbound)
+                try:
+                    payload = outbound.encoded(client.format)
+                    if isinstance(payload, bytes):
+                        send = client.websocket.send_bytes(payload)
+                    else:
+                        send = client.websocket.send_text(payload)
+                    await asyncio.wait_for(send, self.send_timeout)
+                except asyncio.TimeoutError:
+                    await self._drop_client(client, f"send timed out after {self.send_timeout}s")
+                    return
+                except Exception:
+                    self.disconnect(client.websocket)
+                    return
+                client.sent += 1
+                client.bytes_sent += len(payload)
+                client.last_lag_ms = (time.monotonic() - enqueued_at) * 1000
+                client.max_lag_ms = max(client.max_lag_ms, client.last_lag_ms)
+
+    def _view_for(self, client: ClientConnection, outbound: OutboundMessage) -> OutboundMessage:
+        """Frame filtered by the client's subscription; shared by identical subscriptions"""
+        key = client.subscription.view_key
+        view = outbound.views.get(key)
+        if view is None:
+            view = outbound.views[key] = OutboundMessage(client.subscription.view(outbound.message))
+            view.version = outbound.version
+        return view
+
+    def _delta_for(self, client: ClientConnection, outbound: OutboundMessage) -> OutboundMessage:
+        """frame_delta against what this client last received; shared by clients on the same base"""
+        # One delta stream per camera and detection filter
+        key = (outbound.message.get("camera_id"), client.subscription.view_key[0])
+        self.delta_encoder.record(key, outbound.version, outbound.message["detections"])
+        base = client.bases.get(key)
+        if self.delta_encoder.is_keyframe(key, outbound.version, base):
+            base = None
+        delta = outbound.deltas.get(base)
+        if delta is None:
+            message = self.delta_encoder.delta(outbound.message, key, outbound.version, base)
+            delta = outbound.deltas[base] = OutboundMessage(message)
+        # Advance now: if the send fails the client is disconnected anyway
+        client.bases[key] = outbound.version
+        return delta
+
+    def subscribe(self, websocket: WebSocket, message: Dict) -> Subscription:
+        """Replace a client's subscription. Raises: ValueError for an invalid request"""
+        subscription = Subscription.from_message(message)
+        client = self.clients.get(websocket)
+        if client:
+            client.subscription = subscription
+        return subscription
+
+    def send(self, websocket: WebSocket, message: Dict):
+        """Queue a message for one client"""
+        client = self.clients.get(websocket)
+        if client:
+            self._enqueue(client, OutboundMessage(message))
+
+    async def broadcast(self, message: dict):
+        """Queue a message for every client; never waits on a socket"""
+        outbound = OutboundMessage(message)
+        if outbound.type == "frame_analysis" and any(c.delta for c in self.clients.values()):
+            outbound.version = self.delta_encoder.next_version(message.get("camera_id"))
+        for client in list(self.clients.values()):
+            self._enqueue(client, outbound)
+
+    def _enqueue(self, client: ClientConnection, outbound: OutboundMessage):
+        if client.closed:
+            return
+        if not client.subscription.accepts(outbound.message):
+            client.filtered += 1
+            return
+        client.enqueue(outbound)
+        if client.lag_seconds > self.max_lag:
+            client.closed = True  # Stop queueing now; the close itself is async
+            asyncio.create_task(self._drop_client(client, f"{client.lag_seconds:.1f}s behind"))
+
+    def get_stats(self) -> Dict:
+        return {
+            "clients": len(self.clients),
+            "max_queue": self.max_queue,
+            "max_lag_s": self.max_lag,
+            "lagging_disconnects": self.lagging_disconnects,
+            "delta": self.delta_encoder.get_stats(),
+            "formats": {fmt: sum(c.format == fmt for c in self.clients.values())
+                        for fmt in {c.format for c in self.clients.values()}},
+            "connections": [c.get_stats() for c in self.clients.values()]
+        }
@@ -1,9 +1,28 @@
-import psycopg2
+"""
+Drone fleet load generator
+Drives N simulated drones (code names SIM-0001...) along coherent patrol
+orbits and inserts detections at a target rate, to size the database
+before deploying a bigger fleet.
+
+- One persistent connection (reconnects only on failure)
+- Per tick: one bulk UPDATE of every drone position and one bulk INSERT of
+  the tick's detections, both through unnest() over array parameters
+- Reports achieved throughput and DB latency percentiles
+
+Usage:
+    python continuous_simulation.py --drones 200 --detections-per-sec 2000 --duration 60
+    python continuous_simulation.py --existing          # old behaviour: drive ACTIVE drones
+"""
+
+import argparse
 import json
+import math
 import os
-import time
 import random
-import uuid
+import time
+
+import numpy as np
+import psycopg2
 
 # Configuration
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -12,6 +31,23 @@ DB_NAME = os.getenv("DB_NAME", "mydb")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASS = os.getenv("DB_PASS", "sk12346@")
 
+OBJECTS = ["AK-47", "RPG-7", "Unknown Individual", "Armored Vehicle"]
+BASE_LOCATION = (20.0, 78.0)  # lat, lng
+
+UPDATE_POSITIONS = """
+    UPDATE drones AS d
+    SET last_known_location = v.location, battery_level = v.battery, updated_at = NOW()
+    FROM unnest(%s::uuid[], %s::jsonb[], %s::int[]) AS v(id, location, battery)
+    WHERE d.id = v.id
+"""
+
+INSERT_DETECTIONS = """
+    INSERT INTO ai_detections (drone_id, detected_object, confidence, bounding_box, detected_at)
+    SELECT v.drone_id, v.detected_object, v.confidence, v.bounding_box, NOW()
+    FROM unnest(%s::uuid[], %s::text[], %s::int[], %s::jsonb[])
+        AS v(drone_id, detected_object, confidence, bounding_box)
+"""
+
 def get_db_connection():
     try:
         return psycopg2.connect(
@@ -21,65 +57,203 @@ def get_db_connection():
         print(f"Error connecting to DB: {e}")
         return None
 
+# ==============================================================================
+# FLEET
+# ==============================================================================
+
+class Fleet:
+    """
+    Drone state as arrays. Each drone orbits its own patrol center, so
+    consecutive positions form a smooth path rather than random jitter.
+    """
+
+    def __init__(self, ids, seed: int = 7):
+        rng = np.random.default_rng(seed)
+        n = len(ids)
+        self.ids = list(ids)
+        self.centers = np.array(BASE_LOCATION) + rng.uniform(-0.05, 0.05, (n, 2))
+        self.radius = rng.uniform(0.002, 0.01, n)          # degrees (~200 m - 1 km)
+        self.angular_speed = rng.uniform(0.02, 0.08, n)    # rad/s
+        self.phase = rng.uniform(0, 2 * math.pi, n)
+        self.battery = rng.uniform(60, 100, n)
+
+    def step(self, t: float, dt: float):
+        """Positions at time t (seconds since start). Returns: (locations json[], battery int[])"""
+        angle = self.phase + self.angular_speed * t
+        lat = self.centers[:, 0] + self.radius * np.sin(angle)
+        lng = self.centers[:, 1] + self.radius * np.cos(angle)
+        self.battery = np.where(self.battery < 15, 100.0, self.battery - 0.01 * dt)  # Swap battery at 15%
+        locations = [f'{{"lat": {a:.6f}, "lng": {b:.6f}}}' for a, b in zip(lat.tolist(), lng.tolist())]
+        return locations, self.battery.astype(int).tolist()
+
+def ensure_fleet(cur, size: int):
+    """Ids of `size` simulated drones, creating the missing ones in one statement"""
+    cur.execute("SELECT id FROM drones WHERE code_name LIKE 'SIM-%%' ORDER BY code_name LIMIT %s", (size,))
+    ids = [row[0] for row in cur.fetchall()]
+    if len(ids) < size:
+        names = [f"SIM-{i:04d}" for i in range(len(ids) + 1, size + 1)]
+        cur.execute("""
+            INSERT INTO drones (code_name, type, status, last_known_location)
+            SELECT name, 'QUADCOPTER', 'ACTIVE', %s::jsonb FROM unnest(%s::text[]) AS name
+            RETURNING id
+        """, (json.dumps({"lat": BASE_LOCATION[0], "lng": BASE_LOCATION[1]}), names))
+        ids += [row[0] for row in cur.fetchall()]
+    cur.execute("UPDATE drones SET status = 'ACTIVE' WHERE id = ANY(%s::uuid[])", (ids,))
+    return ids
+
+def active_drones(cur):
+    cur.execute("SELECT id FROM drones WHERE status = 'ACTIVE'")
+    ids = [row[0] for row in cur.fetchall()]
+    if not ids:
+        print("No ACTIVE drones. activating one...")
+        cur.execute("UPDATE drones SET status='ACTIVE' WHERE id = (SELECT id FROM drones LIMIT 1) RETURNING id")
+        ids = [row[0] for row in cur.fetchall()]
+    return ids
+
+def make_detections(fleet: Fleet, count: int):
+    """Array columns for `count` detections spread over the fleet"""
+    owners = np.random.randint(0, len(fleet.ids), count)
+    x = np.random.randint(0, 1180, count)
+    y = np.random.randint(0, 620, count)
+    w = np.random.randint(20, 100, count)
+    h = np.random.randint(20, 100, count)
+    return (
+        [fleet.ids[i] for i in owners.tolist()],
+        [random.choice(OBJECTS) for _ in range(count)],
+        np.random.randint(70, 100, count).tolist(),
+        [f'{{"x": {a}, "y": {b}, "w": {c}, "h": {d}}}' for a, b, c, d in zip(x.tolist(), y.tolist(), w.tolist(), h.tolist())]
+    )
+
+# ==============================================================================
+# METRICS
+# ==============================================================================
+
+class LatencyStats:
+    def __init__(self):
+        self.samples = {}
+
+    def record(self, name: str, seconds: float):
+        self.samples.setdefault(name, []).append(seconds * 1000)
+
+    def summary(self) -> str:
+        parts = []
+        for name, values in self.samples.items():
+            if values:
+                p50, p95, p99 = np.percentile(values, [50, 95, 99])
+                parts.append(f"{name} p50={p50:.1f} p95={p95:.1f} p99={p99:.1f} ms")
+        return " | ".join(parts)
+
+    def reset(self):
+        self.samples = {}
+
+def timed(stats: LatencyStats, name: str, cur, sql: str, params):
+    started = time.perf_counter()
+    cur.execute(sql, params)
+    stats.record(name, time.perf_counter() - started)
+
+# ==============================================================================
+# MAIN LOOP
+# ==============================================================================
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Drone fleet load generator for the Autonomous Shield database")
+    parser.add_argument("--drones", type=int, default=10, help="simulated drones (SIM-xxxx), created if missing")
+    parser.add_argument("--detections-per-sec", type=float, default=5.0, help="target detection insert rate")
+    parser.add_argument("--tick", type=float, default=1.0, help="seconds between position updates")
+    parser.add_argument("--duration", type=float, default=0, help="stop after this many seconds (0 = run until Ctrl+C)")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between throughput reports")
+    parser.add_argument("--existing", action="store_true", help="drive the existing ACTIVE drones instead of a SIM fleet")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     print("Starting Continuous AI Simulation...")
+    print(f"Target: {args.drones if not args.existing else 'ACTIVE'} drones, "
+          f"{args.detections_per_sec:g} detections/s, tick {args.tick}s")
     print("Press Ctrl+C to stop.")
 
-    while True:
-        conn = get_db_connection()
-        if not conn:
-            time.sleep(5)
-            continue
-            
-        try:
-            cur = conn.cursor()
-            
-            # 1. Get Active Drones
-            cur.execute("SELECT id, code_name, last_known_location FROM drones WHERE status = 'ACTIVE'")
-            drones = cur.fetchall()
-            
-            if not drones:
-                print("No ACTIVE drones. activating one...")
-                cur.execute("UPDATE drones SET status='ACTIVE' WHERE id = (SELECT id FROM drones LIMIT 1)")
+    conn, fleet = None, None
+    stats = LatencyStats()
+    totals = {"detections": 0, "updates": 0, "ticks": 0, "overruns": 0}
+    window = dict(totals)
+    carry = 0.0  # Fractional detections owed to the next tick
+
+    started = time.monotonic()
+    next_tick = started
+    last_report = started
+
+    try:
+        while not args.duration or time.monotonic() - started < args.duration:
+            if conn is None:
+                conn = get_db_connection()
+                if not conn:
+                    time.sleep(5)
+                    continue
+                with conn.cursor() as cur:
+                    ids = active_drones(cur) if args.existing else ensure_fleet(cur, args.drones)
                 conn.commit()
-                time.sleep(1)
-                continue
+                fleet = Fleet(ids)
+                print(f"Connected; driving {len(ids)} drones")
 
-            # 2. Simulate Drone Movement & Detection
-            for drone in drones:
-                drone_id, name, location = drone
-                # Move drone slightly
-                if location:
-                    lat = float(location.get('lat', 20)) + random.uniform(-0.001, 0.001)
-                    lng = float(location.get('lng', 78)) + random.uniform(-0.001, 0.001)
-                    new_loc = json.dumps({"lat": lat, "lng": lng})
-                    
-                    cur.execute("UPDATE drones SET last_known_location = %s, updated_at = NOW() WHERE id = %s", (new_loc, drone_id))
-                
-                # Random Detection (10% chance per tick)
-                if random.random() < 0.1:
-                    obj = random.choice(["AK-47", "RPG-7", "Unknown Individual", "Armored Vehicle"])
-                    conf = random.randint(70, 99)
-                    
-                    # Insert Detection
-                    bbox = json.dumps({"x": 100, "y": 100, "w": 50, "h": 50})
-                    cur.execute("""
-                        INSERT INTO ai_detections (drone_id, detected_object, confidence, bounding_box, detected_at)
-                        VALUES (%s, %s, %s, %s, NOW())
-                        RETURNING id
-                    """, (drone_id, obj, conf, bbox))
-                    new_id = cur.fetchone()[0]
-                    print(f"New Detection: {obj} ({conf}%) by {name}")
-
-            conn.commit()
-            cur.close()
-            conn.close()
+            try:
+                tick_started = time.perf_counter()
+                with conn.cursor() as cur:
+                    # 1. Move every drone in one statement
+                    locations, battery = fleet.step(time.monotonic() - started, args.tick)
+                    timed(stats, "update", cur, UPDATE_POSITIONS, (fleet.ids, locations, battery))
+
+                    # 2. This tick's share of detections in one statement
+                    carry += args.detections_per_sec * args.tick
+                    count = int(carry)
+                    carry -= count
+                    if count:
+                        timed(stats, "insert", cur, INSERT_DETECTIONS, make_detections(fleet, count))
+
+                commit_started = time.perf_counter()
+                conn.commit()
+                stats.record("commit", time.perf_counter() - commit_started)
+                stats.record("tick", time.perf_counter() - tick_started)
 
-        except Exception as e:
-            print(f"Simulation Error: {e}")
+                totals["detections"] += count
+                totals["updates"] += len(fleet.ids)
+                totals["ticks"] += 1
 
-        # Tick rate
-        time.sleep(2)
+            except psycopg2.OperationalError as e:
+                print(f"Simulation Error (reconnecting): {e}")
+                conn = None
+                continue
+            except Exception as e:
+                print(f"Simulation Error: {e}")
+                conn.rollback()
+
+            now = time.monotonic()
+            if now - last_report >= args.report_every:
+                elapsed = now - last_report
+                print(f"[{now - started:6.0f}s] "
+                      f"{(totals['detections'] - window['detections']) / elapsed:,.0f} detections/s, "
+                      f"{(totals['updates'] - window['updates']) / elapsed:,.0f} position updates/s, "
+                      f"overruns {totals['overruns'] - window['overruns']} | {stats.summary()}")
+                stats.reset()
+                window = dict(totals)
+                last_report = now
+
+            # Tick rate: fixed schedule; a slow database shows up as overruns
+            next_tick += args.tick
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                totals["overruns"] += 1
+                next_tick = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        elapsed = time.monotonic() - started
+        print(f"\nTotal: {totals['detections']} detections ({totals['detections'] / elapsed:,.1f}/s), "
+              f"{totals['updates']} position updates, {totals['ticks']} ticks, {totals['overruns']} overruns "
+              f"in {elapsed:.0f}s")
+        if conn:
+            conn.close()
 
 if __name__ == "__main__":
     main()
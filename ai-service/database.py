@@ -6,7 +6,7 @@ Async SQLAlchemy Implementation
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, JSON, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Float, JSON, Boolean, Text, UniqueConstraint
 from datetime import datetime
 import os
 
@@ -35,7 +35,11 @@ Base = declarative_base()
 # ==============================================================================
 
 class Event(Base):
-    """Raw detection events from the Vision Engine"""
+    """
+    Raw detection events from the Vision Engine.
+    New rows land in daily partitions managed by event_store.py; this model
+    is their column template (and the parent table on PostgreSQL).
+    """
     __tablename__ = "events"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -63,9 +67,35 @@ class Alert(Base):
     severity = Column(String) # critical, warning, info
     status = Column(String, default="active") # active, acknowledged, resolved
     
-    # Link to event
-    event_id = Column(Integer, ForeignKey("events.id"), nullable=True)
+    # Link to event (no FK: events are partitioned by time and dropped by retention)
+    event_id = Column(Integer, nullable=True, index=True)
+    event_time = Column(DateTime, nullable=True)  # Locates the event's partition
     
+class EventRollup(Base):
+    """Per-minute / per-hour event counts; dashboards read these instead of raw events"""
+    __tablename__ = "event_rollups"
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "source", "object_class", "threat_level",
+                         name="uq_event_rollups_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String, nullable=False)  # minute, hour
+    bucket_start = Column(DateTime, nullable=False, index=True)
+    source = Column(String, nullable=False)
+    object_class = Column(String, nullable=False)
+    threat_level = Column(String, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    max_confidence = Column(Float, nullable=False, default=0.0)
+
+class RollupState(Base):
+    """High-water mark of raw events already folded into rollups"""
+    __tablename__ = "rollup_state"
+
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime, nullable=False)
+
 class Device(Base):
     """Hardware inventory (Cameras, Drones, Sensors)"""
     __tablename__ = "devices"
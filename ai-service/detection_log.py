@@ -0,0 +1,375 @@
+"""
+Detection Log - Append-only, time-segmented columnar log of every detection
+The `events` table only receives critical detections. This log keeps all of
+them (every box, every camera, every frame) for forensic search.
+
+- append() only buffers rows in memory and returns immediately
+- A writer thread seals a camera's buffer into a segment every
+  `segment_seconds` (or `max_rows`) and writes it as a columnar .npz file:
+      ts float64 | frame_id int64 | track_id int32 (-1 = untracked)
+      class uint16 (index into classes[]) | threat uint8 | confidence float32
+      bbox int32[n, 4] (x1, y1, x2, y2)
+- A small SQLite index records each segment's camera, min/max time, row
+  count and per-class counts, so queries prune segments by time range,
+  camera and class before opening any file
+- Retention: the writer thread deletes segments (file + index rows) whose
+  newest row is older than `retention_days`
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+THREAT_CODES = {"normal": 0, "warning": 1, "suspicious": 2, "critical": 3}
+THREAT_NAMES = {code: name for name, code in THREAT_CODES.items()}
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    camera TEXT NOT NULL,
+    t_min REAL NOT NULL,
+    t_max REAL NOT NULL,
+    rows INTEGER NOT NULL,
+    max_threat INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_time ON segments (t_min, t_max);
+CREATE INDEX IF NOT EXISTS segments_camera ON segments (camera, t_min);
+CREATE TABLE IF NOT EXISTS segment_classes (
+    segment_id INTEGER NOT NULL REFERENCES segments (id) ON DELETE CASCADE,
+    class TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segment_classes_class ON segment_classes (class, segment_id);
+"""
+
+
+def _bbox_xyxy(bbox) -> tuple:
+    """VisionEngine boxes are [x1, y1, x2, y2]; mock/YOLO26 boxes are {x, y, width, height}"""
+    if isinstance(bbox, dict):
+        x, y = bbox.get("x", 0), bbox.get("y", 0)
+        return (x, y, x + bbox.get("width", 0), y + bbox.get("height", 0))
+    return tuple(bbox[:4])
+
+
+class _Buffer:
+    """Open (unsealed) rows for one camera"""
+    __slots__ = ("rows", "opened_at")
+
+    def __init__(self):
+        self.rows: List[tuple] = []
+        self.opened_at = time.time()
+
+
+class DetectionLog:
+    def __init__(
+        self,
+        path: str = "detection_log",
+        segment_seconds: float = 60.0,
+        max_rows: int = 200000,
+        compress: bool = False,
+        retention_days: float = 7.0,
+        retention_interval: float = 300.0
+    ):
+        self.path = path
+        self.segment_seconds = segment_seconds
+        self.max_rows = max_rows
+        self.compress = compress
+        self.retention_days = retention_days  # 0 = keep everything
+        self.retention_interval = retention_interval
+        self.last_retention = 0.0
+        os.makedirs(path, exist_ok=True)
+
+        self.index_path = os.path.join(path, "index.sqlite")
+        with self._connect() as db:
+            db.executescript(INDEX_SCHEMA)
+
+        self.lock = threading.Lock()
+        self.buffers: Dict[str, _Buffer] = {}
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
+
+        self.rows_appended = 0
+        self.rows_written = 0
+        self.segments_written = 0
+        self.write_errors = 0
+        self.last_write_ms = 0.0
+        self.segments_deleted = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.index_path, timeout=10.0)
+        db.execute("PRAGMA foreign_keys = ON")
+        return db
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True, name="detection-log")
+        self.thread.start()
+        logger.info(f"🗂️  Detection log started: {self.path}")
+
+    def stop(self):
+        """Seal and write every open buffer"""
+        self.running = False
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout=10.0)
+            self.thread = None
+        self._seal(force=True)
+
+    # ------------------------------------------------------------------
+    # Write path
+    # ------------------------------------------------------------------
+
+    def append(self, camera_id: str, detections: List[Dict], timestamp: Optional[float] = None,
+               frame_id: Optional[int] = None):
+        """Buffer one frame's detections (cheap; no I/O)"""
+        if not detections:
+            return
+        ts = timestamp if timestamp is not None else time.time()
+        fid = frame_id if frame_id is not None else -1
+        rows = []
+        for d in detections:
+            track_id = d.get("track_id")
+            rows.append((
+                ts, fid, track_id if track_id is not None else -1,
+                d.get("class", "unknown"), THREAT_CODES.get(d.get("threat_level"), 0),
+                d.get("confidence", 0.0), _bbox_xyxy(d.get("bbox", (0, 0, 0, 0)))
+            ))
+        with self.lock:
+            buffer = self.buffers.get(camera_id)
+            if buffer is None:
+                buffer = self.buffers[camera_id] = _Buffer()
+            buffer.rows.extend(rows)
+            full = len(buffer.rows) >= self.max_rows
+            self.rows_appended += len(rows)
+        if full:
+            self.wakeup.set()
+
+    def _writer_loop(self):
+        while self.running:
+            self.wakeup.wait(timeout=1.0)
+            self.wakeup.clear()
+            self._seal()
+            if self.retention_days and time.time() - self.last_retention >= self.retention_interval:
+                self.last_retention = time.time()
+                try:
+                    self.enforce_retention()
+                except Exception as e:
+                    logger.error(f"❌ Detection log retention failed: {e}")
+
+    def _seal(self, force: bool = False):
+        """Detach buffers that are due and write them as segments"""
+        now = time.time()
+        with self.lock:
+            due = [camera for camera, buffer in self.buffers.items()
+                   if force or len(buffer.rows) >= self.max_rows
+                   or now - buffer.opened_at >= self.segment_seconds]
+            sealed = [(camera, self.buffers.pop(camera).rows) for camera in due]
+        for camera, rows in sealed:
+            if rows:
+                try:
+                    self._write_segment(camera, rows)
+                except Exception as e:
+                    self.write_errors += 1
+                    logger.error(f"❌ Detection log segment for {camera} failed: {e}")
+
+    @staticmethod
+    def _columns(rows: List[tuple]) -> Dict[str, np.ndarray]:
+        ts, frame_ids, track_ids, labels, threats, confidences, boxes = zip(*rows)
+        classes, class_idx = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+        return {
+            "ts": np.asarray(ts, dtype=np.float64),
+            "frame_id": np.asarray(frame_ids, dtype=np.int64),
+            "track_id": np.asarray(track_ids, dtype=np.int32),
+            "class": class_idx.astype(np.uint16),
+            "classes": classes,
+            "threat": np.asarray(threats, dtype=np.uint8),
+            "confidence": np.asarray(confidences, dtype=np.float32),
+            "bbox": np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        }
+
+    def _write_segment(self, camera: str, rows: List[tuple]):
+        started = time.perf_counter()
+        columns = self._columns(rows)
+        ts = columns["ts"]
+        t_min, t_max = float(ts.min()), float(ts.max())
+
+        day = time.strftime("%Y%m%d", time.gmtime(t_min))
+        directory = os.path.join(self.path, day)
+        os.makedirs(directory, exist_ok=True)
+        safe_camera = "".join(c if c.isalnum() or c in "-_" else "_" for c in camera)
+        relative = os.path.join(day, f"{safe_camera}_{t_min:.3f}_{len(rows)}.npz")
+        target = os.path.join(self.path, relative)
+
+        # Write then rename: readers never see a half-written segment
+        tmp = target + ".tmp"
+        with open(tmp, "wb") as f:
+            (np.savez_compressed if self.compress else np.savez)(f, **columns)
+        os.replace(tmp, target)
+
+        counts = np.bincount(columns["class"], minlength=len(columns["classes"]))
+        with self._connect() as db:
+            cursor = db.execute(
+                "INSERT INTO segments (path, camera, t_min, t_max, rows, max_threat) VALUES (?, ?, ?, ?, ?, ?)",
+                (relative, camera, t_min, t_max, len(rows), int(columns["threat"].max()))
+            )
+            db.executemany(
+                "INSERT INTO segment_classes (segment_id, class, count) VALUES (?, ?, ?)",
+                [(cursor.lastrowid, str(label), int(n)) for label, n in zip(columns["classes"], counts)]
+            )
+
+        self.rows_written += len(rows)
+        self.segments_written += 1
+        self.last_write_ms = (time.perf_counter() - started) * 1000
+
+    def enforce_retention(self, now: Optional[float] = None) -> int:
+        """Delete segments whose newest row is older than retention_days. Returns: segments deleted"""
+        cutoff = (now if now is not None else time.time()) - self.retention_days * 86400
+        with self._connect() as db:
+            expired = db.execute("SELECT id, path FROM segments WHERE t_max < ?", (cutoff,)).fetchall()
+            if not expired:
+                return 0
+            directories = set()
+            for _, relative in expired:
+                try:
+                    os.remove(os.path.join(self.path, relative))
+                except FileNotFoundError:
+                    pass
+                directories.add(os.path.dirname(os.path.join(self.path, relative)))
+            # segment_classes rows go with them (ON DELETE CASCADE)
+            db.executemany("DELETE FROM segments WHERE id = ?", [(segment_id,) for segment_id, _ in expired])
+        for directory in directories:
+            try:
+                os.rmdir(directory)  # Only once the whole day is gone
+            except OSError:
+                pass
+        self.segments_deleted += len(expired)
+        logger.info(f"🗑️  Detection log retention: deleted {len(expired)} segments")
+        return len(expired)
+
+    # ------------------------------------------------------------------
+    # Query path
+    # ------------------------------------------------------------------
+
+    def find_segments(self, start: float, end: float, cameras: Optional[List[str]] = None,
+                      classes: Optional[List[str]] = None, min_threat: Optional[str] = None) -> List[tuple]:
+        """Segments that may hold matching rows. Returns: [(path, camera)]"""
+        sql = "SELECT path, camera FROM segments WHERE t_max >= ? AND t_min <= ?"
+        params: list = [start, end]
+        if cameras:
+            sql += f" AND camera IN ({','.join('?' * len(cameras))})"
+            params += cameras
+        if min_threat:
+            sql += " AND max_threat >= ?"
+            params.append(THREAT_CODES[min_threat])
+        if classes:
+            sql += (f" AND id IN (SELECT segment_id FROM segment_classes"
+                    f" WHERE class IN ({','.join('?' * len(classes))}))")
+            params += classes
+        sql += " ORDER BY t_min"
+        with self._connect() as db:
+            return db.execute(sql, params).fetchall()
+
+    def query(
+        self,
+        start: float,
+        end: float,
+        cameras: Optional[List[str]] = None,
+        classes: Optional[List[str]] = None,
+        min_threat: Optional[str] = None,
+        limit: int = 10000
+    ) -> Dict:
+        """Rows in [start, end] (epoch seconds), oldest first, including unsealed buffers"""
+        if min_threat is not None and min_threat not in THREAT_CODES:
+            raise ValueError(f"min_threat must be one of {list(THREAT_CODES)}")
+        started = time.perf_counter()
+        segments = self.find_segments(start, end, cameras, classes, min_threat)
+
+        sources = []
+        for relative, camera in segments:
+            try:
+                with np.load(os.path.join(self.path, relative), allow_pickle=False) as data:
+                    sources.append((camera, {key: data[key] for key in data.files}))
+            except FileNotFoundError:
+                continue  # Removed by retention while we were querying
+        with self.lock:
+            open_buffers = [(camera, list(buffer.rows)) for camera, buffer in self.buffers.items()
+                            if buffer.rows and (not cameras or camera in cameras)]
+        sources += [(camera, self._columns(rows)) for camera, rows in open_buffers]
+
+        # Match with column masks, order by time on the matched timestamps only,
+        # and build row dicts for the first `limit` matches
+        threat_floor = THREAT_CODES[min_threat] if min_threat else 0
+        matches = []  # (timestamps, source index, row indices)
+        for s, (camera, columns) in enumerate(sources):
+            mask = (columns["ts"] >= start) & (columns["ts"] <= end)
+            if threat_floor:
+                mask &= columns["threat"] >= threat_floor
+            if classes:
+                wanted = np.flatnonzero(np.isin(columns["classes"], classes))
+                mask &= np.isin(columns["class"], wanted)
+            rows = np.flatnonzero(mask)
+            if len(rows):
+                matches.append((columns["ts"][rows], np.full(len(rows), s), rows))
+
+        total = sum(len(rows) for _, _, rows in matches)
+        results = []
+        if matches:
+            ts = np.concatenate([m[0] for m in matches])
+            source_ids = np.concatenate([m[1] for m in matches])
+            row_ids = np.concatenate([m[2] for m in matches])
+            if limit < total:
+                first = np.argpartition(ts, limit - 1)[:limit] if limit > 0 else np.zeros(0, np.int64)
+                order = first[np.argsort(ts[first], kind="stable")]
+            else:
+                order = np.argsort(ts, kind="stable")
+            for j in order:
+                camera, columns = sources[source_ids[j]]
+                i = row_ids[j]
+                track_id = int(columns["track_id"][i])
+                results.append({
+                    "timestamp": float(columns["ts"][i]),
+                    "camera_id": camera,
+                    "frame_id": int(columns["frame_id"][i]),
+                    "track_id": track_id if track_id >= 0 else None,
+                    "class": str(columns["classes"][columns["class"][i]]),
+                    "threat_level": THREAT_NAMES.get(int(columns["threat"][i]), "normal"),
+                    "confidence": round(float(columns["confidence"][i]), 3),
+                    "bbox": columns["bbox"][i].tolist()
+                })
+
+        return {
+            "rows": results,
+            "total": total,
+            "truncated": total > limit,
+            "segments_scanned": len(segments),
+            "query_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+
+    def get_stats(self) -> Dict:
+        with self.lock:
+            buffered = sum(len(b.rows) for b in self.buffers.values())
+        with self._connect() as db:
+            segments, rows = db.execute("SELECT COUNT(*), COALESCE(SUM(rows), 0) FROM segments").fetchone()
+        return {
+            "path": self.path,
+            "buffered_rows": buffered,
+            "rows_appended": self.rows_appended,
+            "rows_written": self.rows_written,
+            "segments": segments,
+            "indexed_rows": rows,
+            "write_errors": self.write_errors,
+            "segments_deleted": self.segments_deleted,
+            "retention_days": self.retention_days,
+            "last_write_ms": round(self.last_write_ms, 2)
+        }
@@ -0,0 +1,494 @@
+"""
+Event Store - Time-partitioned events, rollups and retention
+- PostgreSQL: `events` is a RANGE-partitioned parent with one partition per
+  day (events_pYYYYMMDD) plus a default partition. A plain `events` table
+  from before partitioning is migrated into it at setup()
+- SQLite: one table per day (events_pYYYYMMDD) in the same file; rows in
+  the old `events` table are moved into them at setup()
+- Rollup job: folds new raw events into per-minute and per-hour counts by
+  source, class and threat level (event_rollups), tracking a watermark so
+  each event is counted exactly once
+- Retention: whole partitions older than `retention_days` are dropped (no
+  row-by-row DELETE); minute rollups are kept for `minute_rollup_days`
+
+Dashboards read rollups (query_rollups) instead of scanning raw events.
+"""
+
+import asyncio
+import re
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import logging
+
+from sqlalchemy import Column, Index, MetaData, Table, and_, bindparam, func, insert, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import engine as default_engine, Base, Event, EventRollup, RollupState
+
+logger = logging.getLogger(__name__)
+
+PARTITION_RE = re.compile(r"^events_p(\d{8})$")
+GRANULARITIES = ("minute", "hour")
+
+# Parent table for PostgreSQL; the partition key must be part of the primary key
+POSTGRES_PARENT_DDL = """
+CREATE TABLE IF NOT EXISTS events (
+    id BIGSERIAL,
+    timestamp TIMESTAMP NOT NULL,
+    frame_id INTEGER,
+    source VARCHAR,
+    object_class VARCHAR,
+    confidence DOUBLE PRECISION,
+    bbox JSON,
+    threat_level VARCHAR,
+    snapshot_path VARCHAR,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp)
+"""
+
+# Pre-partitioning rows -> partitioned parent (timestamp is NOT NULL there; stored as UTC)
+COPY_LEGACY_EVENTS = """
+INSERT INTO events (id, timestamp, frame_id, source, object_class, confidence, bbox, threat_level, snapshot_path)
+SELECT id, COALESCE(timestamp, NOW() AT TIME ZONE 'UTC'), frame_id, source, object_class, confidence,
+       bbox, threat_level, snapshot_path
+FROM events_legacy
+"""
+
+
+class EventStore:
+    def __init__(
+        self,
+        retention_days: int = 30,
+        minute_rollup_days: int = 7,
+        precreate_days: int = 2,
+        maintenance_interval: float = 60.0,
+        rollup_lag: float = 10.0,
+        engine=None
+    ):
+        self.retention_days = retention_days
+        self.minute_rollup_days = minute_rollup_days
+        self.precreate_days = precreate_days
+        self.maintenance_interval = maintenance_interval
+        self.rollup_lag = rollup_lag  # Leave time for the write-behind queue to flush
+        self.engine = engine or default_engine
+        self.dialect = self.engine.dialect.name
+
+        self.metadata = MetaData()
+        self.partitions: Dict[date, Table] = {}
+        self.task: Optional[asyncio.Task] = None
+
+        self.rollup_runs = 0
+        self.events_rolled_up = 0
+        self.partitions_dropped = 0
+        self.last_rollup_ms = 0.0
+        self.last_error = None
+
+    @property
+    def is_postgres(self) -> bool:
+        return self.dialect == "postgresql"
+
+    # ------------------------------------------------------------------
+    # Setup and partitions
+    # ------------------------------------------------------------------
+
+    async def setup(self):
+        """Create tables (replaces init_db at startup) and the current partitions"""
+        if self.is_postgres:
+            legacy = False
+            try:
+                # One transaction: a failed migration leaves the old table untouched
+                async with self.engine.begin() as conn:
+                    legacy = await self._events_relkind(conn) == "r"
+                    if legacy:
+                        await self._rename_legacy_events(conn)
+                    await conn.execute(text(POSTGRES_PARENT_DDL))
+                    await conn.execute(text(
+                        "CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT"))
+                    await conn.execute(text(
+                        "CREATE INDEX IF NOT EXISTS ix_events_time_class ON events (timestamp, object_class, threat_level)"))
+                    if legacy:
+                        await self._copy_legacy_events(conn)
+            except Exception as e:
+                if legacy:
+                    raise RuntimeError(
+                        f"Migrating the plain `events` table to daily partitions failed ({e}); "
+                        "the table was left unchanged. Fix the cause or migrate it manually, then restart."
+                    ) from e
+                raise
+        async with self.engine.begin() as conn:
+            # Same as init_db(), but on this store's engine
+            await conn.run_sync(Base.metadata.create_all)
+            await self._add_alert_event_time(conn)
+        if not self.is_postgres:
+            # One transaction: a failed migration leaves the old rows where they are
+            async with self.engine.begin() as conn:
+                await self._move_sqlite_legacy_events(conn)
+        await self.ensure_partitions()
+
+    @staticmethod
+    async def _events_relkind(conn) -> Optional[str]:
+        """'p' = partitioned parent, 'r' = plain table (pre-partitioning), None = missing"""
+        return (await conn.execute(text(
+            "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = 'events' AND n.nspname = current_schema()"))).scalar()
+
+    async def _rename_legacy_events(self, conn):
+        """Move the plain `events` table (and its index names) out of the way"""
+        logger.info("🗂️  Migrating plain events table to daily partitions...")
+        await conn.execute(text("ALTER TABLE events RENAME TO events_legacy"))
+        indexes = (await conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'events_legacy' AND schemaname = current_schema()"
+        ))).scalars().all()
+        for name in indexes:
+            if "events" in name:
+                await conn.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name.replace("events", "events_legacy", 1)}"'))
+
+    async def _copy_legacy_events(self, conn):
+        """
+        Copy pre-partitioning rows into day partitions, keeping their ids so
+        alerts.event_id still points at them, then drop the old table (CASCADE
+        also drops the old alerts -> events foreign key).
+        """
+        days = (await conn.execute(text(
+            "SELECT DISTINCT CAST(timestamp AS DATE) FROM events_legacy WHERE timestamp IS NOT NULL"
+        ))).scalars().all()
+        for day in days:
+            await self._create_partition(conn, day)
+        result = await conn.execute(text(COPY_LEGACY_EVENTS))
+        await conn.execute(text(
+            "SELECT setval(pg_get_serial_sequence('events', 'id'), "
+            "GREATEST((SELECT MAX(id) FROM events), 1))"))
+        await conn.execute(text("DROP TABLE events_legacy CASCADE"))
+        logger.info(f"✅ Migrated {result.rowcount} events into {len(days)} daily partitions")
+
+    async def _move_sqlite_legacy_events(self, conn):
+        """
+        SQLite counterpart of _copy_legacy_events: move rows from the plain
+        `events` table into their day tables so rollups and retention see
+        them. Ids are kept unless the day table already has rows, in which
+        case they are shifted past its ids; alerts pointing at moved rows get
+        their event_time (and shifted event_id) so they still locate them.
+        """
+        if (await conn.execute(text("SELECT 1 FROM events LIMIT 1"))).first() is None:
+            return
+        logger.info("🗂️  Moving events written before partitioning into daily tables...")
+        await conn.execute(text("UPDATE events SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL"))
+        alert_ids = (await conn.execute(text(
+            "SELECT id FROM alerts WHERE event_time IS NULL AND event_id IN (SELECT id FROM events)"
+        ))).scalars().all()
+        if alert_ids:
+            await conn.execute(text(
+                "UPDATE alerts SET event_time = (SELECT timestamp FROM events WHERE events.id = alerts.event_id) "
+                "WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)), {"ids": alert_ids})
+
+        columns = ", ".join(c.name for c in Event.__table__.columns if c.name != "id")
+        days = (await conn.execute(text("SELECT DISTINCT date(timestamp) FROM events"))).scalars().all()
+        moved = 0
+        for day in map(date.fromisoformat, days):
+            await self._create_partition(conn, day)
+            name = self.partition_name(day)
+            offset = (await conn.execute(text(f"SELECT COALESCE(MAX(id), 0) FROM {name}"))).scalar()
+            result = await conn.execute(text(
+                f"INSERT INTO {name} (id, {columns}) SELECT id + :offset, {columns} "
+                f"FROM events WHERE date(timestamp) = :day"), {"offset": offset, "day": day.isoformat()})
+            moved += result.rowcount
+            if offset and alert_ids:
+                await conn.execute(text(
+                    "UPDATE alerts SET event_id = event_id + :offset WHERE id IN :ids AND date(event_time) = :day"
+                ).bindparams(bindparam("ids", expanding=True)),
+                    {"offset": offset, "ids": alert_ids, "day": day.isoformat()})
+        await conn.execute(text("DELETE FROM events"))
+        logger.info(f"✅ Moved {moved} events into {len(days)} daily tables")
+
+    async def _add_alert_event_time(self, conn):
+        """alerts.event_time was added with partitioning; add it to older databases"""
+        if self.is_postgres:
+            await conn.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS event_time TIMESTAMP"))
+            return
+        columns = [row[1] for row in (await conn.execute(text("PRAGMA table_info(alerts)"))).fetchall()]
+        if "event_time" not in columns:
+            await conn.execute(text("ALTER TABLE alerts ADD COLUMN event_time DATETIME"))
+
+    @staticmethod
+    def partition_name(day: date) -> str:
+        return f"events_p{day:%Y%m%d}"
+
+    def _partition_table(self, day: date) -> Table:
+        """Table object for a day (SQLite); columns mirror the Event model"""
+        table = self.partitions.get(day)
+        if table is None:
+            name = self.partition_name(day)
+            columns = [Column(c.name, c.type, primary_key=c.primary_key) for c in Event.__table__.columns]
+            table = Table(name, self.metadata, *columns,
+                          Index(f"ix_{name}_time_class", "timestamp", "object_class", "threat_level"))
+            self.partitions[day] = table
+        return table
+
+    async def _create_partition(self, conn, day: date):
+        if self.is_postgres:
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {self.partition_name(day)} PARTITION OF events "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+            ))
+            self.partitions[day] = Event.__table__
+        else:
+            table = self._partition_table(day)
+            await conn.run_sync(table.create, checkfirst=True)
+
+    async def ensure_partitions(self, days: Optional[List[date]] = None):
+        """Create partitions for `days` (default: today through precreate_days ahead)"""
+        if days is None:
+            today = datetime.utcnow().date()
+            days = [today + timedelta(days=i) for i in range(self.precreate_days + 1)]
+        missing = [day for day in days if day not in self.partitions]
+        if not missing:
+            return
+        for day in missing:
+            try:
+                async with self.engine.begin() as conn:
+                    await self._create_partition(conn, day)
+            except Exception as e:
+                # e.g. rows for that day already sit in the PostgreSQL default partition
+                logger.warning(f"⚠️  Partition {self.partition_name(day)} not created: {e}")
+                if self.is_postgres:
+                    self.partitions[day] = Event.__table__  # Rows keep going to the default partition
+
+    async def list_partitions(self, conn) -> List[date]:
+        if self.is_postgres:
+            result = await conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = 'events'::regclass"))
+        else:
+            result = await conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'events_p%'"))
+        days = []
+        for (name,) in result.fetchall():
+            match = PARTITION_RE.match(name)
+            if match:
+                days.append(datetime.strptime(match.group(1), "%Y%m%d").date())
+        return sorted(days)
+
+    # ------------------------------------------------------------------
+    # Writes (called by the persistence queue)
+    # ------------------------------------------------------------------
+
+    async def insert_events(self, db, rows: List[Dict]) -> List[int]:
+        """Bulk insert Event rows into their day partitions. Returns: ids in row order"""
+        await self.ensure_partitions(sorted({row["timestamp"].date() for row in rows}))
+        if self.is_postgres:
+            return list((await db.scalars(
+                insert(Event).returning(Event.id, sort_by_parameter_order=True), rows)).all())
+
+        ids: List[Optional[int]] = [None] * len(rows)
+        by_day: Dict[date, List[int]] = {}
+        for i, row in enumerate(rows):
+            by_day.setdefault(row["timestamp"].date(), []).append(i)
+        for day, positions in by_day.items():
+            table = self._partition_table(day)
+            day_ids = (await db.scalars(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True),
+                [rows[i] for i in positions])).all()
+            for position, event_id in zip(positions, day_ids):
+                ids[position] = event_id
+        return ids
+
+    # ------------------------------------------------------------------
+    # Rollups
+    # ------------------------------------------------------------------
+
+    def _minute_bucket(self, column):
+        if self.is_postgres:
+            return func.date_trunc("minute", column)
+        return func.strftime("%Y-%m-%d %H:%M:00", column)
+
+    async def rollup(self):
+        """Fold events in [watermark, now - rollup_lag) into minute and hour rollups"""
+        started = time.perf_counter()
+        upto = (datetime.utcnow() - timedelta(seconds=self.rollup_lag)).replace(second=0, microsecond=0)
+
+        async with self.engine.begin() as conn:
+            state = (await conn.execute(
+                select(RollupState.watermark).where(RollupState.name == "events"))).scalar_one_or_none()
+            partitions = await self.list_partitions(conn)
+            if state is None:
+                state = datetime.combine(partitions[0], datetime.min.time()) if partitions else upto
+            if state >= upto:
+                return
+
+            # Raw tables overlapping the window
+            if self.is_postgres:
+                tables = [Event.__table__]
+            else:
+                tables = [self._partition_table(day) for day in partitions
+                          if state.date() <= day <= upto.date()]
+
+            minute: Dict[tuple, list] = {}
+            for table in tables:
+                bucket = self._minute_bucket(table.c.timestamp).label("bucket")
+                query = (select(bucket, table.c.source, table.c.object_class, table.c.threat_level,
+                                func.count(), func.sum(table.c.confidence), func.max(table.c.confidence))
+                         .where(and_(table.c.timestamp >= state, table.c.timestamp < upto))
+                         .group_by(bucket, table.c.source, table.c.object_class, table.c.threat_level))
+                for row in (await conn.execute(query)).fetchall():
+                    bucket_start = row[0] if isinstance(row[0], datetime) else datetime.fromisoformat(row[0])
+                    key = (bucket_start, row[1] or "", row[2] or "", row[3] or "")
+                    totals = minute.setdefault(key, [0, 0.0, 0.0])
+                    totals[0] += row[4]
+                    totals[1] += row[5] or 0.0
+                    totals[2] = max(totals[2], row[6] or 0.0)
+
+            hour: Dict[tuple, list] = {}
+            for (bucket_start, *rest), (count, conf_sum, conf_max) in minute.items():
+                totals = hour.setdefault((bucket_start.replace(minute=0), *rest), [0, 0.0, 0.0])
+                totals[0] += count
+                totals[1] += conf_sum
+                totals[2] = max(totals[2], conf_max)
+
+            for granularity, buckets in (("minute", minute), ("hour", hour)):
+                if buckets:
+                    await self._upsert(conn, granularity, buckets)
+            await self._set_watermark(conn, upto)
+
+        self.rollup_runs += 1
+        self.events_rolled_up += sum(totals[0] for totals in minute.values())
+        self.last_rollup_ms = (time.perf_counter() - started) * 1000
+
+    async def _upsert(self, conn, granularity: str, buckets: Dict[tuple, list]):
+        table = EventRollup.__table__
+        rows = [{
+            "granularity": granularity, "bucket_start": bucket_start, "source": source,
+            "object_class": object_class, "threat_level": threat_level,
+            "count": count, "confidence_sum": conf_sum, "max_confidence": conf_max
+        } for (bucket_start, source, object_class, threat_level), (count, conf_sum, conf_max) in buckets.items()]
+
+        dialect_insert = pg_insert if self.is_postgres else sqlite_insert
+        greatest = func.greatest if self.is_postgres else func.max
+        statement = dialect_insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=["granularity", "bucket_start", "source", "object_class", "threat_level"],
+            set_={
+                "count": table.c.count + statement.excluded.count,
+                "confidence_sum": table.c.confidence_sum + statement.excluded.confidence_sum,
+                "max_confidence": greatest(table.c.max_confidence, statement.excluded.max_confidence)
+            }
+        )
+        await conn.execute(statement, rows)
+
+    async def _set_watermark(self, conn, watermark: datetime):
+        table = RollupState.__table__
+        dialect_insert = pg_insert if self.is_postgres else sqlite_insert
+        statement = dialect_insert(table).values(name="events", watermark=watermark)
+        await conn.execute(statement.on_conflict_do_update(
+            index_elements=["name"], set_={"watermark": statement.excluded.watermark}))
+
+    async def query_rollups(
+        self,
+        granularity: str = "minute",
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        source: Optional[str] = None,
+        object_class: Optional[str] = None,
+        threat_level: Optional[str] = None
+    ) -> List[Dict]:
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {list(GRANULARITIES)}")
+        end = end or datetime.utcnow()
+        start = start or end - (timedelta(hours=1) if granularity == "minute" else timedelta(days=1))
+
+        query = select(EventRollup).where(
+            EventRollup.granularity == granularity,
+            EventRollup.bucket_start >= start,
+            EventRollup.bucket_start < end
+        )
+        if source:
+            query = query.where(EventRollup.source == source)
+        if object_class:
+            query = query.where(EventRollup.object_class == object_class)
+        if threat_level:
+            query = query.where(EventRollup.threat_level == threat_level)
+
+        async with self.engine.connect() as conn:
+            rows = (await conn.execute(query.order_by(EventRollup.bucket_start))).mappings().all()
+        return [{
+            "bucket_start": row["bucket_start"].isoformat() if isinstance(row["bucket_start"], datetime) else row["bucket_start"],
+            "source": row["source"],
+            "object_class": row["object_class"],
+            "threat_level": row["threat_level"],
+            "count": row["count"],
+            "avg_confidence": round(row["confidence_sum"] / row["count"], 3) if row["count"] else None,
+            "max_confidence": row["max_confidence"]
+        } for row in rows]
+
+    # ------------------------------------------------------------------
+    # Retention
+    # ------------------------------------------------------------------
+
+    async def enforce_retention(self):
+        """Drop raw partitions older than retention_days; prune old minute rollups"""
+        today = datetime.utcnow().date()
+        cutoff = today - timedelta(days=self.retention_days)
+        async with self.engine.begin() as conn:
+            for day in await self.list_partitions(conn):
+                if day >= cutoff:
+                    continue
+                # The rollup job must have passed this day before its rows disappear
+                watermark = (await conn.execute(
+                    select(RollupState.watermark).where(RollupState.name == "events"))).scalar_one_or_none()
+                if watermark is None or watermark.date() <= day:
+                    continue
+                await conn.execute(text(f"DROP TABLE IF EXISTS {self.partition_name(day)}"))
+                self.partitions.pop(day, None)
+                self.partitions_dropped += 1
+                logger.info(f"🗑️  Dropped event partition {self.partition_name(day)}")
+
+            await conn.execute(EventRollup.__table__.delete().where(
+                EventRollup.granularity == "minute",
+                EventRollup.bucket_start < datetime.combine(today - timedelta(days=self.minute_rollup_days),
+                                                            datetime.min.time())
+            ))
+
+    # ------------------------------------------------------------------
+    # Background job
+    # ------------------------------------------------------------------
+
+    def start(self):
+        if self.task and not self.task.done():
+            return
+        self.task = asyncio.create_task(self._maintenance_loop())
+        logger.info(f"🗃️  Event store maintenance every {self.maintenance_interval}s "
+                    f"(retention {self.retention_days} days)")
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _maintenance_loop(self):
+        while True:
+            try:
+                await self.ensure_partitions()
+                await self.rollup()
+                await self.enforce_retention()
+                self.last_error = None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"❌ Event store maintenance failed: {e}")
+            await asyncio.sleep(self.maintenance_interval)
+
+    def get_stats(self) -> Dict:
+        return {
+            "dialect": self.dialect,
+            "partitions": sorted(self.partition_name(day) for day in self.partitions),
+            "retention_days": self.retention_days,
+            "rollup_runs": self.rollup_runs,
+            "events_rolled_up": self.events_rolled_up,
+            "partitions_dropped": self.partitions_dropped,
+            "last_rollup_ms": round(self.last_rollup_ms, 2),
+            "last_error": self.last_error
+        }
@@ -0,0 +1,502 @@
+"""
+Face Gallery - Persistent template cache and candidate index for FaceRecognizer
+Loading the watchlist used to decode every image and run the Haar cascade on
+it at startup and on every reload. The cache keeps the normalized templates
+on disk, keyed by image content hash, so only new or changed images are
+processed again:
+
+    assets/face_gallery/
+        manifest.json   [{file, size, mtime, hash}] in row order (+ rejected hashes)
+        templates.npy   float32 [n, 10000], zero-mean / unit-norm rows,
+                        memory-mapped read-only at load
+        ivf.npz         IVF index for the current gallery (large watchlists only)
+
+Files are written to a temp name and renamed, so a reader holding the previous
+memory map keeps a consistent (old) gallery.
+
+Past `ann_threshold` identities, lookups go through an IVF (inverted file)
+index: rows are clustered around `nlist` centroids and a probe is only scored
+against the rows of its `nprobe` closest clusters.
+
+At runtime the recognizer reads one immutable GallerySnapshot per lookup;
+add/remove build a new snapshot and swap the reference, and a
+DirectoryWatcher picks up images dropped into the directory out of band.
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+IMAGE_EXTENSIONS = (".jpg", ".png", ".jpeg")
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def gallery_fingerprint(hashes: List[str]) -> str:
+    """Identifies one exact gallery (content and row order)"""
+    return hashlib.sha1("\n".join(hashes).encode()).hexdigest()
+
+
+# ==============================================================================
+# TEMPLATE CACHE
+# ==============================================================================
+
+class FaceGalleryCache:
+    def __init__(self, cache_dir: str = "assets/face_gallery", dim: int = 10000):
+        self.cache_dir = cache_dir
+        self.dim = dim
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        self.templates_path = os.path.join(cache_dir, "templates.npy")
+        self.index_path = os.path.join(cache_dir, "ivf.npz")
+
+        self.hits = 0
+        self.processed = 0
+        self.rejected = 0
+        self.last_sync_ms = 0.0
+
+    def _load(self) -> Tuple[List[Dict], set, Optional[np.ndarray]]:
+        """Cached entries, rejected hashes and the memory-mapped templates (or empty on any mismatch)"""
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            templates = np.load(self.templates_path, mmap_mode="r")
+            entries = manifest["entries"]
+            if (manifest.get("version") != MANIFEST_VERSION or templates.dtype != np.float32
+                    or templates.shape != (len(entries), self.dim)):
+                raise ValueError("manifest does not match templates")
+            return entries, set(manifest.get("rejected", [])), templates
+        except FileNotFoundError:
+            return [], set(), None
+        except Exception as e:
+            logger.warning(f"⚠️  Face gallery cache unreadable, rebuilding: {e}")
+            return [], set(), None
+
+    def sync(self, directory: str, extract: Callable[[str], Optional[np.ndarray]]):
+        """
+        Bring the cache up to date with the images in `directory`.
+        `extract(path)` returns a normalized template or None (no face); it is
+        only called for images whose content is not cached yet.
+        Returns: (files, hashes, templates) with templates memory-mapped
+        """
+        started = time.perf_counter()
+        self.hits = self.processed = self.rejected = 0  # Stats describe the last sync
+        entries, rejected, templates = self._load()
+        cached_stat = {e["file"]: e for e in entries}
+        cached_row = {e["hash"]: row for row, e in enumerate(entries)}
+
+        files = sorted(f for f in os.listdir(directory) if f.endswith(IMAGE_EXTENSIONS)) \
+            if os.path.isdir(directory) else []
+
+        new_entries, rows, fresh = [], [], {}
+        for filename in files:
+            path = os.path.join(directory, filename)
+            stat = os.stat(path)
+            previous = cached_stat.get(filename)
+            if previous and previous["size"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+                digest = previous["hash"]  # Unchanged file: skip re-hashing
+            else:
+                digest = file_hash(path)
+
+            if digest in cached_row:
+                self.hits += 1
+                rows.append(("cached", cached_row[digest]))
+            elif digest in fresh:
+                rows.append(("fresh", digest))
+            elif digest in rejected:
+                continue
+            else:
+                template = extract(path)
+                self.processed += 1
+                if template is None:
+                    rejected.add(digest)
+                    self.rejected += 1
+                    continue
+                fresh[digest] = template
+                rows.append(("fresh", digest))
+            new_entries.append({"file": filename, "size": stat.st_size, "mtime": stat.st_mtime, "hash": digest})
+
+        hashes = [e["hash"] for e in new_entries]
+        if templates is not None and hashes == [e["hash"] for e in entries]:
+            self._write_manifest(new_entries, rejected)  # Only stat info / rejected set may differ
+        else:
+            matrix = np.empty((len(rows), self.dim), dtype=np.float32)
+            for i, (kind, ref) in enumerate(rows):
+                matrix[i] = templates[ref] if kind == "cached" else fresh[ref]
+            self._write_templates(matrix)
+            self._write_manifest(new_entries, rejected)
+            templates = np.load(self.templates_path, mmap_mode="r")
+
+        self.last_sync_ms = (time.perf_counter() - started) * 1000
+        return [e["file"] for e in new_entries], hashes, templates
+
+    def _write_templates(self, matrix: np.ndarray):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self.templates_path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp, self.templates_path)
+
+    def _write_manifest(self, entries: List[Dict], rejected: set):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": entries, "rejected": sorted(rejected)}, f)
+        os.replace(tmp, self.manifest_path)
+
+    def index(self, templates: np.ndarray, fingerprint: str, nprobe: int = 8,
+              retrain_ratio: float = 1.25) -> "IVFIndex":
+        """
+        IVF index for `templates`: the saved one if it was built for this exact
+        gallery, else the saved centroids with rows re-assigned (cheap), else a
+        fresh k-means once the gallery size drifted by more than `retrain_ratio`.
+        """
+        saved = IVFIndex.load(self.index_path, nprobe=nprobe)
+        if saved and saved.fingerprint == fingerprint:
+            return saved
+        n = len(templates)
+        if saved and 1 / retrain_ratio <= n / saved.trained_rows <= retrain_ratio:
+            index = IVFIndex.from_centroids(templates, saved.centroids, nprobe, trained_rows=saved.trained_rows)
+        else:
+            started = time.perf_counter()
+            index = IVFIndex.build(templates, nprobe=nprobe)
+            logger.info(f"🗂️  Face index trained: {index.nlist} lists over {n} faces "
+                        f"in {time.perf_counter() - started:.1f}s")
+        index.fingerprint = fingerprint
+        os.makedirs(self.cache_dir, exist_ok=True)
+        index.save(self.index_path)
+        return index
+
+    def get_stats(self) -> Dict:
+        return {
+            "cache_hits": self.hits,
+            "processed": self.processed,
+            "rejected": self.rejected,
+            "last_sync_ms": round(self.last_sync_ms, 2)
+        }
+
+
+# ==============================================================================
+# IVF INDEX
+# ==============================================================================
+
+class IVFIndex:
+    """
+    Inverted-file index over unit-norm rows (inner product = correlation).
+    Lists are stored CSR-style: the row ids of list j are
+    order[offsets[j]:offsets[j + 1]].
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, nprobe: int = 8,
+                 trained_rows: int = 0, fingerprint: str = ""):
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.nprobe = nprobe
+        self.trained_rows = trained_rows or len(order)  # Gallery size the centroids were trained on
+        self.fingerprint = fingerprint
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @staticmethod
+    def default_nlist(n: int, nprobe: int) -> int:
+        # Balances centroid scoring (nlist rows) against list scanning (nprobe * n / nlist rows)
+        return max(1, min(n, int(math.sqrt(n * nprobe))))
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, nlist: Optional[int] = None, nprobe: int = 8,
+              iterations: int = 10, sample: int = 64, seed: int = 0) -> "IVFIndex":
+        """Spherical k-means on a sample of `sample * nlist` rows, then assign every row"""
+        n = len(matrix)
+        nlist = nlist or cls.default_nlist(n, nprobe)
+        rng = np.random.default_rng(seed)
+        training = np.asarray(matrix[np.sort(rng.choice(n, min(n, sample * nlist), replace=False))])
+
+        centroids = training[rng.choice(len(training), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(training @ centroids.T, axis=1)
+            members = np.zeros((nlist, len(training)), dtype=np.float32)
+            members[assign, np.arange(len(training))] = 1
+            sums = members @ training  # Per-cluster sums as one GEMM
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            centroids = np.where(empty[:, None], centroids, sums / np.maximum(norms, 1e-12))
+        return cls.from_centroids(matrix, centroids.astype(np.float32), nprobe)
+
+    @classmethod
+    def from_centroids(cls, matrix: np.ndarray, centroids: np.ndarray, nprobe: int = 8,
+                       trained_rows: int = 0, chunk: int = 4096) -> "IVFIndex":
+        """Assign every row to its closest centroid (chunked; matrix may be memory-mapped)"""
+        assign = np.empty(len(matrix), dtype=np.int32)
+        for start in range(0, len(matrix), chunk):
+            assign[start:start + chunk] = np.argmax(matrix[start:start + chunk] @ centroids.T, axis=1)
+        return cls.from_assignments(centroids, assign, nprobe, trained_rows)
+
+    @classmethod
+    def from_assignments(cls, centroids: np.ndarray, assign: np.ndarray, nprobe: int = 8,
+                         trained_rows: int = 0) -> "IVFIndex":
+        order = np.argsort(assign, kind="stable").astype(np.int32)
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=len(centroids)), out=offsets[1:])
+        return cls(centroids, order, offsets, nprobe, trained_rows)
+
+    def assignments(self) -> np.ndarray:
+        """List id of every row"""
+        assign = np.empty(len(self.order), dtype=np.int32)
+        assign[self.order] = np.repeat(np.arange(self.nlist, dtype=np.int32), np.diff(self.offsets))
+        return assign
+
+    def extended(self, vectors: np.ndarray) -> "IVFIndex":
+        """Copy with `vectors` appended as the next row ids (centroids unchanged)"""
+        added = np.argmax(vectors @ self.centroids.T, axis=1).astype(np.int32)
+        return self.from_assignments(self.centroids, np.concatenate([self.assignments(), added]),
+                                     self.nprobe, self.trained_rows)
+
+    def without(self, row: int) -> "IVFIndex":
+        """Copy with `row` removed; later row ids shift down by one"""
+        return self.from_assignments(self.centroids, np.delete(self.assignments(), row),
+                                     self.nprobe, self.trained_rows)
+
+    def search(self, matrix: np.ndarray, probe: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k rows for a normalized probe. Returns: (row ids, scores) best first"""
+        centroid_scores = self.centroids @ probe
+        nprobe = min(self.nprobe, self.nlist)
+        lists = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        candidates = np.concatenate([self.order[self.offsets[j]:self.offsets[j + 1]] for j in lists])
+        if len(candidates) == 0:
+            return candidates, np.zeros(0, dtype=np.float32)
+        candidates.sort()  # Sequential reads from the memory map
+        scores = matrix[candidates] @ probe
+
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+        top = top[np.argsort(-scores[top])]
+        return candidates[top], scores[top]
+
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets,
+                     trained_rows=self.trained_rows, fingerprint=np.array(self.fingerprint))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, nprobe: int = 8) -> Optional["IVFIndex"]:
+        try:
+            with np.load(path) as data:
+                return cls(data["centroids"], data["order"], data["offsets"], nprobe,
+                           int(data["trained_rows"]), str(data["fingerprint"]))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️  Face index unreadable, rebuilding: {e}")
+            return None
+
+
+# ==============================================================================
+# SNAPSHOTS
+# ==============================================================================
+
+class GallerySnapshot:
+    """
+    Immutable view of the watchlist: row i of `gallery` is `files[i]`.
+    Readers take `recognizer.snapshot` once per lookup; updates build a new
+    snapshot and swap the reference, so a lookup never sees a half-applied
+    change and never waits for one.
+
+    Rows are kept in a buffer with spare capacity. Appending writes the row
+    just past the end of every existing view of that buffer, so add() does
+    not copy the gallery; only the newest snapshot of a buffer appends in
+    place (updates are serialized by the owner).
+    """
+    __slots__ = ("files", "names", "hashes", "gallery", "index", "_buffer", "_tail")
+
+    def __init__(self, files, names, hashes, gallery: np.ndarray, index: Optional[IVFIndex] = None,
+                 buffer: Optional[np.ndarray] = None, tail: Optional[list] = None):
+        self.files = tuple(files)
+        self.names = tuple(names)
+        self.hashes = tuple(hashes)
+        self.gallery = gallery
+        self.index = index
+        self._buffer = buffer
+        self._tail = tail  # [rows used in buffer], shared by the snapshots of one buffer
+
+    @classmethod
+    def empty(cls, dim: int) -> "GallerySnapshot":
+        return cls((), (), (), np.zeros((0, dim), dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def with_index(self, index: Optional[IVFIndex]) -> "GallerySnapshot":
+        return GallerySnapshot(self.files, self.names, self.hashes, self.gallery, index, self._buffer, self._tail)
+
+    def with_row(self, file: str, name: str, digest: str, template: np.ndarray) -> "GallerySnapshot":
+        """Copy with `file` added (or replaced, moving it to the end)"""
+        base = self.without(file) if file in self.files else self
+        n, dim = base.gallery.shape
+        buffer, tail = base._buffer, base._tail
+        if buffer is None or tail[0] != n or n == len(buffer):
+            buffer = np.empty((max(16, n + n // 4 + 1), dim), dtype=np.float32)
+            buffer[:n] = base.gallery
+            tail = [n]
+        buffer[n] = template
+        tail[0] = n + 1
+        gallery = buffer[:n + 1]
+        gallery.flags.writeable = False
+        index = base.index.extended(template[None, :]) if base.index is not None else None
+        return GallerySnapshot(base.files + (file,), base.names + (name,), base.hashes + (digest,),
+                               gallery, index, buffer, tail)
+
+    def without(self, file: str) -> "GallerySnapshot":
+        """Copy with `file` removed (copies the remaining rows)"""
+        row = self.files.index(file)
+        gallery = np.delete(self.gallery, row, axis=0)
+        gallery.flags.writeable = False
+        index = self.index.without(row) if self.index is not None else None
+        def drop(values: tuple) -> tuple:
+            return values[:row] + values[row + 1:]
+        return GallerySnapshot(drop(self.files), drop(self.names), drop(self.hashes), gallery, index)
+
+    @property
+    def fingerprint(self) -> str:
+        return gallery_fingerprint(list(self.hashes))
+
+
+# ==============================================================================
+# DIRECTORY WATCHER
+# ==============================================================================
+
+class DirectoryWatcher:
+    """
+    Polls a directory for images added, replaced or deleted out of band.
+    A new or modified file is reported once its size and mtime held still
+    for one poll, so half-copied files are skipped. Changes made through
+    the API call mark()/forget() so they are not reported a second time.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        on_added: Callable[[str], object],
+        on_removed: Callable[[str], object],
+        interval: float = 2.0
+    ):
+        self.directory = directory
+        self.on_added = on_added      # Called with the file path
+        self.on_removed = on_removed  # Called with the file name
+        self.interval = interval
+
+        self.seen: Dict[str, Tuple[int, float]] = {}
+        self.pending: Dict[str, Tuple[int, float]] = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+        self.added = 0
+        self.removed = 0
+
+    def _scan(self) -> Dict[str, Tuple[int, float]]:
+        current = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.name.endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                        stat = entry.stat()
+                        current[entry.name] = (stat.st_size, stat.st_mtime)
+        except FileNotFoundError:
+            pass
+        return current
+
+    def mark(self, filename: str):
+        """Record the file's current state as already handled"""
+        try:
+            stat = os.stat(os.path.join(self.directory, filename))
+        except FileNotFoundError:
+            return
+        with self.lock:
+            self.seen[filename] = (stat.st_size, stat.st_mtime)
+            self.pending.pop(filename, None)
+
+    def forget(self, filename: str):
+        with self.lock:
+            self.seen.pop(filename, None)
+            self.pending.pop(filename, None)
+
+    def poll(self):
+        """One scan; calls the callbacks for settled changes"""
+        current = self._scan()
+        added = []
+        with self.lock:
+            for filename, stat in current.items():
+                if self.seen.get(filename) == stat:
+                    continue
+                if self.pending.get(filename) != stat:
+                    self.pending[filename] = stat  # Report once it stops changing
+                    continue
+                del self.pending[filename]
+                self.seen[filename] = stat
+                added.append(filename)
+            removed = [filename for filename in self.seen if filename not in current]
+            for filename in removed:
+                del self.seen[filename]
+            for filename in [f for f in self.pending if f not in current]:
+                del self.pending[filename]
+
+        for filename in added:
+            self.added += 1
+            self.on_added(os.path.join(self.directory, filename))
+        for filename in removed:
+            self.removed += 1
+            self.on_removed(filename)
+
+    def start(self):
+        """Start polling; files present now are the baseline"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.seen = self._scan()
+        self.pending = {}
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        logger.info(f"👀 Watching {self.directory} every {self.interval}s")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=self.interval + 1.0)
+            self.thread = None
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"❌ Directory watcher error: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            "running": bool(self.thread and self.thread.is_alive()),
+            "interval": self.interval,
+            "added": self.added,
+            "removed": self.removed,
+            "pending": len(self.pending)
+        }
@@ -0,0 +1,129 @@
+"""
+Frame Ring - Preallocated capture buffers
+Capture decodes straight into a fixed set of frame buffers; readers get
+read-only views instead of copies. A view of frame `seq` stays valid while
+at most `slots - 2` newer frames have been committed: the slot after the
+newest one may already be being written. A held frame (`hold`) is never
+written over: the writer moves on to a spare buffer for that slot instead.
+"""
+
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+def _read_only(buffer: np.ndarray) -> np.ndarray:
+    view = buffer.view()
+    view.flags.writeable = False
+    return view
+
+
+class FrameRing:
+    """
+    Single-writer ring of frame buffers with sequence numbers and capture
+    timestamps. Not locked: the owner (ThreadedCamera) serializes `commit`
+    against its readers.
+    """
+
+    def __init__(self, slots: int = 4):
+        self.slots = max(2, slots)
+        self.buffers = [None] * self.slots
+        self.seqs = [0] * self.slots
+        self.timestamps = [0.0] * self.slots
+        self.seq = 0  # Latest committed sequence number (0 = empty)
+        self.holds = {}  # seq -> [hold count, held buffer]
+        self.spare = None  # Released buffer that was swapped out while held
+
+    def _slot(self, seq: int) -> int:
+        return seq % self.slots
+
+    def next_buffer(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        Writable buffer for the next frame. The whole ring is reallocated
+        only when the frame geometry changes; views handed out earlier keep
+        the old buffers alive.
+        """
+        slot = self._slot(self.seq + 1)
+        buffer = self.buffers[slot]
+        if self.seqs[slot] in self.holds:
+            # Still held by a reader: leave it alone and write into the spare
+            buffer, self.spare = self.spare, None
+            self.buffers[slot] = buffer
+        if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+            if buffer is not None:
+                self.buffers = [None] * self.slots
+            buffer = self.buffers[slot] = np.empty(shape, dtype)
+        return buffer
+
+    def commit(self, frame: Optional[np.ndarray] = None, timestamp: Optional[float] = None) -> int:
+        """
+        Publish the buffer returned by `next_buffer`.
+        Args:
+            frame: Adopt an already-decoded array (or encoded bytes, decoded
+                   lazily by the reader) as the next slot instead
+        """
+        seq = self.seq + 1
+        slot = self._slot(seq)
+        if frame is not None:
+            self.buffers[slot] = frame
+        self.seqs[slot] = seq
+        self.timestamps[slot] = timestamp if timestamp is not None else time.time()
+        self.seq = seq
+        return seq
+
+    def is_valid(self, seq: int) -> bool:
+        """True while frame `seq` has not been (and is not being) overwritten"""
+        return 0 < seq <= self.seq and self.seq - seq < self.slots - 1
+
+    def get(self, seq: int):
+        """
+        Read-only view of frame `seq`, or None once the ring has wrapped past it.
+        Adopted non-array slots (encoded bytes) are returned as stored.
+        """
+        if not self.is_valid(seq):
+            return None
+        item = self.buffers[self._slot(seq)]
+        return _read_only(item) if isinstance(item, np.ndarray) else item
+
+    def replace(self, seq: int, frame: np.ndarray) -> bool:
+        """Swap the contents of slot `seq` (e.g. after a lazy decode) if it is still current"""
+        if not self.is_valid(seq):
+            return False
+        self.buffers[self._slot(seq)] = frame
+        return True
+
+    def hold(self, seq: int):
+        """
+        Like `get`, but frame `seq` stays intact until `release(seq)` however
+        far the ring moves on. No copy is made.
+        """
+        item = self.get(seq)
+        if item is not None:
+            entry = self.holds.setdefault(seq, [0, self.buffers[self._slot(seq)]])
+            entry[0] += 1
+        return item
+
+    def release(self, seq: int):
+        entry = self.holds.get(seq)
+        if entry is None:
+            return
+        entry[0] -= 1
+        if entry[0] > 0:
+            return
+        del self.holds[seq]
+        buffer = entry[1]
+        # Swapped out of the ring while held: keep it for the next swap
+        if isinstance(buffer, np.ndarray) and buffer is not self.buffers[self._slot(seq)]:
+            self.spare = buffer
+
+    def latest(self) -> Tuple[Optional[np.ndarray], int, float]:
+        """(read-only view, seq, capture timestamp) of the newest frame"""
+        if self.seq == 0:
+            return None, 0, 0.0
+        slot = self._slot(self.seq)
+        return _read_only(self.buffers[slot]), self.seq, self.timestamps[slot]
+
+    @property
+    def latest_timestamp(self) -> float:
+        return self.timestamps[self._slot(self.seq)] if self.seq else 0.0
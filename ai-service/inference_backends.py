@@ -0,0 +1,300 @@
+"""
+Inference Backends - Exported CPU runtimes for YOLO detectors
+Runs exported YOLO models through ONNX Runtime, OpenVINO or OpenCV DNN
+instead of PyTorch eager mode.
+
+- Exported artifacts are cached next to the weights and only rebuilt when
+  the weights change (tracked in a `<weights>.export.json` sidecar)
+- Pre/post-processing is pure numpy + OpenCV, so an inference-only host can
+  run without importing torch or ultralytics once the artifact exists
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Backend name -> ultralytics export format
+BACKEND_FORMATS = {
+    "onnxruntime": "onnx",
+    "opencv_dnn": "onnx",
+    "openvino": "openvino",
+}
+
+
+class BackendResult:
+    """Detections for one frame, in original frame pixel coordinates"""
+    __slots__ = ("xyxy", "conf", "cls", "names")
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray, names: Dict[int, str]):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+        self.names = names
+
+
+# ==============================================================================
+# EXPORT CACHE
+# ==============================================================================
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sidecar_path(weights_path: str) -> Path:
+    return Path(weights_path).with_suffix(".export.json")
+
+
+def _read_sidecar(weights_path: str) -> Dict:
+    path = _sidecar_path(weights_path)
+    if path.exists():
+        try:
+            return json.loads(path.read_text())
+        except Exception as e:
+            logger.warning(f"⚠️  Ignoring unreadable export cache {path}: {e}")
+    return {}
+
+
+def _weights_fingerprint(weights_path: str, cached: Optional[Dict]) -> Optional[str]:
+    """sha256 of the weights; skips re-hashing when size and mtime are unchanged"""
+    if not os.path.exists(weights_path):
+        return None
+    stat = os.stat(weights_path)
+    if cached and cached.get("weights_size") == stat.st_size and cached.get("weights_mtime") == stat.st_mtime:
+        return cached.get("weights_sha256")
+    return file_sha256(weights_path)
+
+
+def find_cached_export(weights_path: str, fmt: str, imgsz: int) -> Optional[Dict]:
+    """
+    Return the cached export entry for `fmt` if it is still valid.
+    When the weights file is absent (inference-only deployment) the artifact
+    is trusted as shipped.
+    """
+    entry = _read_sidecar(weights_path).get(fmt)
+    if not entry or entry.get("imgsz") != imgsz or not os.path.exists(entry.get("artifact", "")):
+        return None
+
+    fingerprint = _weights_fingerprint(weights_path, entry)
+    if fingerprint is not None and fingerprint != entry.get("weights_sha256"):
+        logger.info(f"🔄 Weights changed since last {fmt} export")
+        return None
+    return entry
+
+
+def export_model(yolo_model, weights_path: str, fmt: str, imgsz: int = 640) -> Dict:
+    """
+    Export an ultralytics model (already loaded) to `fmt`, reusing the cached
+    artifact when the weights have not changed.
+
+    Returns: sidecar entry {"artifact", "names", "imgsz", "weights_sha256", ...}
+    """
+    cached = find_cached_export(weights_path, fmt, imgsz)
+    if cached:
+        logger.info(f"✅ Using cached {fmt} export: {cached['artifact']}")
+        return cached
+
+    logger.info(f"📦 Exporting {weights_path} to {fmt} (imgsz={imgsz})...")
+    artifact = yolo_model.export(format=fmt, imgsz=imgsz, dynamic=(fmt == "onnx"), verbose=False)
+
+    stat = os.stat(weights_path) if os.path.exists(weights_path) else None
+    entry = {
+        "artifact": str(artifact),
+        "format": fmt,
+        "imgsz": imgsz,
+        "names": {int(k): v for k, v in yolo_model.names.items()},
+        "weights_sha256": file_sha256(weights_path) if stat else None,
+        "weights_size": stat.st_size if stat else None,
+        "weights_mtime": stat.st_mtime if stat else None,
+    }
+
+    update_export_cache(weights_path, fmt, entry)
+    logger.info(f"✅ Exported {fmt} artifact: {artifact}")
+    return entry
+
+
+def update_export_cache(weights_path: str, key: str, entry: Dict):
+    """Record an artifact built from `weights_path` in its sidecar"""
+    sidecar = _read_sidecar(weights_path)
+    sidecar[key] = entry
+    _sidecar_path(weights_path).write_text(json.dumps(sidecar, indent=2))
+
+
+# ==============================================================================
+# RUNTIMES
+# ==============================================================================
+
+def letterbox_batch(frames: List[np.ndarray], size: int) -> Tuple[np.ndarray, List[Tuple]]:
+    """
+    Letterbox each frame to size x size, BGR->RGB, NCHW float32 in [0, 1]
+    Returns: (blob, [(scale, pad_x, pad_y, orig_w, orig_h), ...])
+    """
+    blob = np.full((len(frames), size, size, 3), 114, np.uint8)
+    transforms = []
+    for i, frame in enumerate(frames):
+        h, w = frame.shape[:2]
+        scale = min(size / h, size / w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+        resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        blob[i, pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+        transforms.append((scale, pad_x, pad_y, w, h))
+
+    blob = blob[..., ::-1].transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(blob, dtype=np.float32) / 255.0, transforms
+
+
+class ExportedBackend:
+    """
+    Shared letterbox pre-processing and YOLO output decoding.
+    Subclasses implement `_forward(blob) -> np.ndarray`.
+    """
+    name = "base"
+    supports_batch = True
+
+    def __init__(
+        self,
+        artifact: str,
+        names: Dict,
+        imgsz: int = 640,
+        conf: float = 0.5,
+        iou: float = 0.45,
+        max_det: int = 300
+    ):
+        self.artifact = artifact
+        self.names = {int(k): v for k, v in names.items()}
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.max_det = max_det
+
+    def __call__(self, frames: List[np.ndarray]) -> List[BackendResult]:
+        if not self.supports_batch and len(frames) > 1:
+            return [self(frames[i:i + 1])[0] for i in range(len(frames))]
+
+        blob, transforms = self.preprocess(frames)
+        output = self._forward(blob)
+        return [
+            self.postprocess(output[i], transforms[i])
+            for i in range(len(frames))
+        ]
+
+    def _forward(self, blob: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def preprocess(self, frames: List[np.ndarray]) -> Tuple[np.ndarray, List[Tuple]]:
+        return letterbox_batch(frames, self.imgsz)
+
+    def postprocess(self, output: np.ndarray, transform: Tuple) -> BackendResult:
+        """
+        Decode one image's raw output.
+        - End-to-end (NMS-free) heads: [max_det, 6] = x1, y1, x2, y2, conf, cls
+        - Classic YOLOv8 heads: [4 + num_classes, anchors] -> class-aware NMS
+        """
+        scale, pad_x, pad_y, w, h = transform
+
+        if output.ndim == 2 and output.shape[1] == 6:
+            keep = output[:, 4] >= self.conf
+            xyxy = output[keep, :4].astype(np.float32)
+            conf = output[keep, 4].astype(np.float32)
+            cls = output[keep, 5].astype(np.int64)
+        else:
+            preds = output.T  # [anchors, 4 + nc]
+            scores = preds[:, 4:]
+            cls = scores.argmax(axis=1)
+            conf = scores[np.arange(len(scores)), cls]
+            keep = conf >= self.conf
+            preds, cls, conf = preds[keep], cls[keep], conf[keep].astype(np.float32)
+
+            cx, cy, bw, bh = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+            xyxy = np.stack([cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2], axis=1).astype(np.float32)
+
+            if len(xyxy):
+                # Offset boxes per class so a single NMS call stays class-aware
+                offset = (cls * 4096.0)[:, None]
+                shifted = xyxy + offset
+                rects = np.concatenate([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]], axis=1)
+                idx = cv2.dnn.NMSBoxes(rects.tolist(), conf.tolist(), self.conf, self.iou)
+                idx = np.array(idx, dtype=np.int64).reshape(-1)[:self.max_det]
+                xyxy, conf, cls = xyxy[idx], conf[idx], cls[idx]
+
+        # Undo letterbox
+        if len(xyxy):
+            xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - pad_x) / scale).clip(0, w)
+            xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - pad_y) / scale).clip(0, h)
+        return BackendResult(xyxy, conf, cls.astype(np.int64), self.names)
+
+
+class OnnxRuntimeBackend(ExportedBackend):
+    name = "onnxruntime"
+
+    def __init__(self, artifact: str, names: Dict, **kwargs):
+        super().__init__(artifact, names, **kwargs)
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(artifact, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        # Static-shape exports only accept batch 1
+        self.supports_batch = not isinstance(self.session.get_inputs()[0].shape[0], int)
+
+    def _forward(self, blob: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVINOBackend(ExportedBackend):
+    name = "openvino"
+
+    def __init__(self, artifact: str, names: Dict, **kwargs):
+        super().__init__(artifact, names, **kwargs)
+        import openvino as ov
+        path = Path(artifact)
+        xml = next(path.glob("*.xml")) if path.is_dir() else path
+        core = ov.Core()
+        model = core.read_model(str(xml))
+        self.supports_batch = model.inputs[0].get_partial_shape()[0].is_dynamic
+        self.compiled = core.compile_model(model, "CPU", {"PERFORMANCE_HINT": "LATENCY"})
+        self.output = self.compiled.output(0)
+
+    def _forward(self, blob: np.ndarray) -> np.ndarray:
+        return self.compiled([blob])[self.output]
+
+
+class OpenCVDNNBackend(ExportedBackend):
+    name = "opencv_dnn"
+    supports_batch = False  # Dynamic batch ONNX graphs are unreliable in cv2.dnn
+
+    def __init__(self, artifact: str, names: Dict, **kwargs):
+        super().__init__(artifact, names, **kwargs)
+        self.net = cv2.dnn.readNetFromONNX(artifact)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def _forward(self, blob: np.ndarray) -> np.ndarray:
+        self.net.setInput(blob)
+        return self.net.forward()
+
+
+BACKENDS = {
+    "onnxruntime": OnnxRuntimeBackend,
+    "openvino": OpenVINOBackend,
+    "opencv_dnn": OpenCVDNNBackend,
+}
+
+
+def load_backend(backend: str, entry: Dict, conf: float = 0.5) -> ExportedBackend:
+    """Instantiate a runtime for a cached export entry"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}. Available: {list(BACKENDS)}")
+    return BACKENDS[backend](entry["artifact"], entry["names"], imgsz=entry["imgsz"], conf=conf)
@@ -1,27 +1,33 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import asyncio
 import json
-import cv2
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import time
 import uvicorn
 from fastapi.responses import StreamingResponse
-import io
 
 from mock_detector import MockDetector, ThreatLevel
 from model_manager import get_model_manager, ModelType
 from mock_fusion import MockFusionEngine
 from prediction_engine import ThreatPredictor
+from compute_executor import ComputeExecutor, ExecutorOverloaded
+from connection_manager import ConnectionManager
+from persistence import PersistenceQueue, event_row, alert_row
+from event_store import EventStore
+from detection_log import DetectionLog
+from mjpeg_broadcaster import MJPEGBroadcaster, BOUNDARY as MJPEG_BOUNDARY
 
 # Try to import Vision Engine
 try:
     from vision_engine import VisionEngine
+    from camera_pool import CameraPool, parse_video_sources
     VISION_AVAILABLE = True
 except ImportError:
     VisionEngine = None
+    CameraPool = None
     VISION_AVAILABLE = False
     print("⚠️  Vision Engine not available - using mock detector")
     print("💡 Install: pip install ultralytics opencv-python")
@@ -58,80 +64,86 @@ except ValueError:
 # Fallback for some systems if needed, but prioritizing env var
 if VIDEO_SOURCE == "0": VIDEO_SOURCE = 0
 
+# Multi-camera: VIDEO_SOURCES="gate=http://10.0.0.5:8080/video,lobby=0,..."
+# All cameras share one model; frames are batched CAMERA_BATCH_SIZE at a time
+VIDEO_SOURCES = {}
+if VISION_AVAILABLE and os.getenv("VIDEO_SOURCES"):
+    VIDEO_SOURCES = parse_video_sources(os.getenv("VIDEO_SOURCES"))
+    if VIDEO_SOURCES:
+        VIDEO_SOURCE = next(iter(VIDEO_SOURCES.values()))
+PERFORMANCE_CONFIG = get_model_manager().config.get("performance", {})
+FACE_CONFIG = get_model_manager().config.get("face_recognition", {})
+CAMERA_BATCH_SIZE = int(os.getenv(
+    "CAMERA_BATCH_SIZE",
+    get_model_manager().config["models"].get("yolo26", {}).get("batch_size", 8)
+))
+
 # Global instances
 detector = MockDetector(frame_width=1280, frame_height=720)
 fusion_engine = MockFusionEngine()
 predictor = ThreatPredictor()
 vision_engine = None
+camera_pool = None  # Set when more than one camera is configured
 using_real_vision = False
 model_manager = None  # Will be initialized on startup
 
+# All CPU-heavy work in request handlers goes through this executor
+compute = ComputeExecutor(**get_model_manager().config.get("executor", {}))
+
+# Every detection from every camera, for forensic search (fed by the inference
+# loops, so detections are logged whether or not anyone is watching the stream)
+DETECTION_LOG_CONFIG = dict(get_model_manager().config.get("detection_log", {}))
+detection_log = DetectionLog(**DETECTION_LOG_CONFIG) if DETECTION_LOG_CONFIG.pop("enabled", True) else None
+
 print(f"🔧 CONFIG: VISION_AVAILABLE={VISION_AVAILABLE}", flush=True)
 print(f"🔧 CONFIG: VIDEO_SOURCE={VIDEO_SOURCE}", flush=True)
 
+def start_vision():
+    """Create and start the VisionEngine, plus a CameraPool for multi-camera sites"""
+    global vision_engine, camera_pool
+    if len(VIDEO_SOURCES) > 1:
+        primary_id, primary_source = next(iter(VIDEO_SOURCES.items()))
+        vision_engine = VisionEngine(
+            source=primary_source, camera_id=primary_id,
+            performance_config=PERFORMANCE_CONFIG, face_config=FACE_CONFIG, detection_log=detection_log
+        )
+        camera_pool = CameraPool(vision_engine, VIDEO_SOURCES, batch_size=CAMERA_BATCH_SIZE)
+        camera_pool.start()
+    else:
+        vision_engine = VisionEngine(
+            source=VIDEO_SOURCE, performance_config=PERFORMANCE_CONFIG, face_config=FACE_CONFIG,
+            detection_log=detection_log
+        )
+        vision_engine.start()
+
+def get_result_stream():
+    """Publisher the stream should follow: every camera in pool mode, else the single engine"""
+    return camera_pool.all_results if camera_pool else vision_engine.results
+
 if VISION_AVAILABLE:
     try:
         print("🚀 Initializing Vision Engine...", flush=True)
-        vision_engine = VisionEngine(source=VIDEO_SOURCE)
-        vision_engine.start()
+        start_vision()
         using_real_vision = True
         print("✅ Vision Engine Started", flush=True)
     except Exception as e:
          print(f"❌ Failed to start Vision Engine: {e}", flush=True)
          using_real_vision = False
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-    
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        print(f"✅ Client connected. Total: {len(self.active_connections)}")
-    
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-        print(f"❌ Client disconnected. Total: {len(self.active_connections)}")
-    
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting: {e}")
+WEBSOCKET_CONFIG = dict(get_model_manager().config.get("websocket", {}))
+WS_PER_MESSAGE_DEFLATE = WEBSOCKET_CONFIG.pop("per_message_deflate", True)
+manager = ConnectionManager(**WEBSOCKET_CONFIG)
 
-manager = ConnectionManager()
+# Daily event partitions, rollups and retention
+event_store = EventStore(**get_model_manager().config.get("event_store", {}))
 
-async def persist_alert(detection: dict, alert_data: dict):
-    """Save critical alert to database"""
-    try:
-        from database import AsyncSessionLocal, Event, Alert
-        async with AsyncSessionLocal() as db:
-            # Create Event Record
-            event = Event(
-                timestamp=datetime.fromisoformat(detection["timestamp"]),
-                frame_id=detection["frame_id"],
-                source="camera_main",
-                object_class=detection["class"],
-                confidence=detection["confidence"],
-                bbox=detection["bbox"],
-                threat_level=detection["threat_level"]
-            )
-            db.add(event)
-            await db.flush() # Get ID
-            
-            # Create Alert Record
-            alert = Alert(
-                title=alert_data["title"],
-                description=alert_data["description"],
-                severity="critical",
-                event_id=event.id
-            )
-            db.add(alert)
-            await db.commit()
-            # print(f"💾 Alert Persisted: {alert.title}")
-    except Exception as e:
-        print(f"❌ DB Error: {e}")
+# Write-behind queue for Event/Alert rows (batched bulk inserts)
+persistence = PersistenceQueue(**get_model_manager().config.get("persistence", {}), event_store=event_store)
+
+
+@app.exception_handler(ExecutorOverloaded)
+async def executor_overloaded_handler(request, exc: ExecutorOverloaded):
+    return JSONResponse(status_code=503, content={"error": str(exc)})
 
 @app.get("/")
 async def root():
@@ -143,13 +155,17 @@ async def root():
         "timestamp": datetime.utcnow().isoformat()
     }
 
-from database import init_db, get_db, Event, Alert, SystemLog
+from database import get_db, Event, Alert, SystemLog
 from sqlalchemy import select
 
 @app.on_event("startup")
 async def startup():
     # Initialize Database
-    await init_db()
+    await event_store.setup()  # Creates all tables plus event partitions
+    event_store.start()
+    persistence.start()
+    if detection_log:
+        detection_log.start()
     print("Database Initialized")
 
     global vision_engine, using_real_vision, model_manager
@@ -167,11 +183,12 @@ async def startup():
         model_manager.load_model(ModelType.MOCK)
         model_manager.set_active_model(ModelType.MOCK)
     
-    if VIDEO_SOURCE is not None and VISION_AVAILABLE:
+    if vision_engine is not None:
+        print("\n👁️  Vision Engine already running")
+    elif VIDEO_SOURCE is not None and VISION_AVAILABLE:
         print(f"\n👁️  Initializing Vision Engine: {VIDEO_SOURCE}")
         try:
-            vision_engine = VisionEngine(source=VIDEO_SOURCE)
-            vision_engine.start()
+            start_vision()
             using_real_vision = True
             print("✅ Vision Engine Started")
         except Exception as e:
@@ -187,9 +204,17 @@ async def startup():
 
 @app.on_event("shutdown")
 async def shutdown():
-    if vision_engine:
+    if camera_pool:
+        camera_pool.stop()
+        print("🛑 Camera Pool Stopped")
+    elif vision_engine:
         vision_engine.stop()
         print("🛑 Vision Engine Stopped")
+    await persistence.stop()
+    await event_store.stop()
+    if detection_log:
+        await asyncio.get_running_loop().run_in_executor(None, detection_log.stop)
+    compute.shutdown()
 
 
 @app.get("/api/ai/status")
@@ -203,7 +228,7 @@ async def get_model_status():
     
     stats = {}
     if vision_engine:
-         stats = vision_engine.analyze()["stats"]
+         stats = vision_engine.get_stats()
 
     return {
         "model": {
@@ -220,10 +245,20 @@ async def get_model_status():
         "statistics": {
             "uptime": "operational",
             "fps": stats.get('fps', 0),
+            "inference_fps": stats.get('inference_fps', 0),
             "status": stats.get('status', 'unknown')
         },
+        "adaptive_quality": stats.get('adaptive_quality'),
+        "motion_gate": stats.get('motion_gate'),
+        "cameras": camera_pool.get_stats() if camera_pool else None,
         "available_models": model_manager.get_available_models(),
         "all_models": model_status,
+        "executor": compute.get_stats(),
+        "video_feed": [b.get_stats() for b in broadcasters.values()],
+        "websocket": manager.get_stats(),
+        "persistence": persistence.get_stats(),
+        "detection_log": detection_log.get_stats() if detection_log else None,
+        "event_store": event_store.get_stats(),
         "classes": ["human", "vehicle", "weapon"],
         "threat_levels": ["normal", "suspicious", "critical"]
     }
@@ -235,7 +270,7 @@ async def detect_frame():
     Perform object detection on a single frame
     In production, this would accept image data
     """
-    detections = detector.detect_frame()
+    detections = await compute.run(detector.detect_frame)
     
     # Count threats by level
     threat_summary = {
@@ -277,7 +312,7 @@ async def select_model(model_type: str):
     Switch to a different AI model
     
     Args:
-        model_type: Model to switch to (yolo26, rfdetr, sam2, rtmdet, mock)
+        model_type: Model to switch to (yolo26, yolo26_int8, rfdetr, sam2, rtmdet, mock)
     """
     if not model_manager:
         raise HTTPException(status_code=503, detail="Model manager not initialized")
@@ -290,7 +325,8 @@ async def select_model(model_type: str):
             detail=f"Invalid model type. Available: {[m.value for m in ModelType]}"
         )
     
-    success = model_manager.set_active_model(model_enum)
+    # Switching may load weights from disk - keep it off the event loop
+    success = await compute.run(model_manager.set_active_model, model_enum)
     
     if success:
         return {
@@ -333,29 +369,31 @@ async def get_model_info(model_type: str):
 
 
 # MJPEG Streaming Generator
-def generate_frames():
-    while True:
-        if vision_engine and vision_engine.camera:
-            frame = vision_engine.camera.get_frame()
-            if frame is not None:
-                # Compress to JPEG
-                _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 70])
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            else:
-                # If no frame, sleep briefly
-                time.sleep(0.1)
-        else:
-            time.sleep(0.5)
+broadcasters: Dict[int, MJPEGBroadcaster] = {}
+
+def get_broadcaster(camera) -> MJPEGBroadcaster:
+    """One shared encoder per camera, however many viewers"""
+    if id(camera) not in broadcasters:
+        broadcasters[id(camera)] = MJPEGBroadcaster(camera, run_blocking=compute.run)
+    return broadcasters[id(camera)]
 
 @app.get("/api/ai/video_feed")
-def video_feed():
-    """Stream real-time video via MJPEG"""
+async def video_feed(camera_id: Optional[str] = None):
+    """Stream real-time video via MJPEG (optionally for one camera of the pool)"""
     if not VISION_AVAILABLE or not vision_engine:
          return JSONResponse(status_code=503, content={"error": "Vision engine not available"})
     
-    return StreamingResponse(generate_frames(), media_type="multipart/x-mixed-replace; boundary=frame")
+    camera = vision_engine.camera
+    if camera_id is not None:
+        camera = camera_pool.cameras.get(camera_id) if camera_pool else None
+        if camera is None and camera_id == vision_engine.camera_id:
+            camera = vision_engine.camera
+        if camera is None:
+            return JSONResponse(status_code=404, content={"error": f"Unknown camera: {camera_id}"})
+    
+    return StreamingResponse(
+        get_broadcaster(camera).stream(), media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}"
+    )
 
 # ==============================================================================
 # SUSPECT MANAGEMENT API
@@ -380,106 +418,218 @@ def list_suspects():
                 files.append(f)
     return {"suspects": files}
 
+def _save_suspect(file_obj, file_path: str) -> Optional[bool]:
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file_obj, buffer)
+    
+    # Add just this face; the rest of the watchlist is untouched
+    if vision_engine and vision_engine.face_recognizer:
+        return vision_engine.face_recognizer.add_file(file_path)
+    return None
+
+def _delete_suspect(file_path: str):
+    os.remove(file_path)
+    
+    if vision_engine and vision_engine.face_recognizer:
+        vision_engine.face_recognizer.remove(os.path.basename(file_path))
+
 @app.post("/api/suspects")
 async def upload_suspect(file: UploadFile = File(...)):
     """Upload a new suspect image"""
     file_path = os.path.join(KNOWN_FACES_DIR, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    
-    # Trigger reload if vision engine is active
-    if vision_engine and vision_engine.face_recognizer:
-        vision_engine.face_recognizer.reload()
+    # Runs the Haar cascade on the new image - keep it in the executor
+    face_detected = await compute.run(_save_suspect, file.file, file_path)
         
-    return {"status": "uploaded", "filename": file.filename}
+    return {"status": "uploaded", "filename": file.filename, "face_detected": face_detected}
 
 @app.delete("/api/suspects/{filename}")
-def delete_suspect(filename: str):
+async def delete_suspect(filename: str):
     """Delete a suspect"""
     file_path = os.path.join(KNOWN_FACES_DIR, filename)
     if os.path.exists(file_path):
-        os.remove(file_path)
-        
-        # Trigger reload
-        if vision_engine and vision_engine.face_recognizer:
-            vision_engine.face_recognizer.reload()
+        await compute.run(_delete_suspect, file_path)
             
         return {"status": "deleted", "filename": filename}
     return JSONResponse(status_code=404, content={"error": "File not found"})
 
 # WebSocket for real-time AI metadata
+stream_pump_task: Optional[asyncio.Task] = None
+
+def ensure_stream_pump():
+    """Start the shared detection pump if it is not already running"""
+    global stream_pump_task
+    if stream_pump_task is None or stream_pump_task.done():
+        stream_pump_task = asyncio.create_task(stream_pump())
+
+async def stream_pump():
+    """
+    Single producer for every /api/ai/stream client.
+    Real video: awaits results from the shared VisionEngine inference loop
+    Mock mode: simulates YOLOv8 inference at ~30 FPS
+    Messages are queued per client by the ConnectionManager; the pump never
+    waits on a socket. Runs while at least one client is connected.
+    """
+    frame_count = 0
+    last_seq = 0
+    while manager.clients:
+        try:
+            # Perform detection (real or mock)
+            if using_real_vision and vision_engine:
+                 # Wait for published results instead of re-running inference per client.
+                 # A pool batch publishes one result per camera: drain all of them
+                 analyses = await get_result_stream().next_results(last_seq, timeout=0.5)
+                 if analyses:
+                     last_seq = analyses[-1]["seq"]
+                     frames = [(a["detections"], a.get("camera_id"), a["seq"]) for a in analyses]
+                 else:
+                     frames = [([], None, last_seq)] # No new frame (camera stalled), keep fusion data flowing
+            else:
+                # Throttle to ~30 FPS (0.033s)
+                await asyncio.sleep(0.033)
+                
+                # Use Model Manager for detection (off the event loop)
+                try:
+                    detections = await compute.run(model_manager.detect) if model_manager else []
+                except ExecutorOverloaded:
+                    detections = [] # Shed this frame rather than stall the stream
+                frames = [(detections, None, frame_count)]
+
+            for detections, camera_id, current_frame_id in frames:
+                if detection_log and detections and not using_real_vision:
+                    # Real video is logged by the inference loops; mock detections only exist here
+                    detection_log.append("camera_main", detections, frame_id=current_frame_id)
+
+                # Send frame analysis
+                await manager.broadcast({
+                    "type": "frame_analysis",
+                    "frame_id": current_frame_id,
+                    "camera_id": camera_id,
+                    "detections": detections,
+                    "mode": "real" if using_real_vision else "mock",
+                    "timestamp": datetime.now().isoformat(),
+                    "fusion": fusion_engine.update(),
+                    "predictions": predictor.predict_risks() if frame_count % 300 == 0 else None # Update predictions every ~10s
+                })
+                
+                # Generate and send alerts for critical threats
+                for det in detections:
+                    if det["threat_level"] == "critical":
+                        alert_data = detector.generate_threat_alert(det)
+                        if alert_data:
+                             # Broadcast (never dropped by the per-client queues)
+                             await manager.broadcast({
+                                 "type": "critical_alert",
+                                 "camera_id": camera_id,
+                                 "alert": alert_data
+                             })
+                             
+                             # Persist to DB via the write-behind queue (waits only if it is full)
+                             await persistence.submit(
+                                 event_row(det, source=camera_id or "camera_main", frame_id=current_frame_id),
+                                 alert_row(alert_data, det)
+                             )
+                
+                frame_count += 1
+        except Exception as e:
+            print(f"❌ Stream pump error: {e}")
+            await asyncio.sleep(0.5)
+
 @app.websocket("/api/ai/stream")
 async def websocket_stream(websocket: WebSocket):
     """
     WebSocket endpoint for continuous detection stream
-    Simulates real-time YOLOv8 inference at 20 FPS
+    Frames and alerts come from the shared stream pump; this handler
+    registers the client and applies its subscribe requests (JSON text):
+    {"type": "subscribe", "cameras": [...], "min_threat": "suspicious",
+     "channels": ["detections", "fusion", "predictions", "alerts"], "max_rate": 5}
     """
     await manager.connect(websocket)
     
+    # Send initial connection message
+    manager.send(websocket, {
+        "type": "connection",
+        "status": "connected",
+        "message": "Autonomous Shield AI Stream Active",
+        "timestamp": datetime.utcnow().isoformat()
+    })
+    ensure_stream_pump()
+    
     try:
-        # Send initial connection message
-        await websocket.send_json({
-            "type": "connection",
-            "status": "connected",
-            "message": "Autonomous Shield AI Stream Active",
-            "timestamp": datetime.utcnow().isoformat()
-        })
-        
-        # Continuous detection loop
-        frame_count = 0
         while True:
-            # Throttle to ~30 FPS (0.033s)
-            await asyncio.sleep(0.033)
-            
-            # Perform detection (real or mock)
-            if using_real_vision and vision_engine:
-                 analysis = vision_engine.analyze()
-                 detections = analysis["detections"]
-                 current_frame_id = frame_count
-            else:
-                # Use Model Manager for detection
-                detections = model_manager.detect() if model_manager else []
-                current_frame_id = frame_count
-
-            # Send frame analysis
-            frame_data = {
-                "type": "frame_analysis",
-                "frame_id": current_frame_id,
-                "detections": detections,
-                "mode": "real" if using_real_vision else "mock",
-                "timestamp": datetime.now().isoformat(),
-                "fusion": fusion_engine.update(),
-                "predictions": predictor.predict_risks() if frame_count % 300 == 0 else None # Update predictions every ~10s
-            }
-            
-            await websocket.send_json(frame_data)
-            
-            # Generate and send alerts for critical threats
-            for det in detections:
-                if det["threat_level"] == "critical":
-                    alert_data = detector.generate_threat_alert(det)
-                    if alert_data:
-                         # Broadcast
-                         await manager.broadcast({
-                             "type": "critical_alert",
-                             "alert": alert_data
-                         })
-                         
-                         # Persist to DB (Fire and Forget task)
-                         asyncio.create_task(persist_alert(det, alert_data))
-            
-            frame_count += 1
-            
+            try:
+                request = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if isinstance(request, dict) and request.get("type") == "subscribe":
+                try:
+                    subscription = manager.subscribe(websocket, request)
+                    manager.send(websocket, {"type": "subscribed", **subscription.to_dict()})
+                except ValueError as e:
+                    manager.send(websocket, {"type": "error", "message": str(e)})
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
         print(f"🔌 WebSocket disconnected normally")
     except Exception as e:
         print(f"❌ WebSocket error: {e}")
-        import traceback
-        traceback.print_exc()
+    finally:
         manager.disconnect(websocket)
 
 
+def _parse_time(value: Optional[str], default: float) -> float:
+    """Epoch seconds or ISO-8601"""
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+@app.get("/api/ai/detections/search")
+async def search_detections(
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    camera: Optional[List[str]] = Query(None),
+    cls: Optional[List[str]] = Query(None, alias="class"),
+    min_threat: Optional[str] = None,
+    limit: int = 1000
+):
+    """
+    Forensic search over the detection log.
+    Times are epoch seconds or ISO-8601 (default: the last hour).
+    """
+    if not detection_log:
+        raise HTTPException(status_code=404, detail="Detection log is disabled")
+    try:
+        end_ts = _parse_time(end, time.time())
+        start_ts = _parse_time(start, end_ts - 3600)
+        return await compute.run(detection_log.query, start_ts, end_ts, camera, cls, min_threat, min(limit, 100000))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/ai/events/rollups")
+async def get_event_rollups(
+    granularity: str = "minute",
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    source: Optional[str] = None,
+    cls: Optional[str] = Query(None, alias="class"),
+    threat_level: Optional[str] = None
+):
+    """
+    Event counts per minute or hour by source, class and threat level.
+    Dashboards should use this rather than scanning raw events.
+    """
+    try:
+        return await event_store.query_rollups(
+            granularity,
+            start=datetime.utcfromtimestamp(_parse_time(start, 0)) if start else None,
+            end=datetime.utcfromtimestamp(_parse_time(end, 0)) if end else None,
+            source=source,
+            object_class=cls,
+            threat_level=threat_level
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/ai/statistics")
 async def get_statistics():
     """Get real-time detection statistics"""
@@ -516,5 +666,6 @@ if __name__ == "__main__":
         app,
         host="0.0.0.0",
         port=8000,
+        ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE,
         log_level="info"
     )
@@ -0,0 +1,126 @@
+"""
+MJPEG Broadcaster - Encode once, stream to every viewer
+One producer per camera JPEG-encodes each new frame sequence exactly once
+(off the event loop) and hands the same bytes to every async subscriber of
+/api/ai/video_feed. Each subscriber holds only the newest part: a viewer
+that cannot keep up skips frames instead of building a queue.
+"""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+
+import cv2
+
+BOUNDARY = "frame"
+
+
+class _Subscriber:
+    """Single-slot mailbox: newer parts overwrite unsent ones"""
+    __slots__ = ("part", "ready", "dropped")
+
+    def __init__(self):
+        self.part: Optional[bytes] = None
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def offer(self, part: bytes):
+        if self.part is not None:
+            self.dropped += 1
+        self.part = part
+        self.ready.set()
+
+    async def take(self) -> bytes:
+        await self.ready.wait()
+        self.ready.clear()
+        part, self.part = self.part, None
+        return part
+
+
+class MJPEGBroadcaster:
+    """
+    Shared MJPEG stream for one camera.
+    The producer task runs only while someone is watching.
+
+    Args:
+        run_blocking: awaitable runner for CPU work, e.g. ComputeExecutor.run
+    """
+
+    def __init__(
+        self,
+        camera,
+        run_blocking: Optional[Callable[..., Awaitable]] = None,
+        quality: int = 70,
+        max_width: int = 1280
+    ):
+        self.camera = camera
+        self.run_blocking = run_blocking
+        self.quality = quality
+        self.max_width = max_width
+        self.subscribers: Set[_Subscriber] = set()
+        self.producer: Optional[asyncio.Task] = None
+
+        self.encoded = 0
+        self.encode_errors = 0
+        self.dropped = 0  # Parts skipped by viewers that have since disconnected
+        self.last_seq = 0
+
+    def _encode(self) -> Optional[bytes]:
+        frame = self.camera.get_display_frame(self.max_width)
+        if frame is None:
+            return None
+        ok, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.quality])
+        if not ok:
+            return None
+        jpeg = buffer.tobytes()
+        return (f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode()
+                + jpeg + b"\r\n")
+
+    async def _produce(self):
+        loop = asyncio.get_running_loop()
+        while self.subscribers:
+            if not self.camera.running:
+                await asyncio.sleep(0.5)
+                continue
+            # Block on the camera's condition in a worker thread, not on the loop
+            _, seq, _ = await loop.run_in_executor(None, self.camera.wait_for_frame, self.last_seq, 0.5)
+            if seq <= self.last_seq or not self.subscribers:
+                continue
+            self.last_seq = seq
+
+            try:
+                if self.run_blocking:
+                    part = await self.run_blocking(self._encode)
+                else:
+                    part = await loop.run_in_executor(None, self._encode)
+            except Exception:
+                self.encode_errors += 1  # Includes ExecutorOverloaded: skip this frame
+                continue
+            if part is None:
+                continue
+
+            self.encoded += 1
+            for subscriber in self.subscribers:
+                subscriber.offer(part)
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Multipart body for a StreamingResponse; unsubscribes when the client goes away"""
+        subscriber = _Subscriber()
+        self.subscribers.add(subscriber)
+        if self.producer is None or self.producer.done():
+            self.producer = asyncio.create_task(self._produce())
+        try:
+            while True:
+                yield await subscriber.take()
+        finally:
+            self.subscribers.discard(subscriber)
+            self.dropped += subscriber.dropped
+
+    def get_stats(self) -> Dict:
+        return {
+            "source": str(self.camera.source),
+            "viewers": len(self.subscribers),
+            "frames_encoded": self.encoded,
+            "encode_errors": self.encode_errors,
+            "viewer_drops": self.dropped + sum(s.dropped for s in self.subscribers),
+            "active": self.producer is not None and not self.producer.done()
+        }
@@ -0,0 +1,296 @@
+"""
+MJPEG Stream Reader - One persistent connection per IP camera
+Reads a multipart/x-mixed-replace MJPEG endpoint (IP Webcam `/video`,
+most IP cameras) over a single HTTP connection, splitting JPEG parts
+incrementally as bytes arrive instead of opening a new connection per frame.
+
+- Reader thread: socket -> MultipartParser -> latest JPEG bytes
+- Decoder thread (optional): latest JPEG -> numpy frame; stale JPEGs are
+  dropped so a slow decode never builds up latency
+- Reconnects with a delay when the camera goes away
+"""
+
+import base64
+import http.client
+import threading
+import time
+import urllib.parse
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+
+class MultipartParser:
+    """
+    Incremental multipart/x-mixed-replace splitter.
+    Uses Content-Length when the part declares it, otherwise scans for the
+    next boundary. Boundaries are matched on the bare token, so servers that
+    declare `boundary=--foo` and servers that declare `boundary=foo` both work.
+    """
+
+    def __init__(self, boundary: str, max_part_size: int = 16 * 1024 * 1024):
+        self.token = boundary.strip().strip('"').lstrip("-").encode()
+        self.max_part_size = max_part_size
+        self.buffer = bytearray()
+        self.part_length = None  # Content-Length of the part being read
+        self.in_body = False
+        self.discarded = 0
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Append raw socket bytes; returns every JPEG completed by them"""
+        self.buffer += data
+        parts = []
+        while True:
+            part = self._next_part()
+            if part is None:
+                break
+            if part.startswith(JPEG_SOI):
+                parts.append(part)
+            else:
+                self.discarded += 1
+
+        if len(self.buffer) > self.max_part_size:
+            # Lost sync (or a runaway part); start over at the next boundary
+            self.buffer.clear()
+            self.in_body = False
+            self.part_length = None
+            self.discarded += 1
+        return parts
+
+    def _next_part(self) -> Optional[bytes]:
+        buf = self.buffer
+        if not self.in_body:
+            start = buf.find(self.token)
+            if start < 0:
+                return None
+            header_end = buf.find(b"\r\n\r\n", start)
+            if header_end < 0:
+                return None
+            self.part_length = None
+            for line in bytes(buf[start:header_end]).split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length" and value.strip().isdigit():
+                    self.part_length = int(value.strip())
+            del buf[:header_end + 4]
+            self.in_body = True
+
+        if self.part_length is not None:
+            if len(buf) < self.part_length:
+                return None
+            part = bytes(buf[:self.part_length])
+            del buf[:self.part_length]
+        else:
+            end = buf.find(self.token)
+            if end < 0:
+                return None
+            # Trim the "\r\n--" delimiter prefix by cutting at the JPEG end marker
+            eoi = buf.rfind(JPEG_EOI, 0, end)
+            part = bytes(buf[:eoi + 2]) if eoi >= 0 else bytes(buf[:end]).rstrip(b"\r\n-")
+            del buf[:end]
+
+        self.in_body = False
+        return part
+
+
+class MJPEGStreamReader:
+    """
+    Keeps one HTTP connection open to an MJPEG endpoint.
+    Consumers either wait for raw JPEG bytes (`wait_for_jpeg`, and decode
+    themselves) or, with decode=True, read decoded frames (`wait_for_frame`).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        decode: bool = True,
+        decoder: Optional[Callable[[bytes], Optional[np.ndarray]]] = None,
+        timeout: float = 5.0,
+        reconnect_delay: float = 1.0,
+        chunk_size: int = 64 * 1024
+    ):
+        self.url = url
+        self.decode = decode
+        self.decoder = decoder or (lambda data: cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.chunk_size = chunk_size
+
+        self.lock = threading.Lock()
+        self.jpeg_ready = threading.Condition(self.lock)
+        self.frame_ready = threading.Condition(self.lock)
+        self.latest_jpeg = None
+        self.jpeg_seq = 0
+        self.latest_frame = None
+        self.frame_seq = 0
+
+        self.running = False
+        self.connected = False
+        self.reader_thread = None
+        self.decoder_thread = None
+        self.connection = None
+
+        # Stats
+        self.reconnects = 0
+        self.bytes_received = 0
+        self.frames_decoded = 0
+        self.frames_dropped = 0  # JPEGs superseded before they were decoded
+        self.fps = 0
+        self.last_error = None
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
+        self.reader_thread.start()
+        if self.decode:
+            self.decoder_thread = threading.Thread(target=self._decoder_loop, daemon=True)
+            self.decoder_thread.start()
+
+    def stop(self):
+        self.running = False
+        with self.lock:
+            self.jpeg_ready.notify_all()
+            self.frame_ready.notify_all()
+        if self.connection:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+        for thread in (self.reader_thread, self.decoder_thread):
+            if thread:
+                thread.join(timeout=2.0)
+
+    # ------------------------------------------------------------------
+    # Reader
+    # ------------------------------------------------------------------
+
+    def _open(self) -> Tuple[http.client.HTTPConnection, http.client.HTTPResponse, str]:
+        parsed = urllib.parse.urlsplit(self.url)
+        conn_cls = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        conn = conn_cls(parsed.hostname, parsed.port, timeout=self.timeout)
+
+        path = parsed.path or "/"
+        if parsed.query:
+            path += "?" + parsed.query
+        headers = {}
+        if parsed.username:
+            credentials = f"{parsed.username}:{parsed.password or ''}".encode()
+            headers["Authorization"] = "Basic " + base64.b64encode(credentials).decode()
+
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        if response.status != 200:
+            conn.close()
+            raise ConnectionError(f"HTTP {response.status} from {self.url}")
+
+        content_type = response.getheader("Content-Type", "")
+        _, _, boundary = content_type.partition("boundary=")
+        if not content_type.startswith("multipart/") or not boundary:
+            conn.close()
+            raise ConnectionError(f"Not an MJPEG stream ({content_type or 'no Content-Type'})")
+        return conn, response, boundary.split(";")[0]
+
+    def _reader_loop(self):
+        print(f"📡 MJPEG Reader Started: {self.url}")
+        last_time = time.time()
+        frames_this_sec = 0
+
+        while self.running:
+            try:
+                self.connection, response, boundary = self._open()
+                parser = MultipartParser(boundary)
+                self.connected = True
+                self.last_error = None
+                print(f"✅ MJPEG stream connected: {self.url}")
+
+                while self.running:
+                    data = response.read1(self.chunk_size)
+                    if not data:
+                        raise ConnectionError("Stream closed by camera")
+                    self.bytes_received += len(data)
+
+                    for jpeg in parser.feed(data):
+                        self._publish_jpeg(jpeg)
+                        frames_this_sec += 1
+
+                    if time.time() - last_time >= 1.0:
+                        self.fps = frames_this_sec
+                        frames_this_sec = 0
+                        last_time = time.time()
+            except Exception as e:
+                self.last_error = str(e)
+                if self.running:
+                    print(f"⚠️ MJPEG stream lost ({e}), reconnecting...")
+                    self.reconnects += 1
+                    time.sleep(self.reconnect_delay)
+            finally:
+                self.connected = False
+                if self.connection:
+                    self.connection.close()
+
+        print("📡 MJPEG Reader Stopped")
+
+    def _publish_jpeg(self, jpeg: bytes):
+        with self.lock:
+            if self.decode and self.jpeg_seq > self.frame_seq:
+                self.frames_dropped += 1
+            self.latest_jpeg = jpeg
+            self.jpeg_seq += 1
+            self.jpeg_ready.notify_all()
+
+    # ------------------------------------------------------------------
+    # Decoder
+    # ------------------------------------------------------------------
+
+    def _decoder_loop(self):
+        last_seq = 0
+        while self.running:
+            jpeg, seq = self.wait_for_jpeg(last_seq, timeout=0.5)
+            if jpeg is None:
+                continue
+            last_seq = seq
+            frame = self.decoder(jpeg)
+            if frame is None:
+                continue
+            with self.lock:
+                self.latest_frame = frame
+                self.frame_seq = seq
+                self.frames_decoded += 1
+                self.frame_ready.notify_all()
+
+    # ------------------------------------------------------------------
+    # Consumers
+    # ------------------------------------------------------------------
+
+    def wait_for_jpeg(self, after_seq: int, timeout: float = 1.0) -> Tuple[Optional[bytes], int]:
+        """Block until a JPEG newer than `after_seq` arrives. Returns: (bytes or None, seq)"""
+        with self.jpeg_ready:
+            self.jpeg_ready.wait_for(lambda: self.jpeg_seq > after_seq or not self.running, timeout)
+            if self.jpeg_seq > after_seq:
+                return self.latest_jpeg, self.jpeg_seq
+            return None, self.jpeg_seq
+
+    def wait_for_frame(self, after_seq: int, timeout: float = 1.0) -> Tuple[Optional[np.ndarray], int]:
+        """Block until a decoded frame newer than `after_seq` is ready (decode=True only)"""
+        with self.frame_ready:
+            self.frame_ready.wait_for(lambda: self.frame_seq > after_seq or not self.running, timeout)
+            if self.frame_seq > after_seq:
+                return self.latest_frame, self.frame_seq
+            return None, self.frame_seq
+
+    def get_stats(self):
+        return {
+            "url": self.url,
+            "connected": self.connected,
+            "fps": self.fps,
+            "frames_received": self.jpeg_seq,
+            "frames_decoded": self.frames_decoded,
+            "frames_dropped": self.frames_dropped,
+            "bytes_received": self.bytes_received,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error
+        }
@@ -144,6 +144,15 @@ class MockDetector:
         
         return detections
     
+    def detect_batch(self, frames: List) -> List[List[Dict]]:
+        """
+        Simulate batched detection: one independent mock frame per input
+        
+        Args:
+            frames: Input frames (ignored by the simulation)
+        """
+        return [self.detect_frame() for _ in frames]
+    
     def generate_threat_alert(self, detection: Dict) -> Dict:
         """
         Generate formatted threat alert from detection
@@ -173,7 +182,7 @@ class MockDetector:
                 "lng": location["lng"]
             },
             "description": f"{detection['class'].title()} detected with {detection['confidence']:.0%} confidence at {location['name']}",
-            "timestamp": detection["timestamp"],
+            "timestamp": detection.get("timestamp") or datetime.utcnow().isoformat(),
             "requires_action": True,
             "bbox": detection["bbox"]
         }
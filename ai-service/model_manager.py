@@ -18,6 +18,7 @@ logger = logging.getLogger(__name__)
 class ModelType(str, Enum):
     """Supported AI model types"""
     YOLO26 = "yolo26"
+    YOLO26_INT8 = "yolo26_int8"
     RFDETR = "rfdetr"
     SAM2 = "sam2"
     RTMDET = "rtmdet"
@@ -53,7 +54,14 @@ class ModelManager:
                 "total_time": 0.0,
                 "avg_fps": 0.0,
                 "avg_latency_ms": 0.0,
-                "last_inference_time": 0.0
+                "last_inference_time": 0.0,
+                "total_batches": 0,
+                "total_batch_frames": 0,
+                "total_batch_time": 0.0,
+                "last_batch_size": 0,
+                "last_batch_latency_ms": 0.0,
+                "avg_batch_latency_ms": 0.0,
+                "avg_batch_size": 0.0
             }
             self.model_status[model_type] = ModelStatus.UNLOADED
     
@@ -68,8 +76,20 @@ class ModelManager:
                     "enabled": True,
                     "confidence_threshold": 0.50,
                     "device": "cpu",  # Will auto-detect GPU
-                    "batch_size": 1,
-                    "nms_free": True
+                    "batch_size": 8,
+                    "nms_free": True,
+                    "backend": "torch",  # torch | onnxruntime | openvino | opencv_dnn
+                    "torch_free": False,  # Load a cached export without importing torch
+                    "imgsz": 640
+                },
+                "yolo26_int8": {
+                    "enabled": False,
+                    "confidence_threshold": 0.50,
+                    "batch_size": 8,
+                    "torch_free": False,
+                    "imgsz": 640,
+                    "calibration_dir": "assets/calibration",  # Local frames used for INT8 calibration
+                    "calibration_samples": 100
                 },
                 "rfdetr": {
                     "enabled": False,
@@ -100,7 +120,66 @@ class ModelManager:
             "performance": {
                 "target_fps": 30,
                 "max_latency_ms": 100,
-                "adaptive_quality": True
+                "adaptive_quality": True,
+                "ring_slots": 4,
+                "mirror": None,
+                "motion_gate": {
+                    "enabled": True,
+                    "width": 160,
+                    "pixel_threshold": 25,
+                    "min_changed_ratio": 0.002,
+                    "scene_change_ratio": 0.5,
+                    "refresh_interval": 2.0
+                }
+            },
+            "executor": {
+                "max_workers": 4,
+                "max_queue": 32,
+                "process_workers": 0,
+                "admission_timeout": 5.0
+            },
+            "websocket": {
+                "max_queue": 64,
+                "max_lag": 5.0,
+                "send_timeout": 2.0,
+                "per_message_deflate": True,
+                "delta": {
+                    "keyframe_interval": 30,
+                    "history": 64,
+                    "bbox_quantum": 2,
+                    "confidence_quantum": 0.05
+                }
+            },
+            "persistence": {
+                "max_pending": 10000,
+                "batch_size": 500,
+                "flush_interval": 1.0,
+                "put_timeout": 0.5,
+                "max_retries": 5,
+                "retry_backoff": 0.5
+            },
+            "event_store": {
+                "retention_days": 30,
+                "minute_rollup_days": 7,
+                "precreate_days": 2,
+                "maintenance_interval": 60,
+                "rollup_lag": 10
+            },
+            "detection_log": {
+                "enabled": True,
+                "path": "detection_log",
+                "segment_seconds": 60,
+                "max_rows": 200000,
+                "compress": False,
+                "retention_days": 7,
+                "retention_interval": 300
+            },
+            "face_recognition": {
+                "threshold": 0.5,
+                "cache_dir": "assets/face_gallery",
+                "ann_threshold": 2000,
+                "nprobe": 8,
+                "watch_interval": 2.0
             }
         }
         
@@ -147,8 +226,30 @@ class ModelManager:
                 config = self.config["models"]["yolo26"]
                 self.models[model_type] = YOLO26Detector(
                     confidence_threshold=config["confidence_threshold"],
-                    device=config["device"]
+                    device=config["device"],
+                    batch_size=config.get("batch_size", 1),
+                    backend=config.get("backend", "torch"),
+                    torch_free=config.get("torch_free", False),
+                    imgsz=config.get("imgsz", 640)
+                )
+            
+            elif model_type == ModelType.YOLO26_INT8:
+                from yolo26_detector import YOLO26Detector
+                config = self.config["models"]["yolo26_int8"]
+                detector = YOLO26Detector(
+                    confidence_threshold=config["confidence_threshold"],
+                    device="cpu",
+                    batch_size=config.get("batch_size", 1),
+                    torch_free=config.get("torch_free", False),
+                    imgsz=config.get("imgsz", 640),
+                    precision="int8",
+                    calibration_dir=config.get("calibration_dir", "assets/calibration"),
+                    calibration_samples=config.get("calibration_samples", 100)
                 )
+                # Don't silently serve FP32 or simulated detections under the INT8 name
+                if detector.runtime is None:
+                    raise RuntimeError("INT8 model could not be built - check onnxruntime and calibration frames")
+                self.models[model_type] = detector
             
             elif model_type == ModelType.RFDETR:
                 from rfdetr_detector import RFDETRDetector
@@ -263,6 +364,86 @@ class ModelManager:
             logger.error(f"❌ Detection failed with {self.active_model}: {e}")
             return []
     
+    def detect_batch(self, frames: List, batch_size: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Perform detection on several frames using the active model
+        
+        Args:
+            frames: List of frames (numpy arrays)
+            batch_size: Frames per forward pass (defaults to the model's
+                `batch_size` in ai_config.json)
+            
+        Returns:
+            One list of detections per input frame
+        """
+        if not self.active_model:
+            logger.warning("⚠️  No active model set, using MOCK")
+            self.set_active_model(ModelType.MOCK)
+        
+        if self.active_model not in self.models:
+            logger.error(f"❌ Active model {self.active_model} not loaded")
+            return [[] for _ in frames]
+        
+        model = self.models[self.active_model]
+        if batch_size is None:
+            batch_size = self.config["models"].get(self.active_model.value, {}).get("batch_size", 1)
+        batch_size = max(1, int(batch_size))
+        
+        batched = []
+        for start in range(0, len(frames), batch_size):
+            chunk = frames[start:start + batch_size]
+            start_time = time.time()
+            
+            try:
+                if hasattr(model, 'detect_batch'):
+                    chunk_detections = model.detect_batch(chunk)
+                elif hasattr(model, 'detect_frame'):
+                    # Models without a batched path run frame by frame
+                    chunk_detections = [model.detect_frame(frame) for frame in chunk]
+                elif hasattr(model, 'detect'):
+                    chunk_detections = [model.detect(frame) for frame in chunk]
+                else:
+                    logger.error(f"❌ Model {self.active_model} has no detect method")
+                    return [[] for _ in frames]
+            except Exception as e:
+                logger.error(f"❌ Batch detection failed with {self.active_model}: {e}")
+                chunk_detections = [[] for _ in chunk]
+            
+            batch_time = time.time() - start_time
+            self._update_batch_stats(self.active_model, batch_time, len(chunk))
+            
+            # Add model metadata to detections
+            per_frame_ms = round(batch_time * 1000 / len(chunk), 2)
+            for detections in chunk_detections:
+                for det in detections:
+                    det['model'] = self.active_model.value
+                    det['inference_time_ms'] = per_frame_ms
+                    det['batch_latency_ms'] = round(batch_time * 1000, 2)
+            
+            batched.extend(chunk_detections)
+        
+        return batched
+    
+    def _update_batch_stats(self, model_type: ModelType, batch_time: float, batch_size: int):
+        """Update per-batch latency and per-frame throughput statistics"""
+        stats = self.performance_stats[model_type]
+        stats["total_batches"] += 1
+        stats["total_batch_frames"] += batch_size
+        stats["total_batch_time"] += batch_time
+        stats["last_batch_size"] = batch_size
+        stats["last_batch_latency_ms"] = round(batch_time * 1000, 2)
+        stats["avg_batch_latency_ms"] = stats["total_batch_time"] / stats["total_batches"] * 1000
+        
+        # Per-frame figures count every frame in the batch
+        stats["total_inferences"] += batch_size
+        stats["total_time"] += batch_time
+        stats["last_inference_time"] = batch_time / batch_size
+        stats["avg_batch_size"] = stats["total_batch_frames"] / stats["total_batches"]
+        
+        avg_time = stats["total_time"] / stats["total_inferences"]
+        stats["avg_fps"] = 1.0 / avg_time if avg_time > 0 else 0
+        stats["avg_latency_ms"] = avg_time * 1000
+    
     def _update_performance_stats(self, model_type: ModelType, inference_time: float):
         """Update performance statistics for a model"""
         stats = self.performance_stats[model_type]
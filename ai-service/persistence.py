@@ -0,0 +1,231 @@
+"""
+Persistence Queue - Write-behind batching for Event and Alert rows
+Callers enqueue rows and move on; one writer task drains the queue and
+writes each batch in a single transaction with bulk INSERTs.
+
+- Flushes when `batch_size` rows are waiting or `flush_interval` seconds
+  after the first row of a batch arrived, whichever comes first
+- Bounded memory: at most `max_pending` rows wait in the queue. When it is
+  full, submit() waits up to `put_timeout` (backpressure) and then drops
+  the row, counting it
+- A failed batch (locked SQLite file, dropped connection) is retried with
+  exponential backoff; its rows only count as failed after `max_retries`
+- stop() flushes everything still queued before returning
+- With an EventStore, events go to their daily partitions (event_store.py)
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import logging
+
+from sqlalchemy import insert
+
+from database import AsyncSessionLocal, Event, Alert
+
+logger = logging.getLogger(__name__)
+
+
+def event_row(detection: Dict, source: str, frame_id: Optional[int] = None,
+              timestamp: Optional[datetime] = None) -> Dict:
+    """
+    Event columns for a detection. VisionEngine detections carry no
+    timestamp/frame_id of their own, so the stream's values are used.
+    """
+    if timestamp is None:
+        raw = detection.get("timestamp")
+        timestamp = datetime.fromisoformat(raw) if isinstance(raw, str) else datetime.utcnow()
+    return {
+        "timestamp": timestamp,
+        "frame_id": frame_id if frame_id is not None else detection.get("frame_id"),
+        "source": source,
+        "object_class": detection["class"],
+        "confidence": detection["confidence"],
+        "bbox": detection["bbox"],
+        "threat_level": detection["threat_level"]
+    }
+
+
+def alert_row(alert_data: Dict, detection: Dict, severity: str = "critical") -> Dict:
+    """Alert columns; event_id/event_time are filled in when the batch is written"""
+    return {
+        "timestamp": datetime.utcnow(),
+        "title": alert_data.get("title") or f"{alert_data.get('type', 'ALERT')}: {detection['class']}",
+        "description": alert_data.get("description", ""),
+        "severity": severity
+    }
+
+
+class PersistenceQueue:
+    def __init__(
+        self,
+        max_pending: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        put_timeout: float = 0.5,
+        max_retries: int = 5,
+        retry_backoff: float = 0.5,
+        session_factory=AsyncSessionLocal,
+        event_store=None
+    ):
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.session_factory = session_factory
+        self.event_store = event_store
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.writer: Optional[asyncio.Task] = None
+        self.closing = False
+
+        self.events_written = 0
+        self.alerts_written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retries = 0
+        self.backpressure_waits = 0
+        self.last_flush_ms = 0.0
+        self.last_error = None
+
+    def start(self):
+        """Start the writer task (call from the running event loop)"""
+        if self.writer and not self.writer.done():
+            return
+        self.queue = asyncio.Queue(maxsize=self.max_pending)
+        self.closing = False
+        self.writer = asyncio.create_task(self._writer())
+        logger.info(f"💾 Persistence queue started (batch {self.batch_size}, every {self.flush_interval}s)")
+
+    async def stop(self, timeout: float = 10.0):
+        """Flush everything queued, then stop the writer"""
+        if not self.writer:
+            return
+        self.closing = True
+        try:
+            self.queue.put_nowait(None)  # Wake a writer that is waiting for more rows
+        except asyncio.QueueFull:
+            pass  # Not waiting: it sees `closing` before its next wait
+        try:
+            await asyncio.wait_for(self.writer, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️  Persistence flush timed out; {self.queue.qsize()} rows not written")
+        self.writer = None
+        logger.info("💾 Persistence queue stopped")
+
+    async def submit(self, event: Dict, alert: Optional[Dict] = None) -> bool:
+        """Queue an Event row (and optionally its Alert). Returns: False if dropped"""
+        if self.queue is None or self.closing:
+            self.dropped += 1
+            return False
+        item = (event, alert)
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        self.backpressure_waits += 1
+        try:
+            await asyncio.wait_for(self.queue.put(item), self.put_timeout)
+            return True
+        except asyncio.TimeoutError:
+            self.dropped += 1
+            return False
+
+    # ------------------------------------------------------------------
+    # Writer
+    # ------------------------------------------------------------------
+
+    async def _writer(self):
+        while not (self.closing and self.queue.empty()):
+            batch = await self._collect()
+            if batch:
+                await self._flush(batch)
+
+    async def _collect(self) -> List[Tuple[Dict, Optional[Dict]]]:
+        """Up to batch_size rows; waits at most flush_interval after the first one"""
+        batch = []
+        loop = asyncio.get_running_loop()
+        deadline = None
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                if self.closing:
+                    break
+                remaining = (deadline - loop.time()) if deadline is not None else self.flush_interval
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    if batch:
+                        break
+                    continue
+            if item is None:
+                continue  # stop() wake-up
+            batch.append(item)
+            if deadline is None:
+                deadline = loop.time() + self.flush_interval
+        return batch
+
+    async def _flush(self, batch: List[Tuple[Dict, Optional[Dict]]]):
+        """Write one batch, retrying transient failures before giving up on it"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._write(batch)
+                return
+            except Exception as e:
+                self.last_error = str(e)
+                if attempt == self.max_retries:
+                    self.failed += len(batch)
+                    logger.error(f"❌ Persistence batch of {len(batch)} failed after {attempt + 1} attempts: {e}")
+                    return
+                delay = min(self.retry_backoff * (2 ** attempt), 10.0)
+                self.retries += 1
+                logger.warning(f"⚠️  Persistence batch of {len(batch)} failed ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _write(self, batch: List[Tuple[Dict, Optional[Dict]]]):
+        """One transaction for the whole batch: it is written entirely or not at all"""
+        started = time.perf_counter()
+        async with self.session_factory() as db:
+            events = [event for event, _ in batch]
+            if self.event_store:
+                event_ids = await self.event_store.insert_events(db, events)
+            else:
+                event_ids = (await db.scalars(
+                    insert(Event).returning(Event.id, sort_by_parameter_order=True), events
+                )).all()
+            alerts = [dict(alert, event_id=event_id, event_time=event["timestamp"])
+                      for (event, alert), event_id in zip(batch, event_ids) if alert is not None]
+            if alerts:
+                await db.execute(insert(Alert), alerts)
+            await db.commit()
+
+        self.batches += 1
+        self.events_written += len(batch)
+        self.alerts_written += len(alerts)
+        self.last_flush_ms = (time.perf_counter() - started) * 1000
+
+    def get_stats(self) -> Dict:
+        return {
+            "pending": self.queue.qsize() if self.queue else 0,
+            "max_pending": self.max_pending,
+            "events_written": self.events_written,
+            "alerts_written": self.alerts_written,
+            "batches": self.batches,
+            "avg_batch_size": round(self.events_written / self.batches, 1) if self.batches else 0,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "backpressure_waits": self.backpressure_waits,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "retries": self.retries,
+            "last_error": self.last_error
+        }
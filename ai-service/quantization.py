@@ -0,0 +1,269 @@
+"""
+INT8 Quantization - Post-training static quantization for YOLO detectors
+Builds an INT8 ONNX variant of the FP32 export, calibrated on a local folder
+of frames, and reports latency / throughput / detection agreement against
+the FP32 model on held-out frames from the same folder.
+
+Usage:
+    python quantization.py --calibration-dir assets/calibration
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+import logging
+
+from inference_backends import (
+    OnnxRuntimeBackend, find_cached_export, letterbox_batch, update_export_cache
+)
+
+logger = logging.getLogger(__name__)
+
+INT8_FORMAT = "onnx_int8"
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def list_calibration_images(directory: str, limit: int = 100) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    files = sorted(f for f in os.listdir(directory) if f.lower().endswith(IMAGE_EXTENSIONS))
+    return [os.path.join(directory, f) for f in files[:limit]]
+
+
+def load_calibration_frames(paths: List[str]) -> List[np.ndarray]:
+    frames = []
+    for path in paths:
+        frame = cv2.imread(path)
+        if frame is None:
+            logger.warning(f"⚠️  Skipping unreadable calibration image: {path}")
+            continue
+        frames.append(frame)
+    return frames
+
+
+def split_holdout(paths: List[str], every: int = 5) -> Tuple[List[str], List[str]]:
+    """
+    Deterministic calibration / evaluation split: every `every`-th image is
+    held out, so the report never scores the frames the ranges were fit on.
+    Returns: (calibration paths, held-out paths)
+    """
+    if len(paths) < 2:
+        return paths, []
+    held_out = paths[every - 1::every] or paths[-1:]
+    held = set(held_out)
+    return [p for p in paths if p not in held], held_out
+
+
+def calibration_fingerprint(paths: List[str]) -> str:
+    """Changes whenever a calibration image is added, removed or modified"""
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime}".encode())
+    return digest.hexdigest()
+
+
+def _make_calibration_reader(input_name: str, frames: List[np.ndarray], imgsz: int):
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class FrameCalibrationReader(CalibrationDataReader):
+        """Feeds letterboxed calibration frames one at a time"""
+        def __init__(self):
+            self._frames = iter(frames)
+
+        def get_next(self):
+            frame = next(self._frames, None)
+            if frame is None:
+                return None
+            blob, _ = letterbox_batch([frame], imgsz)
+            return {input_name: blob}
+
+    return FrameCalibrationReader()
+
+
+# ==============================================================================
+# REPORT
+# ==============================================================================
+
+def _iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def _match(reference, candidate, iou_threshold: float) -> int:
+    """Greedy same-class IoU matching; returns number of matched detections"""
+    if len(reference.xyxy) == 0 or len(candidate.xyxy) == 0:
+        return 0
+    iou = _iou(reference.xyxy, candidate.xyxy)
+    iou[reference.cls[:, None] != candidate.cls[None, :]] = 0.0
+    matched = 0
+    used_ref, used_cand = set(), set()
+    for flat in np.argsort(-iou, axis=None):
+        r, c = divmod(int(flat), iou.shape[1])
+        if iou[r, c] < iou_threshold:
+            break
+        if r in used_ref or c in used_cand:
+            continue
+        used_ref.add(r)
+        used_cand.add(c)
+        matched += 1
+    return matched
+
+
+def _time_runtime(runtime, frames: List[np.ndarray]):
+    outputs, latencies = [], []
+    runtime(frames[:1])  # Warm-up
+    for frame in frames:
+        start = time.perf_counter()
+        outputs.extend(runtime([frame]))
+        latencies.append(time.perf_counter() - start)
+    return outputs, np.array(latencies) * 1000
+
+
+def compare_models(reference, candidate, frames: List[np.ndarray], iou_threshold: float = 0.5) -> Dict:
+    """
+    Run both runtimes on the same frames and compare them.
+    Agreement treats the reference (FP32) detections as ground truth.
+    """
+    ref_out, ref_ms = _time_runtime(reference, frames)
+    cand_out, cand_ms = _time_runtime(candidate, frames)
+
+    matched = sum(_match(r, c, iou_threshold) for r, c in zip(ref_out, cand_out))
+    ref_total = sum(len(r.xyxy) for r in ref_out)
+    cand_total = sum(len(c.xyxy) for c in cand_out)
+    precision = matched / cand_total if cand_total else 1.0
+    recall = matched / ref_total if ref_total else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if (precision + recall) else 0.0
+
+    def latency(ms: np.ndarray) -> Dict:
+        return {
+            "mean_ms": round(float(ms.mean()), 2),
+            "p50_ms": round(float(np.percentile(ms, 50)), 2),
+            "p95_ms": round(float(np.percentile(ms, 95)), 2),
+            "throughput_fps": round(1000.0 / float(ms.mean()), 1) if ms.mean() > 0 else 0.0
+        }
+
+    fp32, int8 = latency(ref_ms), latency(cand_ms)
+    return {
+        "frames": len(frames),
+        "fp32": fp32,
+        "int8": int8,
+        "speedup": round(fp32["mean_ms"] / int8["mean_ms"], 2) if int8["mean_ms"] else None,
+        "agreement": {
+            "iou_threshold": iou_threshold,
+            "fp32_detections": ref_total,
+            "int8_detections": cand_total,
+            "matched": matched,
+            "precision": round(precision, 4),
+            "recall": round(recall, 4),
+            "f1": round(f1, 4)
+        }
+    }
+
+
+# ==============================================================================
+# BUILD
+# ==============================================================================
+
+def build_int8_model(
+    fp32_entry: Dict,
+    weights_path: str,
+    calibration_dir: str,
+    calibration_samples: int = 100,
+    conf: float = 0.5
+) -> Dict:
+    """
+    Quantize the FP32 ONNX export to INT8 (QDQ, per-channel weights).
+    Cached next to the weights; rebuilt when the weights or the
+    calibration set change.
+
+    Returns: sidecar entry for the INT8 artifact, including "report"
+    """
+    imgsz = fp32_entry["imgsz"]
+    paths = list_calibration_images(calibration_dir, calibration_samples)
+    fingerprint = calibration_fingerprint(paths)
+
+    cached = find_cached_export(weights_path, INT8_FORMAT, imgsz)
+    if cached and cached.get("calibration_fingerprint") == fingerprint:
+        logger.info(f"✅ Using cached INT8 model: {cached['artifact']}")
+        return cached
+
+    calibration_paths, holdout_paths = split_holdout(paths)
+    frames = load_calibration_frames(calibration_paths)
+    if not frames:
+        raise RuntimeError(f"No calibration frames found in {calibration_dir}")
+    eval_frames = load_calibration_frames(holdout_paths)
+    if not eval_frames:
+        logger.warning("⚠️  Too few images for a held-out set - INT8 report is scored on the calibration frames")
+
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    fp32_path = fp32_entry["artifact"]
+    int8_path = str(Path(fp32_path).with_suffix(".int8.onnx"))
+    fp32_runtime = OnnxRuntimeBackend(fp32_path, fp32_entry["names"], imgsz=imgsz, conf=conf)
+
+    logger.info(f"🔢 Calibrating INT8 model on {len(frames)} frames from {calibration_dir}...")
+    quantize_static(
+        fp32_path,
+        int8_path,
+        _make_calibration_reader(fp32_runtime.input_name, frames, imgsz),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        # Keep the elementwise detection-head math in float
+        op_types_to_quantize=["Conv", "MatMul"]
+    )
+
+    int8_runtime = OnnxRuntimeBackend(int8_path, fp32_entry["names"], imgsz=imgsz, conf=conf)
+    report = compare_models(fp32_runtime, int8_runtime, eval_frames or frames)
+    report["calibration_frames"] = len(frames)
+    report["held_out"] = bool(eval_frames)
+    Path(int8_path).with_suffix(".report.json").write_text(json.dumps(report, indent=2))
+    logger.info(
+        f"✅ INT8 model ready: {report['speedup']}x speedup, "
+        f"F1 agreement {report['agreement']['f1']:.3f} vs FP32"
+    )
+
+    entry = dict(fp32_entry)
+    entry.update({
+        "artifact": int8_path,
+        "format": INT8_FORMAT,
+        "fp32_artifact": fp32_path,
+        "calibration_dir": calibration_dir,
+        "calibration_fingerprint": fingerprint,
+        "report": report
+    })
+    update_export_cache(weights_path, INT8_FORMAT, entry)
+    return entry
+
+
+# Build + report from the command line
+if __name__ == "__main__":
+    import argparse
+    from yolo26_detector import YOLO26Detector
+
+    parser = argparse.ArgumentParser(description="Build an INT8 YOLO model and compare it to FP32")
+    parser.add_argument("--calibration-dir", default="assets/calibration")
+    parser.add_argument("--samples", type=int, default=100)
+    args = parser.parse_args()
+
+    detector = YOLO26Detector(
+        backend="onnxruntime",
+        precision="int8",
+        calibration_dir=args.calibration_dir,
+        calibration_samples=args.samples
+    )
+    print(json.dumps(detector.quantization_report, indent=2))
@@ -0,0 +1,304 @@
+"""
+Snapshot Poller - Many HTTP snapshot cameras from one event loop
+Polls `/shot.jpg`-style endpoints for any number of cameras from a single
+asyncio loop (one background thread) instead of one blocking thread per
+camera.
+
+- HTTP/1.1 keep-alive: one reused connection per camera
+- Per-camera poll interval and timeout, with backoff on errors
+- JPEG decode runs on a small shared thread pool; a camera whose previous
+  frame is still decoding skips the new one instead of queueing it
+"""
+
+import asyncio
+import base64
+import ssl
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# on_jpeg(jpeg_bytes, captured_at) runs on a decode worker
+JpegHandler = Callable[[bytes, float], None]
+
+
+class SnapshotCamera:
+    """Connection and counters for one polled camera"""
+
+    def __init__(self, camera_id: str, url: str, on_jpeg: JpegHandler, interval: float, timeout: float):
+        self.camera_id = camera_id
+        self.url = url
+        self.on_jpeg = on_jpeg
+        self.interval = interval
+        self.timeout = timeout
+
+        parsed = urllib.parse.urlsplit(url)
+        self.host = parsed.hostname
+        self.tls = parsed.scheme == "https"
+        self.port = parsed.port or (443 if self.tls else 80)
+        path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+        host_header = self.host if parsed.port is None else f"{self.host}:{parsed.port}"
+        request = f"GET {path} HTTP/1.1\r\nHost: {host_header}\r\nConnection: keep-alive\r\n"
+        if parsed.username:
+            credentials = f"{parsed.username}:{parsed.password or ''}".encode()
+            request += f"Authorization: Basic {base64.b64encode(credentials).decode()}\r\n"
+        self.request = (request + "\r\n").encode()
+
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.requests_on_connection = 0
+        self.decoding = False
+        self.task: Optional[asyncio.Task] = None
+
+        self.connects = 0
+        self.frames = 0
+        self.skipped = 0  # Fetched while the previous frame was still decoding
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.last_error = None
+        self.last_frame_at = 0.0
+        self.fetch_ms = 0.0
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+        self.reader = self.writer = None
+        self.requests_on_connection = 0
+
+
+class SnapshotPoller:
+    """
+    Shared poller. Cameras can be added and removed at any time from any
+    thread; frames are delivered through each camera's `on_jpeg` callback.
+    """
+
+    def __init__(self, decode_workers: int = 4, max_backoff: float = 5.0):
+        self.decode_pool = ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="snapshot-decode")
+        self.max_backoff = max_backoff
+        self.cameras: Dict[str, SnapshotCamera] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread = None
+        self.started = threading.Event()
+        self.ssl_context = ssl.create_default_context()
+
+    def start(self):
+        if self.thread: return
+        self.thread = threading.Thread(target=self._run_loop, daemon=True, name="snapshot-poller")
+        self.thread.start()
+        self.started.wait()
+
+    def _run_loop(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.started.set()
+        logger.info("📡 Snapshot poller started")
+        self.loop.run_forever()
+
+    def stop(self):
+        if not self.loop:
+            return
+        cameras = list(self.cameras.values())
+        self.cameras.clear()
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_all(cameras), self.loop).result(timeout=2.0)
+        except Exception as e:
+            logger.warning(f"⚠️  Snapshot poller shutdown: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=2.0)
+        if not self.thread.is_alive():
+            self.loop.close()
+        self.decode_pool.shutdown(wait=False, cancel_futures=True)
+        self.thread = self.loop = None
+        self.started.clear()
+
+    def add_camera(
+        self,
+        camera_id: str,
+        url: str,
+        on_jpeg: JpegHandler,
+        interval: float = 0.1,
+        timeout: float = 2.0
+    ):
+        """Start polling `url` every `interval` seconds (replaces an existing camera id)"""
+        self.start()
+        self.remove_camera(camera_id)
+        camera = SnapshotCamera(camera_id, url, on_jpeg, interval, timeout)
+        self.cameras[camera_id] = camera
+
+        def _schedule():
+            camera.task = self.loop.create_task(self._poll(camera))
+        self.loop.call_soon_threadsafe(_schedule)
+
+    def remove_camera(self, camera_id: str):
+        camera = self.cameras.pop(camera_id, None)
+        if camera and self.loop:
+            def _cancel():
+                if camera.task:
+                    camera.task.cancel()
+                camera.close()
+            self.loop.call_soon_threadsafe(_cancel)
+
+    async def _cancel_all(self, cameras):
+        """
+        Cancel every task on the loop - including polls of cameras removed
+        earlier whose cancellation was never awaited - and wait for them to
+        unwind before the loop is stopped.
+        """
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for camera in cameras:
+            camera.close()
+
+    # ------------------------------------------------------------------
+    # Polling
+    # ------------------------------------------------------------------
+
+    async def _poll(self, camera: SnapshotCamera):
+        while True:
+            started = time.monotonic()
+            try:
+                jpeg = await asyncio.wait_for(self._fetch(camera), camera.timeout)
+                camera.fetch_ms = (time.monotonic() - started) * 1000
+                camera.consecutive_errors = 0
+                self._deliver(camera, jpeg)
+            except asyncio.CancelledError:
+                camera.close()
+                raise
+            except Exception as e:
+                camera.close()
+                camera.errors += 1
+                camera.consecutive_errors += 1
+                camera.last_error = str(e) or type(e).__name__
+
+            delay = camera.interval - (time.monotonic() - started)
+            if camera.consecutive_errors:
+                delay = min(camera.interval * (2 ** camera.consecutive_errors), self.max_backoff)
+            await asyncio.sleep(max(0.0, delay))
+
+    async def _fetch(self, camera: SnapshotCamera) -> bytes:
+        """One GET over the camera's keep-alive connection"""
+        reused = camera.writer is not None
+        try:
+            return await self._request(camera)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            if not reused:
+                raise
+            # Server dropped the idle keep-alive connection; retry once on a new one
+            camera.close()
+            return await self._request(camera)
+
+    async def _request(self, camera: SnapshotCamera) -> bytes:
+        if camera.writer is None:
+            camera.reader, camera.writer = await asyncio.open_connection(
+                camera.host, camera.port, ssl=self.ssl_context if camera.tls else None
+            )
+            camera.connects += 1
+
+        camera.writer.write(camera.request)
+        await camera.writer.drain()
+        reader = camera.reader
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("Connection closed")
+        parts = status_line.split(None, 2)
+        status = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 0
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n"):
+                break
+            if not line:
+                raise ConnectionError("Connection closed in headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get("connection", "").lower() != "close" and status_line.startswith(b"HTTP/1.1")
+        if "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b"".join(chunks)
+        else:
+            body = await reader.read()
+            keep_alive = False
+
+        camera.requests_on_connection += 1
+        if not keep_alive:
+            camera.close()
+        if status != 200:
+            raise ConnectionError(f"HTTP {status}")
+        return body
+
+    def _deliver(self, camera: SnapshotCamera, jpeg: bytes):
+        if camera.decoding:
+            camera.skipped += 1
+            return
+        camera.decoding = True
+        captured_at = time.time()
+        camera.frames += 1
+        camera.last_frame_at = captured_at
+
+        def _decode():
+            try:
+                camera.on_jpeg(jpeg, captured_at)
+            except Exception as e:
+                camera.last_error = f"decode: {e}"
+            finally:
+                camera.decoding = False
+
+        self.decode_pool.submit(_decode)
+
+    def get_stats(self) -> Dict:
+        cameras = list(self.cameras.values())
+        return {
+            "cameras": len(cameras),
+            "connections_opened": sum(c.connects for c in cameras),
+            "frames": sum(c.frames for c in cameras),
+            "skipped": sum(c.skipped for c in cameras),
+            "errors": sum(c.errors for c in cameras),
+            "failing": [c.camera_id for c in cameras if c.consecutive_errors],
+        }
+
+    def get_camera_stats(self, camera_id: str) -> Optional[Dict]:
+        camera = self.cameras.get(camera_id)
+        if camera is None:
+            return None
+        return {
+            "url": camera.url,
+            "interval": camera.interval,
+            "connects": camera.connects,
+            "frames": camera.frames,
+            "skipped": camera.skipped,
+            "errors": camera.errors,
+            "last_error": camera.last_error,
+            "fetch_ms": round(camera.fetch_ms, 2),
+        }
+
+
+_poller: Optional[SnapshotPoller] = None
+_poller_lock = threading.Lock()
+
+
+def get_snapshot_poller() -> SnapshotPoller:
+    """Process-wide poller shared by every snapshot camera"""
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            _poller = SnapshotPoller()
+        return _poller
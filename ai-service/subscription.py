@@ -0,0 +1,115 @@
+"""
+Subscription - Per-client filters for /api/ai/stream
+Clients narrow what they receive by sending (as a JSON text frame):
+
+    {"type": "subscribe",
+     "cameras": ["cam1", "cam2"],        # omit / null = all cameras
+     "min_threat": "suspicious",         # normal < warning < suspicious < critical
+     "channels": ["detections", "fusion", "predictions", "alerts"],
+     "max_rate": 5}                      # frame messages per second, omit = unthrottled
+
+Filtering happens before anything is serialized: messages a client does not
+want are never queued for it, and the filtered view of a frame is built and
+encoded once per distinct subscription.
+"""
+
+import time
+from typing import Dict, Optional
+
+THREAT_ORDER = {"normal": 0, "warning": 1, "suspicious": 2, "critical": 3}
+CHANNELS = ("detections", "fusion", "predictions", "alerts")
+FRAME_CHANNELS = ("detections", "fusion", "predictions")
+
+
+class Subscription:
+    __slots__ = ("cameras", "min_threat", "channels", "max_rate", "last_frame_at")
+
+    def __init__(
+        self,
+        cameras=None,
+        min_threat: str = "normal",
+        channels=CHANNELS,
+        max_rate: Optional[float] = None
+    ):
+        self.cameras = frozenset(cameras) if cameras is not None else None
+        self.min_threat = min_threat
+        self.channels = frozenset(channels)
+        self.max_rate = max_rate
+        self.last_frame_at = 0.0
+
+    @classmethod
+    def from_message(cls, message: Dict) -> "Subscription":
+        """Validate a subscribe request. Raises: ValueError"""
+        cameras = message.get("cameras")
+        if cameras is not None:
+            if not isinstance(cameras, list) or not all(isinstance(c, str) for c in cameras):
+                raise ValueError("cameras must be a list of camera ids")
+
+        min_threat = message.get("min_threat", "normal")
+        if min_threat not in THREAT_ORDER:
+            raise ValueError(f"min_threat must be one of {list(THREAT_ORDER)}")
+
+        channels = message.get("channels", list(CHANNELS))
+        if not isinstance(channels, list) or not set(channels) <= set(CHANNELS):
+            raise ValueError(f"channels must be a subset of {list(CHANNELS)}")
+
+        max_rate = message.get("max_rate")
+        if max_rate is not None and (not isinstance(max_rate, (int, float)) or max_rate <= 0):
+            raise ValueError("max_rate must be a positive number")
+
+        return cls(cameras, min_threat, channels, max_rate)
+
+    @property
+    def is_default(self) -> bool:
+        return (self.cameras is None and self.min_threat == "normal"
+                and self.channels == frozenset(CHANNELS) and self.max_rate is None)
+
+    @property
+    def view_key(self) -> tuple:
+        """Subscriptions with the same key see identical frame messages"""
+        return (THREAT_ORDER[self.min_threat], self.channels & frozenset(FRAME_CHANNELS))
+
+    def _wants_camera(self, camera_id) -> bool:
+        # Frames without a camera (mock mode, stalled camera) carry no camera's detections
+        return self.cameras is None or camera_id is None or camera_id in self.cameras
+
+    def accepts(self, message: Dict) -> bool:
+        """Should this message be queued for the client at all? Applies max_rate."""
+        kind = message.get("type")
+        if kind == "critical_alert":
+            return "alerts" in self.channels and self._wants_camera(message.get("camera_id"))
+        if kind != "frame_analysis":
+            return True
+
+        wanted = self.channels & frozenset(FRAME_CHANNELS)
+        if not wanted or not self._wants_camera(message.get("camera_id")):
+            return False
+        has_predictions = "predictions" in wanted and message.get("predictions") is not None
+        if wanted == {"predictions"} and not has_predictions:
+            return False
+
+        now = time.monotonic()
+        if self.max_rate and now - self.last_frame_at < 1.0 / self.max_rate and not has_predictions:
+            return False  # Throttled (frames carrying predictions always go through)
+        self.last_frame_at = now
+        return True
+
+    def view(self, message: Dict) -> Dict:
+        """The frame_analysis message as this subscription sees it"""
+        view = dict(message)
+        for channel in FRAME_CHANNELS:
+            if channel not in self.channels:
+                view.pop(channel, None)
+        if "detections" in view and self.min_threat != "normal":
+            floor = THREAT_ORDER[self.min_threat]
+            view["detections"] = [d for d in view["detections"]
+                                  if THREAT_ORDER.get(d.get("threat_level"), 0) >= floor]
+        return view
+
+    def to_dict(self) -> Dict:
+        return {
+            "cameras": sorted(self.cameras) if self.cameras is not None else None,
+            "min_threat": self.min_threat,
+            "channels": [c for c in CHANNELS if c in self.channels],
+            "max_rate": self.max_rate
+        }
@@ -0,0 +1,74 @@
+"""
+Tests for AdaptiveQualityController level changes and hysteresis
+"""
+
+import time
+
+from adaptive_quality import AdaptiveQualityController
+
+
+def feed(controller: AdaptiveQualityController, frames: int, latency_ms: float, inference_ms: float):
+    for _ in range(frames):
+        controller.record(time.time() - latency_ms / 1000, inference_ms)
+
+
+def controller(**kwargs) -> AdaptiveQualityController:
+    return AdaptiveQualityController(target_fps=30, max_latency_ms=100, hold_frames=5, **kwargs)
+
+
+def test_overload_steps_down_one_level_per_hold_period():
+    quality = controller()
+    feed(quality, 4, latency_ms=300, inference_ms=10)
+    assert quality.level == 0  # Still inside the first hold period
+    feed(quality, 1, latency_ms=300, inference_ms=10)
+    assert quality.level == 1
+    feed(quality, 4, latency_ms=300, inference_ms=10)
+    assert quality.level == 1
+    feed(quality, 1, latency_ms=300, inference_ms=10)
+    assert quality.level == 2
+    assert quality.last_change["reason"].startswith("latency")
+
+
+def test_slow_inference_alone_steps_down():
+    quality = controller()
+    feed(quality, 5, latency_ms=10, inference_ms=50)  # Over the 33 ms frame budget
+    assert quality.level == 1
+    assert "budget" in quality.last_change["reason"]
+
+
+def test_no_change_inside_the_hysteresis_band():
+    quality = controller(smoothing=1.0)  # No EWMA lag: react to the latest sample
+    feed(quality, 10, latency_ms=300, inference_ms=10)
+    assert quality.level == 2
+    # Under the limits but above headroom (60%): hold the current level
+    feed(quality, 100, latency_ms=80, inference_ms=25)
+    assert quality.level == 2
+
+
+def test_headroom_steps_back_up_to_full_quality():
+    quality = controller()
+    feed(quality, 10, latency_ms=300, inference_ms=10)
+    feed(quality, 200, latency_ms=10, inference_ms=5)
+    assert quality.level == 0
+    assert quality.last_change["reason"] == "headroom available"
+
+
+def test_levels_degrade_in_order_and_stop_at_the_last():
+    quality = controller()
+    seen = []
+    for _ in range(len(AdaptiveQualityController.LEVELS) + 3):
+        feed(quality, 5, latency_ms=500, inference_ms=100)
+        seen.append(dict(quality.settings))
+    assert quality.level == len(AdaptiveQualityController.LEVELS) - 1
+    assert [s["imgsz"] for s in seen] == sorted((s["imgsz"] for s in seen), reverse=True)
+    assert not quality.enrichment
+    assert quality.settings["frame_stride"] == 3
+    assert not quality.should_process(11, 9) and quality.should_process(12, 9)
+
+
+def test_disabled_controller_only_measures():
+    quality = AdaptiveQualityController.from_config({"adaptive_quality": False})
+    feed(quality, 50, latency_ms=500, inference_ms=100)
+    status = quality.get_status()
+    assert status["level"] == 0 and status["changes"] == 0
+    assert status["latency_ms"] > 400
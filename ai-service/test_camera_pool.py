@@ -0,0 +1,225 @@
+"""
+Tests for CameraPool batching/fan-in and the per-camera IoUTracker
+(fake engine and model; cameras are fed by committing frames directly)
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from camera_pool import CameraPool, IoUTracker, parse_video_sources
+from motion_gate import MotionGate
+from vision_engine import ResultPublisher, ThreadedCamera, TrackState
+
+
+def box(x: float, y: float = 0.0, size: float = 50.0):
+    return [x, y, x + size, y + size]
+
+
+def test_parse_video_sources():
+    sources = parse_video_sources("gate=http://10.0.0.5:8080/video, lobby=0,rtsp://cam/stream?a=b,")
+    assert sources == {"gate": "http://10.0.0.5:8080/video", "lobby": 0, "cam2": "rtsp://cam/stream?a=b"}
+
+
+def test_tracker_keeps_ids_for_moving_boxes():
+    tracker = IoUTracker()
+    first = tracker.update(np.array([box(0), box(200)]), np.array([0, 0]))
+    assert list(first) == [1, 2]
+    # Shifted a little and listed in the other order
+    second = tracker.update(np.array([box(205), box(5)]), np.array([0, 0]))
+    assert list(second) == [2, 1]
+
+
+def test_tracker_never_matches_across_classes():
+    tracker = IoUTracker()
+    tracker.update(np.array([box(0)]), np.array([0]))
+    ids = tracker.update(np.array([box(0)]), np.array([2]))
+    assert list(ids) == [2]
+
+
+def test_tracker_matches_each_track_once():
+    tracker = IoUTracker()
+    tracker.update(np.array([box(0)]), np.array([0]))
+    ids = tracker.update(np.array([box(0), box(2)]), np.array([0, 0]))
+    assert sorted(ids) == [1, 2]
+
+
+def test_tracker_forgets_tracks_after_max_age():
+    tracker = IoUTracker(max_age=3)
+    tracker.update(np.array([box(0)]), np.array([0]))
+    empty = np.zeros((0, 4), np.float32), np.zeros(0, np.int64)
+    tracker.update(*empty)
+    assert list(tracker.update(np.array([box(0)]), np.array([0]))) == [1]  # Survives a missed frame
+
+    for _ in range(3):
+        tracker.update(*empty)
+    assert len(tracker.ids) == 0
+    assert list(tracker.update(np.array([box(0)]), np.array([0]))) == [2]
+
+
+class Tensor:
+    def __init__(self, values):
+        self.values = np.asarray(values)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class Boxes:
+    def __init__(self, xyxy):
+        self.xyxy = Tensor(np.asarray(xyxy, np.float32).reshape(-1, 4))
+        self.conf = Tensor(np.full(len(xyxy), 0.9, np.float32))
+        self.cls = Tensor(np.zeros(len(xyxy), np.float32))
+        self.id = None
+
+    def __len__(self):
+        return len(self.xyxy.values)
+
+
+class Output:
+    names = {0: "person"}
+
+    def __init__(self, frame):
+        # One box per camera, at an x position read back from the frame's pixels
+        self.boxes = Boxes([box(float(frame[0, 0, 0]))])
+
+
+class FakeModel:
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, frames, **kwargs):
+        self.batches.append(len(frames))
+        return [Output(frame) for frame in frames]
+
+
+class FakeQuality:
+    enrichment = False
+    imgsz = 640
+
+    def should_process(self, seq, last_seq):
+        return True
+
+    def record(self, captured_at, latency_ms):
+        pass
+
+    def get_status(self):
+        return {}
+
+
+class FakeEngine:
+    """The attributes of VisionEngine that CameraPool uses"""
+
+    def __init__(self):
+        self.camera_id = "main"
+        self.camera = ThreadedCamera("http://127.0.0.1:9/video")
+        self.results = ResultPublisher()
+        self.state = TrackState()
+        self.ring_slots = 4
+        self.mirror = False
+        self.motion_config = {"enabled": False}
+        self.motion_gate = MotionGate.from_config(self.motion_config)
+        self.detection_log = None
+        self.quality = FakeQuality()
+        self.is_ready = True
+        self.model = FakeModel()
+
+    def build_detections(self, frame, xyxy, confs, cls_ids, track_ids, names, camera, state, **kwargs):
+        return [{"track_id": int(t), "class": names[int(c)], "bbox": [int(v) for v in b]}
+                for b, c, t in zip(xyxy, cls_ids, track_ids)]
+
+
+def feed(camera: ThreadedCamera, value: int) -> int:
+    frame = np.full((48, 64, 3), value, np.uint8)
+    camera._commit(frame, frame)
+    return camera.frame_seq
+
+
+@pytest.fixture
+def pool():
+    return CameraPool(FakeEngine(), {"gate": "http://127.0.0.1:9/gate", "lobby": "http://127.0.0.1:9/lobby"},
+                      batch_size=8)
+
+
+def run_once(pool: CameraPool):
+    pending = pool._collect()
+    try:
+        for i in range(0, len(pending), pool.batch_size):
+            pool._run_batch(pending[i:i + pool.batch_size])
+    finally:
+        pool._release(pending)
+
+
+def test_primary_camera_is_the_engines(pool):
+    assert list(pool.cameras) == ["main", "gate", "lobby"]
+    assert pool.results["main"] is pool.engine.results
+
+
+def test_cameras_share_one_forward_pass(pool):
+    for value, camera in zip((10, 20, 30), pool.cameras.values()):
+        feed(camera, value)
+    run_once(pool)
+
+    assert pool.engine.model.batches == [3]
+    for value, camera_id in zip((10, 20, 30), pool.cameras):
+        result = pool.results[camera_id].latest
+        assert result["camera_id"] == camera_id
+        assert result["detections"][0]["bbox"][0] == value
+        assert result["stats"]["batch_size"] == 3
+
+
+def test_only_cameras_with_new_frames_are_batched(pool):
+    feed(pool.cameras["gate"], 10)
+    run_once(pool)
+    assert pool.engine.model.batches == [1]
+    assert pool.results["gate"].seq == 1 and pool.results["lobby"].seq == 0
+
+    run_once(pool)  # Nothing new
+    assert pool.engine.model.batches == [1]
+
+
+def test_batches_are_capped_at_batch_size(pool):
+    pool.batch_size = 2
+    for camera in pool.cameras.values():
+        feed(camera, 10)
+    run_once(pool)
+    assert pool.engine.model.batches == [2, 1]
+
+
+def test_tracks_are_kept_per_camera(pool):
+    for _ in range(2):
+        for camera in pool.cameras.values():
+            feed(camera, 10)
+        run_once(pool)
+    # Same box on every camera: each camera's tracker numbers its own tracks
+    assert {r.latest["detections"][0]["track_id"] for r in pool.results.values()} == {1}
+
+
+def test_fan_in_drains_every_camera_of_a_batch(pool):
+    for value, camera in zip((10, 20, 30), pool.cameras.values()):
+        feed(camera, value)
+    run_once(pool)
+
+    results = asyncio.run(pool.all_results.next_results(0, timeout=0.1))
+    assert [r["camera_id"] for r in results] == ["main", "gate", "lobby"]
+    assert [r["seq"] for r in results] == [1, 2, 3]
+    # The per-camera publishers keep their own sequence numbers
+    assert all(r.seq == 1 for r in pool.results.values())
+
+    feed(pool.cameras["lobby"], 40)
+    run_once(pool)
+    results = asyncio.run(pool.all_results.next_results(3, timeout=0.1))
+    assert [r["camera_id"] for r in results] == ["lobby"]
+
+
+def test_fan_in_history_is_bounded():
+    publisher = ResultPublisher(history=3)
+    for i in range(5):
+        publisher.publish({"i": i})
+    results = asyncio.run(publisher.next_results(0, timeout=0.1))
+    assert [r["i"] for r in results] == [2, 3, 4]
+    assert asyncio.run(publisher.next_results(5, timeout=0.01)) == []
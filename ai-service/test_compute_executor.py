@@ -0,0 +1,75 @@
+"""
+Tests for ComputeExecutor admission control and stats
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from compute_executor import ComputeExecutor, ExecutorOverloaded
+
+
+@pytest.fixture
+def executor():
+    executor = ComputeExecutor(max_workers=2, max_queue=1, admission_timeout=0.05)
+    yield executor
+    executor.shutdown()
+
+
+def test_runs_off_the_event_loop(executor):
+    async def run():
+        return await executor.run(threading.get_ident), threading.get_ident()
+
+    worker, loop_thread = asyncio.run(run())
+    assert worker != loop_thread
+    assert executor.get_stats()["completed"] == 1
+
+
+def test_excess_callers_are_shed_after_the_admission_timeout(executor):
+    release = threading.Event()
+
+    async def run():
+        # 2 running + 1 queued fill every slot
+        admitted = [asyncio.create_task(executor.run(release.wait, 5)) for _ in range(3)]
+        await asyncio.sleep(0.02)
+        stats = executor.get_stats()
+        with pytest.raises(ExecutorOverloaded):
+            await executor.run(sum, [1, 2])
+        release.set()
+        return stats, await asyncio.gather(*admitted)
+
+    stats, results = asyncio.run(run())
+    assert stats["in_flight"] == 3 and stats["queue_depth"] == 1
+    assert results == [True, True, True]
+    stats = executor.get_stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 3 and stats["in_flight"] == 0
+
+
+def test_queued_caller_is_admitted_when_a_slot_frees(executor):
+    async def run():
+        executor.admission_timeout = 2.0
+        release = threading.Event()
+        admitted = [asyncio.create_task(executor.run(release.wait, 5)) for _ in range(3)]
+        await asyncio.sleep(0.02)
+        waiting = asyncio.create_task(executor.run(sum, [1, 2]))
+        await asyncio.sleep(0.02)
+        assert not waiting.done()
+        release.set()
+        await asyncio.gather(*admitted)
+        return await waiting
+
+    assert asyncio.run(run()) == 3
+    assert executor.get_stats()["rejected"] == 0
+
+
+def test_failures_release_their_slot(executor):
+    async def run():
+        for _ in range(5):
+            with pytest.raises(ZeroDivisionError):
+                await executor.run(lambda: 1 / 0)
+        return await executor.run(sum, [1, 2])
+
+    assert asyncio.run(run()) == 3
+    stats = executor.get_stats()
+    assert stats["failed"] == 5 and stats["in_flight"] == 0
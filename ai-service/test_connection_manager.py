@@ -0,0 +1,144 @@
+"""
+Tests for per-client send queues: coalescing, drop policy and fan-out
+"""
+
+import asyncio
+
+from connection_manager import ClientConnection, ConnectionManager, OutboundMessage
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0, subprotocols=(), query=None):
+        self.delay = delay
+        self.scope = {"subprotocols": list(subprotocols)}
+        self.query_params = query or {}
+        self.client = None
+        self.sent = []
+        self.closed_with = None
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, payload):
+        await asyncio.sleep(self.delay)
+        self.sent.append(payload)
+
+    async def send_bytes(self, payload):
+        await asyncio.sleep(self.delay)
+        self.sent.append(payload)
+
+    async def close(self, code=1000):
+        self.closed_with = code
+
+
+def frame(camera_id="cam1", frame_id=0):
+    return OutboundMessage({"type": "frame_analysis", "camera_id": camera_id, "frame_id": frame_id})
+
+
+def message(kind: str, i: int = 0):
+    return OutboundMessage({"type": kind, "i": i})
+
+
+def queued(client: ClientConnection):
+    return [entry[1].message for entry in client.queue]
+
+
+def test_frames_are_coalesced_per_camera():
+    client = ClientConnection(FakeWebSocket(), max_queue=10)
+    client.enqueue(frame("cam1", 1))
+    client.enqueue(message("fusion_update"))
+    client.enqueue(frame("cam2", 1))
+    client.enqueue(frame("cam1", 2))
+    client.enqueue(frame("cam1", 3))
+
+    assert [(m["type"], m.get("camera_id"), m.get("frame_id")) for m in queued(client)] == [
+        ("frame_analysis", "cam1", 3), ("fusion_update", None, None), ("frame_analysis", "cam2", 1)
+    ]
+    assert client.coalesced == 2 and client.dropped == 0
+
+
+def test_sent_frame_is_not_replaced():
+    client = ClientConnection(FakeWebSocket(), max_queue=10)
+    client.enqueue(frame("cam1", 1))
+    # What the sender does when it takes the entry
+    key, _, _ = client.queue.popleft()
+    client.pending.pop(key)
+    client.enqueue(frame("cam1", 2))
+    assert [m["frame_id"] for m in queued(client)] == [2]
+    assert client.coalesced == 0
+
+
+def test_full_queue_drops_oldest_droppable():
+    client = ClientConnection(FakeWebSocket(), max_queue=3)
+    client.enqueue(message("critical_alert", 0))
+    client.enqueue(frame("cam1", 1))
+    client.enqueue(message("status", 1))
+    client.enqueue(message("status", 2))
+
+    assert [m["type"] for m in queued(client)] == ["critical_alert", "status", "status"]
+    assert client.dropped == 1
+    assert not client.pending  # The dropped frame no longer coalesces
+
+
+def test_never_drop_messages_may_exceed_the_limit():
+    client = ClientConnection(FakeWebSocket(), max_queue=2)
+    for i in range(2):
+        client.enqueue(message("status", i))
+    for i in range(3):
+        client.enqueue(message("critical_alert", i))
+
+    # Must-deliver messages go past the limit without evicting anything
+    assert [m["type"] for m in queued(client)] == ["status"] * 2 + ["critical_alert"] * 3
+    assert client.dropped == 0
+    # The next droppable message makes room by evicting the oldest droppable one
+    client.enqueue(message("status", 2))
+    assert [(m["type"], m["i"]) for m in queued(client)] == [
+        ("status", 1), ("critical_alert", 0), ("critical_alert", 1), ("critical_alert", 2), ("status", 2)
+    ]
+    assert client.dropped == 1
+
+
+def test_newcomer_is_dropped_when_queue_is_all_must_deliver():
+    client = ClientConnection(FakeWebSocket(), max_queue=2)
+    client.enqueue(message("connection"))
+    client.enqueue(message("critical_alert"))
+    client.enqueue(frame("cam1", 1))
+
+    assert [m["type"] for m in queued(client)] == ["connection", "critical_alert"]
+    assert client.dropped == 1
+    assert not client.pending
+
+
+def test_slow_client_does_not_hold_back_fast_ones():
+    async def run():
+        manager = ConnectionManager(max_queue=4, max_lag=60, send_timeout=5)
+        fast, slow = FakeWebSocket(), FakeWebSocket(delay=0.05)
+        await manager.connect(fast)
+        await manager.connect(slow)
+        for i in range(20):
+            await manager.broadcast({"type": "frame_analysis", "camera_id": None, "frame_id": i})
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.2)
+        stats = {c.websocket: c for c in manager.clients.values()}
+        for websocket in (fast, slow):
+            manager.disconnect(websocket)
+        return fast, slow, stats
+
+    fast, slow, stats = asyncio.run(run())
+    assert len(fast.sent) == 20
+    assert len(slow.sent) < 20 and stats[slow].coalesced > 0
+    assert '"frame_id": 19' in slow.sent[-1]  # Coalescing kept the newest frame
+
+
+def test_send_timeout_disconnects_the_client():
+    async def run():
+        manager = ConnectionManager(send_timeout=0.05)
+        stuck = FakeWebSocket(delay=1.0)
+        await manager.connect(stuck)
+        await manager.broadcast({"type": "status"})
+        await asyncio.sleep(0.2)
+        return manager, stuck
+
+    manager, stuck = asyncio.run(run())
+    assert not manager.clients
+    assert manager.lagging_disconnects == 1 and stuck.closed_with == 1013
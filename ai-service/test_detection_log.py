@@ -0,0 +1,83 @@
+"""
+Tests for DetectionLog: segment writes, pruned queries and retention
+"""
+
+import os
+import random
+import time
+
+from detection_log import DetectionLog
+
+DAY = 86400
+
+
+def detections(n: int, threat: str = "normal"):
+    return [{"track_id": i, "class": "person", "confidence": 0.9,
+             "bbox": [i, 0, i + 10, 10], "threat_level": threat} for i in range(n)]
+
+
+def test_pruned_queries(tmp_path):
+    random.seed(0)
+    log = DetectionLog(str(tmp_path), segment_seconds=3600, max_rows=4000)
+    log.start()
+    cameras = ["cam1", "cam2", "cam3", "cam4"]
+    t0 = time.time() - 600
+    frames = 600  # 20 s of video per camera
+    for f in range(frames):
+        for camera in cameras:
+            log.append(camera, [{
+                "track_id": i, "class": "person" if i else random.choice(["car", "knife"]),
+                "confidence": random.uniform(0.4, 0.99), "bbox": [i * 10, 20, i * 10 + 50, 140],
+                "threat_level": "critical" if i == 0 and camera == "cam3" else "normal"
+            } for i in range(20)], timestamp=t0 + f / 30, frame_id=f)
+    log.stop()
+
+    total = frames * len(cameras) * 20
+    assert log.get_stats()["indexed_rows"] == total
+    everything = log.query(t0, t0 + 3600, limit=10 ** 7)
+    assert everything["total"] == total
+
+    window = log.query(t0 + 10, t0 + 11, cameras=["cam2"])
+    assert window["total"] == 30 * 20 + 20
+    assert all(r["camera_id"] == "cam2" for r in window["rows"])
+
+    knives = log.query(t0, t0 + 3600, classes=["knife"], min_threat="critical")
+    assert 0 < knives["total"] < frames
+    assert knives["segments_scanned"] < everything["segments_scanned"]
+    assert all(r["class"] == "knife" and r["camera_id"] == "cam3" for r in knives["rows"])
+
+
+def test_retention_deletes_old_segments_and_their_index_rows(tmp_path):
+    log = DetectionLog(str(tmp_path), retention_days=7)
+    now = time.time()
+    log.append("cam1", detections(5), timestamp=now - 10 * DAY)
+    log.append("cam2", detections(5), timestamp=now - 8 * DAY)
+    log._seal(force=True)
+    log.append("cam1", detections(5), timestamp=now - DAY)
+    log._seal(force=True)
+    files = [os.path.join(root, f) for root, _, names in os.walk(tmp_path) for f in names if f.endswith(".npz")]
+    assert len(files) == 3
+
+    assert log.enforce_retention(now) == 2
+    assert sum(os.path.exists(f) for f in files) == 1
+    stats = log.get_stats()
+    assert stats["segments"] == 1 and stats["segments_deleted"] == 2
+    with log._connect() as db:
+        assert db.execute("SELECT COUNT(*) FROM segment_classes").fetchone()[0] == 1
+    # Emptied day directories go too
+    assert not os.path.isdir(os.path.dirname(sorted(files)[0]))
+
+    assert log.query(now - 30 * DAY, now)["total"] == 5
+    assert log.enforce_retention(now) == 0
+
+
+def test_writer_thread_runs_retention(tmp_path):
+    log = DetectionLog(str(tmp_path), retention_days=1, retention_interval=0)
+    log.append("cam1", detections(3), timestamp=time.time() - 2 * DAY)
+    log._seal(force=True)
+    log.start()
+    deadline = time.time() + 5
+    while log.segments_deleted == 0 and time.time() < deadline:
+        time.sleep(0.05)
+    log.stop()
+    assert log.segments_deleted == 1
@@ -0,0 +1,181 @@
+"""
+Tests for EventStore on a throwaway SQLite database
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from database import Base
+from event_store import EventStore
+
+LEGACY_EVENT = (
+    "INSERT INTO events (id, timestamp, source, object_class, confidence, threat_level) "
+    "VALUES (:id, :ts, 'cam', 'person', 0.9, 'normal')"
+)
+
+
+def make_engine(tmp_path):
+    return create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'events.db'}")
+
+
+async def scalar(engine, sql: str, **params):
+    async with engine.connect() as conn:
+        return (await conn.execute(text(sql), params)).scalar()
+
+
+async def seed_legacy(engine, rows):
+    """A database from before partitioning: plain events table, alerts without event_time"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(text("ALTER TABLE alerts DROP COLUMN event_time"))
+        for event_id, timestamp in rows:
+            await conn.execute(text(LEGACY_EVENT), {"id": event_id, "ts": timestamp})
+        await conn.execute(text("INSERT INTO alerts (title, severity, event_id) VALUES ('legacy', 'critical', 2)"))
+
+
+def test_setup_moves_legacy_sqlite_events_into_day_tables(tmp_path):
+    async def run():
+        engine = make_engine(tmp_path)
+        day1, day2 = datetime(2026, 3, 1, 10, 0), datetime(2026, 3, 2, 11, 0)
+        await seed_legacy(engine, [(1, day1), (2, day1 + timedelta(minutes=5)), (3, day2)])
+
+        store = EventStore(engine=engine)
+        await store.setup()
+
+        assert await scalar(engine, "SELECT COUNT(*) FROM events") == 0
+        assert await scalar(engine, "SELECT COUNT(*) FROM events_p20260301") == 2
+        assert await scalar(engine, "SELECT id FROM events_p20260302") == 3
+        # The alert still locates its event: same id, partition from event_time
+        event_time = await scalar(engine, "SELECT event_time FROM alerts WHERE event_id = 2")
+        assert event_time.startswith("2026-03-01 10:05")
+
+        # Running setup again is a no-op
+        await store.setup()
+        assert await scalar(engine, "SELECT COUNT(*) FROM events_p20260301") == 2
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_legacy_ids_are_shifted_past_existing_day_rows(tmp_path):
+    async def run():
+        engine = make_engine(tmp_path)
+        day = datetime(2026, 3, 1, 10, 0)
+        await seed_legacy(engine, [(1, day), (2, day)])
+        store = EventStore(engine=engine)
+        async with engine.begin() as conn:
+            await store._create_partition(conn, day.date())
+            await conn.execute(text(
+                "INSERT INTO events_p20260301 (id, timestamp, object_class) VALUES (1, :ts, 'car'), (2, :ts, 'car')"
+            ), {"ts": day})
+
+        await store.setup()
+
+        assert await scalar(engine, "SELECT COUNT(*) FROM events_p20260301") == 4
+        assert await scalar(engine, "SELECT object_class FROM events_p20260301 WHERE id = 4") == "person"
+        assert await scalar(engine, "SELECT event_id FROM alerts") == 4
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_moved_legacy_events_are_rolled_up(tmp_path):
+    async def run():
+        engine = make_engine(tmp_path)
+        day = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(days=1)
+        await seed_legacy(engine, [(1, day), (2, day), (3, day + timedelta(minutes=1))])
+
+        store = EventStore(engine=engine)
+        await store.setup()
+        await store.rollup()
+
+        assert store.events_rolled_up == 3
+        assert await scalar(engine, "SELECT SUM(count) FROM event_rollups WHERE granularity = 'hour'") == 3
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def event(timestamp: datetime, object_class: str = "person", confidence: float = 0.5):
+    return {"timestamp": timestamp, "frame_id": 1, "source": "cam", "object_class": object_class,
+            "confidence": confidence, "bbox": [0, 0, 1, 1], "threat_level": "normal"}
+
+
+async def insert(store: EventStore, rows):
+    async with AsyncSession(store.engine) as db:
+        await store.insert_events(db, rows)
+        await db.commit()
+
+
+async def rollup_until(store: EventStore, upto: datetime):
+    """Run a rollup whose window ends at `upto` (a minute boundary in the past)"""
+    store.rollup_lag = (datetime.utcnow() - upto).total_seconds()
+    await store.rollup()
+
+
+def test_rollup_counts_each_event_exactly_once(tmp_path):
+    async def run():
+        engine = make_engine(tmp_path)
+        store = EventStore(engine=engine)
+        await store.setup()
+        t0 = datetime.utcnow().replace(minute=0, second=0, microsecond=0) - timedelta(days=2)
+        await insert(store, [event(t0 + timedelta(minutes=m), confidence=0.2 + m / 100) for m in range(0, 60, 10)])
+        # Exactly on the first window's end: belongs to the second window
+        await insert(store, [event(t0 + timedelta(hours=1)), event(t0 + timedelta(hours=1, minutes=30), "car")])
+
+        await rollup_until(store, t0 + timedelta(hours=1))
+        assert store.events_rolled_up == 6
+        await rollup_until(store, t0 + timedelta(hours=1))  # Nothing past the watermark
+        assert store.events_rolled_up == 6 and store.rollup_runs == 1
+
+        await rollup_until(store, t0 + timedelta(hours=2))
+        assert store.events_rolled_up == 8
+        await rollup_until(store, t0 + timedelta(hours=2))
+        assert store.events_rolled_up == 8
+
+        # Events from different runs landing in the same bucket are merged, not duplicated
+        await insert(store, [event(t0 + timedelta(hours=2, minutes=5)), event(t0 + timedelta(hours=2, minutes=50))])
+        await rollup_until(store, t0 + timedelta(hours=2, minutes=30))
+        await rollup_until(store, t0 + timedelta(hours=3))
+
+        assert await scalar(engine, "SELECT SUM(count) FROM event_rollups WHERE granularity = 'minute'") == 10
+        assert await scalar(engine, "SELECT SUM(count) FROM event_rollups WHERE granularity = 'hour'") == 10
+        assert await scalar(engine, "SELECT count FROM event_rollups WHERE granularity = 'hour' "
+                                    "AND object_class = 'person' AND bucket_start LIKE :h",
+                            h=f"{(t0 + timedelta(hours=2)):%Y-%m-%d %H}%") == 2
+        assert await scalar(engine, "SELECT COUNT(*) FROM event_rollups WHERE granularity = 'hour'") == 4
+
+        hours = await store.query_rollups("hour", start=t0, end=t0 + timedelta(hours=3), object_class="person")
+        assert [row["count"] for row in hours] == [6, 1, 2]
+        assert hours[0]["avg_confidence"] == 0.45 and hours[0]["max_confidence"] == 0.7
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_retention_keeps_partitions_the_rollup_has_not_passed(tmp_path):
+    async def run():
+        engine = make_engine(tmp_path)
+        store = EventStore(engine=engine, retention_days=1)
+        await store.setup()
+        old = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=3)
+        await insert(store, [event(old), event(old + timedelta(days=1))])
+
+        # Past the whole first day, not the second
+        await rollup_until(store, old + timedelta(hours=13))
+        await store.enforce_retention()
+        assert store.partitions_dropped == 1
+        async with engine.connect() as conn:
+            days = await store.list_partitions(conn)
+        assert (old + timedelta(days=1)).date() in days and old.date() not in days
+
+        await rollup_until(store, datetime.utcnow().replace(second=0, microsecond=0) - timedelta(minutes=1))
+        await store.enforce_retention()
+        assert store.partitions_dropped == 2
+        assert await scalar(engine, "SELECT SUM(count) FROM event_rollups WHERE granularity = 'hour'") == 2
+        await engine.dispose()
+
+    asyncio.run(run())
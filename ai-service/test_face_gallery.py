@@ -0,0 +1,241 @@
+"""
+Tests for the face gallery template cache, IVF index, snapshots and
+directory watcher
+"""
+
+import hashlib
+import os
+import time
+
+import numpy as np
+import pytest
+
+from face_gallery import DirectoryWatcher, FaceGalleryCache, GallerySnapshot, IVFIndex, gallery_fingerprint
+
+DIM = 256
+
+
+def normalized(rows: np.ndarray) -> np.ndarray:
+    rows = rows - rows.mean(axis=1, keepdims=True)
+    return (rows / np.linalg.norm(rows, axis=1, keepdims=True)).astype(np.float32)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(1)
+
+
+class Extractor:
+    """Deterministic template per image content; records which files were processed"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, path):
+        self.calls.append(os.path.basename(path))
+        with open(path, "rb") as f:
+            data = f.read()
+        if data.startswith(b"noface"):
+            return None
+        seed = int.from_bytes(hashlib.sha1(data).digest()[:4], "little")
+        return normalized(np.random.default_rng(seed).random((1, DIM)))[0]
+
+
+def write_images(directory, rng, n: int = 20):
+    os.makedirs(directory, exist_ok=True)
+    for i in range(n):
+        with open(os.path.join(directory, f"person_{i:02d}.jpg"), "wb") as f:
+            f.write(rng.bytes(256))
+
+
+def test_sync_only_processes_new_or_changed_images(tmp_path, rng):
+    images, cache_dir = str(tmp_path / "faces"), str(tmp_path / "cache")
+    write_images(images, rng)
+    extract = Extractor()
+
+    files, hashes, templates = FaceGalleryCache(cache_dir, dim=DIM).sync(images, extract)
+    assert len(files) == 20 and len(extract.calls) == 20
+    assert isinstance(templates, np.memmap)
+
+    extract.calls.clear()
+    with open(os.path.join(images, "person_05.jpg"), "wb") as f:
+        f.write(rng.bytes(256))  # Changed content
+    os.remove(os.path.join(images, "person_10.jpg"))
+    cache = FaceGalleryCache(cache_dir, dim=DIM)
+    files, hashes2, templates2 = cache.sync(images, extract)
+
+    assert extract.calls == ["person_05.jpg"]
+    assert len(files) == 19 and cache.hits == 18
+    assert gallery_fingerprint(hashes) != gallery_fingerprint(hashes2)
+    assert np.allclose(templates2[files.index("person_05.jpg")], extract(os.path.join(images, "person_05.jpg")))
+
+
+def test_rejected_images_are_not_processed_again(tmp_path, rng):
+    images, cache_dir = str(tmp_path / "faces"), str(tmp_path / "cache")
+    write_images(images, rng, n=3)
+    with open(os.path.join(images, "blurry.jpg"), "wb") as f:
+        f.write(b"noface")
+    extract = Extractor()
+    files, _, _ = FaceGalleryCache(cache_dir, dim=DIM).sync(images, extract)
+    assert "blurry.jpg" not in files
+
+    extract.calls.clear()
+    cache = FaceGalleryCache(cache_dir, dim=DIM)
+    cache.sync(images, extract)
+    assert extract.calls == []
+    assert cache.hits == 3
+
+
+def test_unreadable_cache_is_rebuilt(tmp_path, rng):
+    images, cache_dir = str(tmp_path / "faces"), str(tmp_path / "cache")
+    write_images(images, rng, n=3)
+    FaceGalleryCache(cache_dir, dim=DIM).sync(images, Extractor())
+    with open(os.path.join(cache_dir, "manifest.json"), "w") as f:
+        f.write("{")
+    extract = Extractor()
+    files, _, _ = FaceGalleryCache(cache_dir, dim=DIM).sync(images, extract)
+    assert len(files) == len(extract.calls) == 3
+
+
+def test_index_is_reused_and_reassigned(tmp_path, rng):
+    big = normalized(rng.standard_normal((400, DIM)).astype(np.float32))
+    cache = FaceGalleryCache(str(tmp_path), dim=DIM)
+    first = cache.index(big, "a" * 40)
+    assert cache.index(big, "a" * 40).fingerprint == "a" * 40
+
+    # +5% rows: the saved centroids are kept and only the assignment is redone
+    grown = cache.index(np.vstack([big, big[:20]]), "b" * 40)
+    assert np.array_equal(grown.centroids, first.centroids)
+    assert len(grown.order) == 420
+
+
+def test_extended_and_without_keep_row_ids_consistent(rng):
+    gallery = normalized(rng.standard_normal((200, DIM)).astype(np.float32))
+    index = IVFIndex.build(gallery[:150])
+    extended = index.extended(gallery[150:])
+    assert sorted(extended.order) == list(range(200))
+    assert extended.search(gallery, gallery[180], k=1)[0][0] == 180
+
+    smaller = extended.without(0)
+    assert sorted(smaller.order) == list(range(199))
+    assert smaller.search(gallery[1:], gallery[180], k=1)[0][0] == 179
+
+
+def test_ivf_recall_against_exact_search(rng):
+    n = 3000
+    prototypes = rng.standard_normal((60, DIM)).astype(np.float32)
+    gallery = normalized(prototypes[rng.integers(0, 60, n)] + 1.5 * rng.standard_normal((n, DIM)).astype(np.float32))
+    index = IVFIndex.build(gallery)
+
+    targets = rng.integers(0, n, 200)
+    probes = normalized(gallery[targets] + 0.02 * rng.standard_normal((200, DIM)).astype(np.float32))
+    exact = [int(np.argmax(gallery @ p)) for p in probes]
+    approx = [int(index.search(gallery, p, k=1)[0][0]) for p in probes]
+    recall = np.mean([a == e for a, e in zip(approx, exact)])
+    assert recall >= 0.95
+
+
+def test_index_save_and_load_round_trip(tmp_path, rng):
+    gallery = normalized(rng.standard_normal((100, DIM)).astype(np.float32))
+    index = IVFIndex.build(gallery, nlist=8)
+    index.fingerprint = "c" * 40
+    path = str(tmp_path / "ivf.npz")
+    index.save(path)
+    loaded = IVFIndex.load(path)
+    assert loaded.fingerprint == "c" * 40 and loaded.trained_rows == 100
+    assert np.array_equal(loaded.order, index.order)
+    assert IVFIndex.load(str(tmp_path / "missing.npz")) is None
+
+
+def build(rng, n: int) -> GallerySnapshot:
+    snapshot = GallerySnapshot.empty(DIM)
+    for i in range(n):
+        snapshot = snapshot.with_row(f"p{i}.jpg", f"P{i}", f"{i:040d}", normalized(rng.standard_normal((1, DIM)))[0])
+    return snapshot
+
+
+def test_with_row_appends_into_a_shared_buffer(rng):
+    snapshot = build(rng, 3)
+    before = snapshot.gallery
+    grown = snapshot.with_row("new.jpg", "New", "f" * 40, normalized(rng.standard_normal((1, DIM)))[0])
+
+    assert np.shares_memory(grown.gallery, before)  # No copy of the existing rows
+    assert len(snapshot) == 3 and snapshot.gallery.shape == (3, DIM)  # Old snapshot unchanged
+    assert len(grown) == 4 and grown.files[-1] == "new.jpg"
+    assert not grown.gallery.flags.writeable
+
+
+def test_appending_to_an_older_snapshot_does_not_clobber_the_newer_one(rng):
+    base = build(rng, 3)
+    first = base.with_row("a.jpg", "A", "a" * 40, normalized(rng.standard_normal((1, DIM)))[0])
+    row_a = first.gallery[3].copy()
+    second = base.with_row("b.jpg", "B", "b" * 40, normalized(rng.standard_normal((1, DIM)))[0])
+
+    assert not np.shares_memory(second.gallery, first.gallery)
+    assert np.array_equal(first.gallery[3], row_a)
+    assert second.files[-1] == "b.jpg" and first.files[-1] == "a.jpg"
+
+
+def test_buffer_grows_when_full(rng):
+    views = [build(rng, 16)]
+    for i in range(40):
+        views.append(views[-1].with_row(f"x{i}.jpg", "X", f"{i:040x}", normalized(rng.standard_normal((1, DIM)))[0]))
+    assert len(views[-1]) == 56
+    # Every snapshot still sees its own rows after the reallocations
+    for view in views:
+        assert view.files == views[-1].files[:len(view)]
+        assert np.array_equal(view.gallery, views[-1].gallery[:len(view)])
+
+
+def test_without_copies_and_replacing_moves_to_the_end(rng):
+    snapshot = build(rng, 4)
+    smaller = snapshot.without("p1.jpg")
+    assert smaller.files == ("p0.jpg", "p2.jpg", "p3.jpg")
+    assert np.array_equal(smaller.gallery, snapshot.gallery[[0, 2, 3]])
+    assert not np.shares_memory(smaller.gallery, snapshot.gallery)
+    assert len(snapshot) == 4
+
+    template = normalized(rng.standard_normal((1, DIM)))[0]
+    replaced = snapshot.with_row("p0.jpg", "P0", "e" * 40, template)
+    assert replaced.files == ("p1.jpg", "p2.jpg", "p3.jpg", "p0.jpg")
+    assert np.array_equal(replaced.gallery[-1], template)
+    assert replaced.fingerprint != snapshot.fingerprint
+
+
+def test_snapshot_index_follows_rows(rng):
+    rows = normalized(rng.standard_normal((40, DIM)).astype(np.float32))
+    snapshot = GallerySnapshot([f"{i}.jpg" for i in range(40)], [""] * 40, [f"{i:040d}" for i in range(40)],
+                               rows, IVFIndex.build(rows, nlist=4))
+    grown = snapshot.with_row("new.jpg", "New", "f" * 40, rows[7])
+    assert sorted(grown.index.order) == list(range(41))
+    smaller = grown.without("3.jpg")
+    assert sorted(smaller.index.order) == list(range(40))
+    ids, _ = smaller.index.search(smaller.gallery, rows[20], k=1)
+    assert smaller.files[ids[0]] == "20.jpg"
+
+
+def test_directory_watcher_reports_settled_changes(tmp_path):
+    added, removed = [], []
+    watcher = DirectoryWatcher(str(tmp_path), added.append, removed.append)
+    (tmp_path / "known.jpg").write_bytes(b"1")
+    watcher.seen = watcher._scan()
+
+    (tmp_path / "new.jpg").write_bytes(b"12")
+    (tmp_path / "notes.txt").write_bytes(b"x")
+    watcher.poll()
+    assert added == []  # Reported once it held still for a poll
+    watcher.poll()
+    assert added == [str(tmp_path / "new.jpg")]
+
+    (tmp_path / "uploaded.jpg").write_bytes(b"123")
+    watcher.mark("uploaded.jpg")  # Already applied through the API
+    os.remove(tmp_path / "known.jpg")
+    watcher.poll()
+    watcher.poll()
+    assert added == [str(tmp_path / "new.jpg")]
+    assert removed == ["known.jpg"]
+
+    os.utime(tmp_path / "new.jpg", (time.time() + 10, time.time() + 10))
+    watcher.poll()
+    watcher.poll()
+    assert added[-1] == str(tmp_path / "new.jpg") and watcher.added == 2
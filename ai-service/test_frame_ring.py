@@ -0,0 +1,89 @@
+"""
+Tests for FrameRing: sequence validity and zero-copy holds
+"""
+
+from frame_ring import FrameRing
+
+
+def write(ring: FrameRing, value: int) -> int:
+    buffer = ring.next_buffer((4, 4, 3))
+    buffer[:] = value
+    return ring.commit()
+
+
+def test_views_expire_after_slots_minus_two_newer_frames():
+    ring = FrameRing(4)
+    seq = write(ring, 1)
+    write(ring, 2)
+    write(ring, 3)
+    assert ring.is_valid(seq)
+    write(ring, 4)
+    assert not ring.is_valid(seq)
+    assert ring.get(seq) is None
+
+
+def test_unheld_buffers_are_reused_in_place():
+    ring = FrameRing(4)
+    for value in range(8):
+        write(ring, value)
+    buffers = [id(b) for b in ring.buffers]
+    for value in range(8):
+        write(ring, value)
+    assert [id(b) for b in ring.buffers] == buffers
+
+
+def test_held_frame_survives_wraparound_without_copy():
+    ring = FrameRing(4)
+    for value in range(1, 4):
+        write(ring, value)
+    held = ring.hold(3)
+    buffer = ring.holds[3][1]
+    assert held.base is buffer
+
+    for value in range(4, 20):
+        write(ring, value)
+    assert not ring.is_valid(3)
+    assert (held == 3).all()
+
+    ring.release(3)
+    assert not ring.holds
+    assert ring.spare is buffer
+
+
+def test_spare_is_reused_for_the_next_held_slot():
+    ring = FrameRing(4)
+    write(ring, 1)
+    ring.hold(1)
+    for value in range(4):
+        write(ring, value)
+    ring.release(1)
+    spare = ring.spare
+
+    seq = ring.seq
+    held = ring.hold(seq)
+    for _ in range(4):
+        write(ring, 99)
+    assert ring.spare is None
+    assert any(b is spare for b in ring.buffers)
+    assert (held == 3).all()
+    ring.release(seq)
+
+
+def test_holds_are_counted():
+    ring = FrameRing(4)
+    seq = write(ring, 7)
+    ring.hold(seq)
+    ring.hold(seq)
+    ring.release(seq)
+    assert seq in ring.holds
+    ring.release(seq)
+    assert seq not in ring.holds
+    ring.release(seq)  # Unbalanced release is ignored
+
+
+def test_cannot_hold_an_expired_frame():
+    ring = FrameRing(2)
+    seq = write(ring, 1)
+    write(ring, 2)
+    assert ring.hold(seq) is None
+    assert not ring.holds
@@ -0,0 +1,137 @@
+"""
+Tests for DetectionIngestor batching and retries (no database: the
+connection pool is replaced by an in-memory fake)
+"""
+
+import numpy as np
+import pytest
+
+import ingestion
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def copy_expert(self, sql, buffer):
+        if self.db.failures:
+            self.db.failures -= 1
+            raise RuntimeError("server closed the connection unexpectedly")
+        self.db.staged.append(buffer.getvalue().count("\n"))
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.closed = 0
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.db.rows += sum(self.db.staged)
+        self.db.staged.clear()
+
+    def rollback(self):
+        self.db.staged.clear()
+
+
+class FakePool:
+    """Stands in for psycopg2's ThreadedConnectionPool"""
+
+    def __init__(self, *args, **kwargs):
+        self.rows = 0
+        self.failures = 0
+        self.staged = []
+        self.discarded = 0
+        self.closed = False
+
+    def getconn(self):
+        return FakeConnection(self)
+
+    def putconn(self, conn, close=False):
+        self.discarded += bool(close)
+
+    def closeall(self):
+        self.closed = True
+
+
+class Boxes:
+    def __init__(self, n):
+        self.xywh = np.full((n, 4), 10.0, np.float32)
+        self.conf = np.full(n, 0.9, np.float32)
+        self.cls = np.zeros(n, np.float32)
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class Result:
+    def __init__(self, n):
+        self.boxes = Boxes(n)
+        self.names = {0: "person"}
+
+
+@pytest.fixture
+def ingestor(monkeypatch):
+    monkeypatch.setattr(ingestion.pool, "ThreadedConnectionPool", FakePool)
+    ingestor = ingestion.DetectionIngestor(batch_size=10, flush_interval=60, max_retries=3)
+    yield ingestor
+    ingestor.close()
+
+
+def test_results_to_rows_filters_by_confidence():
+    result = Result(3)
+    result.boxes.conf[1] = 0.2
+    rows = ingestion.results_to_rows("drone", [result])
+    assert [row[1:3] for row in rows] == [("person", 90), ("person", 90)]
+
+
+def test_rows_are_written_in_batches(ingestor):
+    assert ingestor.submit("drone", [Result(25)]) == 25
+    ingestor.flush()
+    assert ingestor.pool.rows == 25
+    assert ingestor.batches == 3
+
+
+def test_failed_batch_is_retried_on_the_next_flush(ingestor):
+    ingestor.pool.failures = 1
+    ingestor.submit("drone", [Result(25)])
+    ingestor.flush()
+    # The failure stops the flush; nothing is dropped
+    assert ingestor.pool.rows == 0
+    assert ingestor.retry_rows == 25
+    assert ingestor.pool.discarded == 1
+
+    ingestor.flush()
+    assert ingestor.pool.rows == 25
+    assert ingestor.failed == 0
+    assert ingestor.retries == 1
+
+
+def test_rows_count_as_failed_after_max_retries(ingestor):
+    ingestor.pool.failures = 100
+    ingestor.submit("drone", [Result(5)])
+    for _ in range(3):
+        ingestor.flush()
+    assert ingestor.failed == 5
+    assert not ingestor.retry
+
+    ingestor.pool.failures = 0
+    ingestor.submit("drone", [Result(5)])
+    ingestor.flush()
+    assert ingestor.pool.rows == 5
+
+
+def test_close_flushes_buffered_rows(ingestor):
+    ingestor.submit("drone", [Result(7)])
+    ingestor.close()
+    assert ingestor.pool.rows == 7
+    assert ingestor.pool.closed
+    ingestor.close()  # Idempotent (atexit may call it again)
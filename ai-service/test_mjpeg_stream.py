@@ -0,0 +1,99 @@
+"""
+Tests for the MJPEG multipart parser and stream reader (against a local
+stand-in IP camera)
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import pytest
+
+from mjpeg_stream import MJPEGStreamReader, MultipartParser
+
+FRAMES = []
+for _i in range(10):
+    _image = np.zeros((240, 320, 3), np.uint8)
+    cv2.putText(_image, str(_i), (120, 160), cv2.FONT_HERSHEY_SIMPLEX, 4, (255, 255, 255), 6)
+    FRAMES.append(cv2.imencode(".jpg", _image)[1].tobytes())
+
+
+def part(jpeg: bytes, with_length: bool) -> bytes:
+    header = b"--TestBoundary\r\nContent-Type: image/jpeg\r\n"
+    if with_length:
+        header += f"Content-Length: {len(jpeg)}\r\n".encode()
+    return header + b"\r\n" + jpeg + b"\r\n"
+
+
+class FakeCamera(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with_length = self.path == "/video"
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=TestBoundary")
+        self.end_headers()
+        try:
+            for i in range(300):
+                payload = part(FRAMES[i % len(FRAMES)], with_length)
+                # Dribble the part out in small writes to exercise incremental parsing
+                for offset in range(0, len(payload), 997):
+                    self.wfile.write(payload[offset:offset + 997])
+                time.sleep(0.005)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture(scope="module")
+def camera_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCamera)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+@pytest.mark.parametrize("with_length", [True, False])
+def test_parser_handles_arbitrary_chunking(with_length):
+    stream = b"".join(part(jpeg, with_length) for jpeg in FRAMES) + b"--TestBoundary\r\n"
+    parser = MultipartParser("--TestBoundary")
+    parsed = []
+    for offset in range(0, len(stream), 13):
+        parsed += parser.feed(stream[offset:offset + 13])
+    assert parsed == FRAMES
+    assert parser.discarded == 0
+
+
+def test_parser_skips_non_jpeg_parts():
+    parser = MultipartParser("TestBoundary")
+    parsed = parser.feed(part(b"not a jpeg", True) + part(FRAMES[0], True))
+    assert parsed == [FRAMES[0]]
+    assert parser.discarded == 1
+
+
+def test_parser_resyncs_after_oversized_part():
+    parser = MultipartParser("TestBoundary", max_part_size=1024)
+    assert parser.feed(b"--TestBoundary\r\n\r\n" + b"\xff" * 4096) == []
+    assert parser.discarded == 1
+    assert parser.feed(part(FRAMES[1], True)) == [FRAMES[1]]
+
+
+@pytest.mark.parametrize("path", ["/video", "/video_no_length"])
+def test_reader_streams_frames_on_one_connection(camera_url, path):
+    reader = MJPEGStreamReader(camera_url + path)
+    reader.start()
+    try:
+        start = time.time()
+        received, last_seq = 0, 0
+        while received < 50 and time.time() - start < 10:
+            frame, last_seq = reader.wait_for_frame(last_seq, timeout=2.0)
+            if frame is not None:
+                assert frame.shape == (240, 320, 3)
+                received += 1
+        stats = reader.get_stats()
+    finally:
+        reader.stop()
+    assert received == 50
+    assert stats["reconnects"] == 0
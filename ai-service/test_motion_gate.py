@@ -0,0 +1,80 @@
+"""
+Tests for MotionGate on synthetic frames
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from motion_gate import MotionGate
+
+
+@pytest.fixture
+def background():
+    return np.full((480, 640, 3), 90, np.uint8)
+
+
+def noisy(frame: np.ndarray) -> np.ndarray:
+    """Sensor noise well below pixel_threshold"""
+    return np.clip(frame.astype(np.int16) + np.random.randint(-3, 4, frame.shape), 0, 255).astype(np.uint8)
+
+
+def test_first_frame_always_runs(background):
+    gate = MotionGate()
+    assert gate.should_run(background, has_previous=False)
+    assert gate.runs["no_reference"] == 1
+
+
+def test_static_scene_is_gated(background):
+    gate = MotionGate(refresh_interval=60)
+    gate.should_run(noisy(background), has_previous=False)
+    assert not any(gate.should_run(noisy(background)) for _ in range(20))
+    assert gate.get_stats()["frames_skipped"] == 20
+
+
+def test_motion_triggers_the_detector(background):
+    gate = MotionGate(refresh_interval=60)
+    gate.should_run(background, has_previous=False)
+    moving = background.copy()
+    cv2.rectangle(moving, (300, 200), (340, 280), (255, 255, 255), -1)
+    assert gate.should_run(moving)
+    assert gate.runs["motion"] == 1
+
+
+def test_slow_motion_accumulates_against_the_last_run(background):
+    gate = MotionGate(refresh_interval=60)
+    gate.should_run(background, has_previous=False)
+    # Each step is below threshold compared to the previous frame, not to the reference
+    results = []
+    for x in range(0, 40, 2):
+        frame = background.copy()
+        cv2.rectangle(frame, (300, 200), (300 + x, 280), (255, 255, 255), -1)
+        results.append(gate.should_run(frame))
+    assert any(results)
+
+
+def test_scene_change(background):
+    gate = MotionGate(refresh_interval=60)
+    gate.should_run(background, has_previous=False)
+    assert gate.should_run(np.full_like(background, 200))
+    assert gate.runs["scene_change"] == 1
+
+
+def test_refresh_interval_forces_a_run(background):
+    gate = MotionGate(refresh_interval=2.0)
+    gate.should_run(background, has_previous=False)
+    assert not gate.should_run(background)
+    gate.last_run -= 2.0
+    assert gate.should_run(background)
+    assert gate.runs["refresh"] == 1
+
+
+def test_missing_previous_detections_force_a_run(background):
+    gate = MotionGate(refresh_interval=60)
+    gate.should_run(background, has_previous=False)
+    assert gate.should_run(background, has_previous=False)
+
+
+def test_disabled_gate_always_runs(background):
+    gate = MotionGate.from_config({"enabled": False})
+    assert all(gate.should_run(background) for _ in range(5))
@@ -0,0 +1,169 @@
+"""
+Tests for PersistenceQueue against a throwaway SQLite database
+"""
+
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Alert, Base, Event
+from persistence import PersistenceQueue
+
+
+def detection(i: int):
+    return {
+        "timestamp": datetime(2026, 1, 1, 12, 0, i % 60),
+        "frame_id": i,
+        "source": "cam",
+        "object_class": "person",
+        "confidence": 0.9,
+        "bbox": [0, 0, 10, 10],
+        "threat_level": "critical"
+    }
+
+
+def alert(i: int):
+    return {"timestamp": datetime(2026, 1, 1), "title": f"alert {i}", "description": "", "severity": "critical"}
+
+
+async def make_sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def count(sessions, model) -> int:
+    async with sessions() as db:
+        return await db.scalar(select(func.count()).select_from(model))
+
+
+class FlakySessions:
+    """Session factory whose first `failures` sessions raise on use"""
+
+    def __init__(self, sessions, failures: int):
+        self.sessions = sessions
+        self.failures = failures
+
+    def __call__(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database is locked")
+        return self.sessions()
+
+
+def test_transient_failure_is_retried(tmp_path):
+    async def run():
+        engine, sessions = await make_sessions(tmp_path)
+        queue = PersistenceQueue(flush_interval=0.01, retry_backoff=0.01,
+                                 session_factory=FlakySessions(sessions, failures=2))
+        queue.start()
+        for i in range(10):
+            await queue.submit(detection(i), alert(i) if i % 2 else None)
+        await queue.stop()
+
+        assert queue.failed == 0
+        assert queue.retries == 2
+        assert await count(sessions, Event) == 10
+        assert await count(sessions, Alert) == 5
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_rows_count_as_failed_only_after_max_retries(tmp_path):
+    async def run():
+        engine, sessions = await make_sessions(tmp_path)
+        queue = PersistenceQueue(flush_interval=0.01, max_retries=2, retry_backoff=0.01,
+                                 session_factory=FlakySessions(sessions, failures=100))
+        queue.start()
+        for i in range(3):
+            await queue.submit(detection(i), alert(i))
+        await queue.stop()
+
+        assert queue.retries == 2
+        assert queue.failed == 3
+        assert queue.last_error == "database is locked"
+        assert await count(sessions, Event) == 0
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_stop_flushes_every_queued_row(tmp_path):
+    async def run():
+        engine, sessions = await make_sessions(tmp_path)
+        # Nothing would be flushed by time alone before the test ends
+        queue = PersistenceQueue(batch_size=100, flush_interval=60, session_factory=sessions)
+        queue.start()
+        for i in range(250):
+            assert await queue.submit(detection(i), alert(i) if i % 5 == 0 else None)
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(queue.stop(), 5)
+
+        assert queue.events_written == 250 and queue.alerts_written == 50
+        assert queue.batches == 3
+        assert await count(sessions, Event) == 250
+        async with sessions() as db:
+            linked = await db.scalar(select(func.count()).select_from(Alert).where(Alert.event_id.isnot(None)))
+        assert linked == 50
+        assert not await queue.submit(detection(0))  # Closed
+        assert queue.dropped == 1
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_stop_wakes_an_idle_writer(tmp_path):
+    async def run():
+        engine, sessions = await make_sessions(tmp_path)
+        queue = PersistenceQueue(flush_interval=60, session_factory=sessions)
+        queue.start()
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(queue.stop(), 1)
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+class BlockedSessions:
+    """Session factory whose sessions wait for `release` before opening"""
+
+    def __init__(self, sessions):
+        self.sessions = sessions
+        self.release = asyncio.Event()
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        await self.release.wait()
+        self.session = self.sessions()
+        return await self.session.__aenter__()
+
+    async def __aexit__(self, *exc):
+        return await self.session.__aexit__(*exc)
+
+
+def test_full_queue_drops_after_backpressure_timeout(tmp_path):
+    async def run():
+        engine, sessions = await make_sessions(tmp_path)
+        blocked = BlockedSessions(sessions)
+        queue = PersistenceQueue(max_pending=5, batch_size=2, flush_interval=0.01, put_timeout=0.05,
+                                 session_factory=blocked)
+        queue.start()
+        # 5 rows fill the queue; the 6th waits until the writer takes a batch of 2 and
+        # blocks on the database, the 7th fits, and the rest are dropped after put_timeout
+        results = [await queue.submit(detection(i)) for i in range(9)]
+        assert results == [True] * 7 + [False] * 2
+        assert queue.dropped == 2 and queue.backpressure_waits == 3
+
+        blocked.release.set()
+        await queue.stop()
+        assert await count(sessions, Event) == 7
+        await engine.dispose()
+
+    asyncio.run(run())
@@ -0,0 +1,98 @@
+"""
+Tests for per-client stream subscriptions
+"""
+
+import pytest
+
+from subscription import Subscription
+
+
+def frame(camera_id="cam1", predictions=None, detections=()):
+    return {"type": "frame_analysis", "camera_id": camera_id, "detections": list(detections),
+            "fusion": {}, "predictions": predictions}
+
+
+def alert(camera_id="cam1"):
+    return {"type": "critical_alert", "camera_id": camera_id}
+
+
+def test_default_subscription_accepts_everything():
+    subscription = Subscription()
+    assert subscription.is_default
+    assert all(subscription.accepts(m) for m in (frame(), frame(None), alert(), {"type": "fusion_update"}))
+
+
+def test_camera_filter():
+    subscription = Subscription.from_message({"cameras": ["cam1"]})
+    assert subscription.accepts(frame("cam1"))
+    assert not subscription.accepts(frame("cam2"))
+    assert subscription.accepts(frame(None))  # Mock / stalled frames carry no camera
+    assert subscription.accepts(alert("cam1")) and not subscription.accepts(alert("cam2"))
+
+
+def test_channels():
+    alerts_only = Subscription.from_message({"channels": ["alerts"]})
+    assert not alerts_only.accepts(frame())
+    assert alerts_only.accepts(alert())
+    assert alerts_only.accepts({"type": "connection"})  # Control messages always pass
+
+    no_alerts = Subscription.from_message({"channels": ["detections"]})
+    assert not no_alerts.accepts(alert())
+
+
+def test_predictions_only_skips_frames_without_predictions():
+    subscription = Subscription.from_message({"channels": ["predictions"]})
+    assert not subscription.accepts(frame())
+    assert subscription.accepts(frame(predictions={"eta": 3}))
+
+
+def test_max_rate_throttles_frames(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("subscription.time.monotonic", lambda: now[0])
+    subscription = Subscription.from_message({"max_rate": 5})
+
+    accepted = []
+    for _ in range(30):  # 1 s at 30 FPS
+        accepted.append(subscription.accepts(frame()))
+        now[0] += 1 / 30
+    assert sum(accepted) == 5
+    # Frames with predictions always go through, as do alerts
+    assert subscription.accepts(frame(predictions={"eta": 3}))
+    assert subscription.accepts(alert())
+
+
+def test_view_applies_threat_floor_and_channels():
+    subscription = Subscription.from_message({"min_threat": "suspicious", "channels": ["detections"]})
+    detections = [{"id": "1", "threat_level": "normal"}, {"id": "2", "threat_level": "critical"},
+                  {"id": "3", "threat_level": "suspicious"}]
+    view = subscription.view(frame(detections=detections))
+    assert [d["id"] for d in view["detections"]] == ["2", "3"]
+    assert "fusion" not in view and "predictions" not in view
+
+
+def test_view_key_ignores_cameras_and_rate():
+    a = Subscription.from_message({"cameras": ["cam1"], "max_rate": 2, "min_threat": "warning"})
+    b = Subscription.from_message({"min_threat": "warning"})
+    assert a.view_key == b.view_key
+    assert a.view_key != Subscription().view_key
+
+
+@pytest.mark.parametrize("message", [
+    {"cameras": "cam1"},
+    {"min_threat": "extreme"},
+    {"channels": ["detections", "audio"]},
+    {"max_rate": 0},
+    {"max_rate": "fast"},
+])
+def test_invalid_requests_are_rejected(message):
+    with pytest.raises(ValueError):
+        Subscription.from_message(message)
+
+
+def test_to_dict_round_trip():
+    message = {"cameras": ["cam2", "cam1"], "min_threat": "critical", "channels": ["alerts", "detections"],
+               "max_rate": 2}
+    data = Subscription.from_message(message).to_dict()
+    assert data == {"cameras": ["cam1", "cam2"], "min_threat": "critical",
+                    "channels": ["detections", "alerts"], "max_rate": 2}
+    assert Subscription.from_message(data).to_dict() == data
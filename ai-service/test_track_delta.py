@@ -0,0 +1,98 @@
+"""
+Tests for TrackDeltaEncoder and client-side apply_delta
+"""
+
+import json
+import random
+
+from track_delta import TrackDeltaEncoder, apply_delta
+
+KEY = (None,)
+
+
+def detection(track_id: int, x: int, y: int = 0, confidence: float = 0.9):
+    return {"id": str(track_id), "track_id": track_id, "class": "person", "threat_level": "normal",
+            "confidence": confidence, "bbox": [x, y, x + 80, y + 200]}
+
+
+def frame(detections, frame_id: int = 0):
+    return {"type": "frame_analysis", "camera_id": None, "frame_id": frame_id, "detections": detections}
+
+
+def send(encoder: TrackDeltaEncoder, detections, base):
+    version = encoder.next_version(None)
+    encoder.record(KEY, version, detections)
+    return encoder.delta(frame(detections, version), KEY, version, base), version
+
+
+def test_first_message_is_a_keyframe():
+    encoder = TrackDeltaEncoder()
+    message, _ = send(encoder, [detection(1, 10)], None)
+    assert message["type"] == "frame_delta"
+    assert message["keyframe"] and message["base"] is None
+    assert [d["id"] for d in message["add"]] == ["1"]
+    assert "detections" not in message
+
+
+def test_delta_carries_only_changes():
+    encoder = TrackDeltaEncoder()
+    _, base = send(encoder, [detection(1, 10), detection(2, 100), detection(3, 200)], None)
+    message, _ = send(encoder, [detection(1, 10), detection(2, 150), detection(4, 300)], base)
+    assert not message["keyframe"] and message["base"] == base
+    assert [d["id"] for d in message["add"]] == ["4"]
+    assert message["update"] == [{"bbox": [150, 0, 230, 200], "id": "2"}]
+    assert message["remove"] == ["3"]
+
+
+def test_jitter_below_the_quantum_costs_nothing():
+    encoder = TrackDeltaEncoder(bbox_quantum=4, confidence_quantum=0.05)
+    _, base = send(encoder, [detection(1, 100, confidence=0.90)], None)
+    message, _ = send(encoder, [detection(1, 101, confidence=0.91)], base)
+    assert message["add"] == message["update"] == message["remove"] == []
+
+
+def test_keyframe_when_base_has_left_the_history():
+    encoder = TrackDeltaEncoder(history=4, keyframe_interval=1000)
+    _, base = send(encoder, [detection(1, 10)], None)
+    for _ in range(4):
+        send(encoder, [detection(1, 10)], None)
+    message, _ = send(encoder, [detection(1, 10)], base)
+    assert message["keyframe"]
+
+
+def test_periodic_keyframes():
+    encoder = TrackDeltaEncoder(keyframe_interval=5)
+    base = None
+    keyframes = []
+    for _ in range(10):
+        message, base = send(encoder, [detection(1, 10)], base)
+        keyframes.append(message["keyframe"])
+    assert [i + 1 for i, k in enumerate(keyframes) if k] == [1, 5, 10]
+
+
+def test_client_reconstruction_matches_full_frames():
+    random.seed(0)
+    encoder = TrackDeltaEncoder()
+    tracks = {i: [random.randint(0, 1100), random.randint(0, 500)] for i in range(20)}
+    full_bytes = delta_bytes = 0
+    client_tracks, base = {}, None
+
+    for frame_id in range(300):
+        for i in random.sample(list(tracks), 3):  # A few people move, the rest stand still
+            tracks[i][0] += random.randint(-6, 6)
+        if frame_id == 150:
+            tracks.pop(0)
+            tracks[99] = [10, 10]
+        detections = [detection(i, x, y, 0.9 + random.uniform(-0.01, 0.01)) for i, (x, y) in tracks.items()]
+        message, base = send(encoder, detections, base)
+        client_tracks = apply_delta(client_tracks, message)
+
+        assert set(client_tracks) == {str(i) for i in tracks}
+        for d in detections:
+            got = client_tracks[d["id"]]["bbox"]
+            assert all(abs(a - b) <= encoder.bbox_quantum for a, b in zip(got, d["bbox"]))
+
+        full_bytes += len(json.dumps(frame(detections, frame_id)))
+        delta_bytes += len(json.dumps(message))
+
+    assert delta_bytes * 3 < full_bytes
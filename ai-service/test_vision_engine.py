@@ -0,0 +1,67 @@
+"""
+Tests for the VisionEngine result fan-out (no camera or model needed)
+"""
+
+import asyncio
+import threading
+import time
+
+from vision_engine import ResultPublisher
+
+
+def test_wait_returns_only_newer_results():
+    publisher = ResultPublisher()
+    assert publisher.wait(0, timeout=0.01) is None
+    seq = publisher.publish({"frame_id": 1})
+    assert seq == 1
+    assert publisher.wait(0, timeout=0.01) == {"frame_id": 1, "seq": 1}
+    assert publisher.wait(seq, timeout=0.01) is None
+
+
+def test_one_publish_wakes_every_consumer():
+    publisher = ResultPublisher()
+
+    async def consumers():
+        tasks = [asyncio.create_task(publisher.next_result(0, timeout=2.0)) for _ in range(20)]
+        await asyncio.sleep(0.01)
+        # Publish from another thread, like the inference loop does
+        threading.Thread(target=publisher.publish, args=({"frame_id": 7},)).start()
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(consumers())
+    assert len(results) == 20
+    assert all(result is results[0] and result["seq"] == 1 for result in results)
+    assert not publisher._async_waiters
+
+
+def test_blocking_and_async_consumers_share_a_result():
+    publisher = ResultPublisher()
+    blocking = []
+    thread = threading.Thread(target=lambda: blocking.append(publisher.wait(0, timeout=2.0)))
+    thread.start()
+
+    async def consume():
+        waiter = asyncio.create_task(publisher.next_result(0, timeout=2.0))
+        await asyncio.sleep(0.01)
+        publisher.publish({"frame_id": 1})
+        return await waiter
+
+    result = asyncio.run(consume())
+    thread.join()
+    assert blocking == [result]
+
+
+def test_next_result_timeout_cleans_up_its_waiter():
+    publisher = ResultPublisher()
+    started = time.monotonic()
+    assert asyncio.run(publisher.next_result(0, timeout=0.05)) is None
+    assert time.monotonic() - started < 1.0
+    assert not publisher._async_waiters
+
+
+def test_slow_consumer_skips_to_the_latest_result():
+    publisher = ResultPublisher()
+    for frame_id in range(5):
+        publisher.publish({"frame_id": frame_id})
+    result = asyncio.run(publisher.next_result(1, timeout=0.1))
+    assert result["frame_id"] == 4 and result["seq"] == 5
@@ -0,0 +1,103 @@
+"""
+Tests for the msgpack wire format: round trips and format negotiation
+"""
+
+import json
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from mock_fusion import MockFusionEngine
+from wire_format import JSON, MSGPACK, decode_msgpack, encode, encode_msgpack, negotiate
+
+
+def detection(i: int):
+    x1, y1 = random.randint(0, 1000), random.randint(0, 500)
+    x2, y2 = x1 + random.randint(40, 280), y1 + random.randint(80, 220)
+    return {
+        "id": str(100 + i),
+        "track_id": 100 + i,
+        "class": random.choice(["person", "car", "backpack"]),
+        "confidence": round(random.uniform(0.5, 0.99), 2),
+        "bbox": [x1, y1, x2, y2],
+        "bbox_normalized": [x1 / 1280, y1 / 720, (x2 - x1) / 1280, (y2 - y1) / 720],
+        "threat_level": random.choice(["normal", "suspicious"])
+    }
+
+
+@pytest.fixture
+def frame():
+    random.seed(0)
+    return {
+        "type": "frame_analysis",
+        "frame_id": 1,
+        "camera_id": None,
+        "detections": [detection(i) for i in range(8)],
+        "mode": "real",
+        "timestamp": datetime.now().isoformat(),
+        "fusion": MockFusionEngine().update(),
+        "predictions": None
+    }
+
+
+def test_frame_round_trip(frame):
+    decoded = decode_msgpack(encode_msgpack(frame))
+    assert decoded["frame_id"] == 1 and decoded["predictions"] is None
+    assert decoded["timestamp"] == pytest.approx(datetime.fromisoformat(frame["timestamp"]).timestamp())
+    assert len(decoded["detections"]) == len(frame["detections"])
+    for original, restored in zip(frame["detections"], decoded["detections"]):
+        assert restored.keys() == original.keys()
+        assert original["bbox"] == restored["bbox"] and original["class"] == restored["class"]
+        assert original["id"] == restored["id"] and original["track_id"] == restored["track_id"]
+        assert restored["confidence"] == pytest.approx(original["confidence"], abs=1e-6)
+        assert restored["bbox_normalized"] == pytest.approx(original["bbox_normalized"], abs=1e-6)
+    assert np.allclose(frame["fusion"]["seismic"]["waveform"], decoded["fusion"]["seismic"]["waveform"], atol=1e-6)
+
+
+def test_msgpack_is_smaller_than_json(frame):
+    assert len(encode(frame, MSGPACK)) * 2 < len(encode(frame, JSON).encode())
+
+
+def test_mixed_rows_and_values():
+    message = {
+        "type": "alert",
+        "rows": [{"a": 1, "b": "x"}, {"a": 70000, "c": [1, 2]}, {"b": "y"}],
+        "ints": list(range(-5, 5)),
+        "big": [2 ** 20 + i for i in range(10)],
+        "huge": [2 ** 40] * 10,
+        "short": [1.5, 2],
+        "array": np.arange(12, dtype=np.float32).reshape(3, 4),
+        "scalar": np.int64(7),
+        "empty": [],
+        "same": [{"k": "v"}, {"k": "v"}]
+    }
+    decoded = decode_msgpack(encode_msgpack(message))
+    assert decoded["rows"] == [{"a": 1, "b": "x", "c": None}, {"a": 70000, "b": None, "c": [1, 2]},
+                               {"a": None, "b": "y", "c": None}]
+    assert decoded["ints"] == message["ints"]
+    assert decoded["big"] == message["big"]
+    assert decoded["huge"] == message["huge"]
+    assert decoded["short"] == [1.5, 2]
+    assert decoded["array"] == list(range(12))
+    assert decoded["scalar"] == 7
+    assert decoded["empty"] == []
+    assert decoded["same"] == message["same"]
+
+
+def test_json_is_the_default_encoding(frame):
+    assert json.loads(encode(frame, JSON))["detections"] == frame["detections"]
+
+
+class FakeWebSocket:
+    def __init__(self, subprotocols=(), query=None):
+        self.scope = {"subprotocols": list(subprotocols)}
+        self.query_params = query or {}
+
+
+def test_negotiate():
+    assert negotiate(FakeWebSocket()) == (JSON, None)
+    assert negotiate(FakeWebSocket(["shield.msgpack.v1"])) == (MSGPACK, "shield.msgpack.v1")
+    assert negotiate(FakeWebSocket(["other", "shield.json.v1"])) == (JSON, "shield.json.v1")
+    assert negotiate(FakeWebSocket(query={"format": "msgpack"})) == (MSGPACK, None)
@@ -0,0 +1,144 @@
+"""
+Track Delta Encoder - Detection deltas for /api/ai/stream
+Turns full `frame_analysis` messages into `frame_delta` messages that only
+carry what changed since the frame a client last received:
+
+- add:    detections whose id was not in the base frame (full dicts)
+- update: {"id", <changed fields>} for tracks that moved or changed
+- remove: ids that disappeared
+
+Detections are keyed by "id" (str(track_id) for tracked objects). Boxes and
+confidences are quantized first, so jitter below the quantum costs nothing
+and an unchanged track costs zero bytes. Every `keyframe_interval` versions,
+and whenever a client's base has fallen out of `history`, a keyframe is sent
+instead: all current detections in "add", with "keyframe": true.
+
+Versions are numbered per camera. States are recorded per stream key (the
+camera plus any detection filter, see subscription.py) the first time a
+client on that stream needs them; a delta between two versions is built
+once and shared by every client on the same stream and base.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Per-detection fields that change every frame without the track changing
+VOLATILE = {"timestamp", "frame_id"}
+
+
+class TrackDeltaEncoder:
+    def __init__(
+        self,
+        keyframe_interval: int = 30,
+        history: int = 64,
+        bbox_quantum: int = 2,
+        confidence_quantum: float = 0.05
+    ):
+        self.keyframe_interval = keyframe_interval
+        self.history = history
+        self.bbox_quantum = bbox_quantum
+        self.confidence_quantum = confidence_quantum
+
+        # stream key -> OrderedDict(version -> {id: quantized detection})
+        self.states: Dict[Any, OrderedDict] = {}
+        self.versions: Dict[Any, int] = {}  # camera_id -> latest version
+
+        self.keyframes = 0
+        self.deltas = 0
+
+    def _quantize(self, detection: Dict) -> Dict:
+        q = dict(detection)
+        step = self.bbox_quantum
+        bbox = detection.get("bbox")
+        if isinstance(bbox, (list, tuple)):
+            q["bbox"] = [int(round(v / step) * step) for v in bbox]
+        elif isinstance(bbox, dict):
+            q["bbox"] = {k: int(round(v / step) * step) for k, v in bbox.items()}
+        if "bbox_normalized" in detection:
+            q["bbox_normalized"] = [round(v, 3) for v in detection["bbox_normalized"]]
+        if "confidence" in detection:
+            q["confidence"] = round(round(detection["confidence"] / self.confidence_quantum) * self.confidence_quantum, 2)
+        return q
+
+    def next_version(self, camera_id) -> int:
+        """Version number for a new frame from `camera_id`"""
+        version = self.versions.get(camera_id, 0) + 1
+        self.versions[camera_id] = version
+        if version % self.history == 0:
+            # Forget streams nobody has asked for within the history window
+            stale = [key for key, history in self.states.items()
+                     if key[0] == camera_id and next(reversed(history)) <= version - self.history]
+            for key in stale:
+                del self.states[key]
+        return version
+
+    def record(self, key, version: int, detections: List[Dict]):
+        """Store the quantized state of `version` for a stream (once)"""
+        history = self.states.setdefault(key, OrderedDict())
+        if version in history:
+            return
+        history[version] = {str(d.get("id")): self._quantize(d) for d in detections}
+        while len(history) > self.history:
+            history.popitem(last=False)
+
+    def is_keyframe(self, key, version: int, base: Optional[int]) -> bool:
+        history = self.states.get(key, {})
+        return base is None or base not in history or version % self.keyframe_interval == 0
+
+    def delta(self, frame_message: Dict, key, version: int, base: Optional[int]) -> Dict:
+        """
+        frame_delta message for a client whose last received version is `base`.
+        `key` is (camera_id, ...); the version must already be recorded for it.
+        """
+        message = {k: v for k, v in frame_message.items() if k != "detections"}
+        message["type"] = "frame_delta"
+        message["version"] = version
+
+        history = self.states.get(key, {})
+        current = history.get(version, {})
+        if self.is_keyframe(key, version, base):
+            self.keyframes += 1
+            message.update(keyframe=True, base=None, add=list(current.values()), update=[], remove=[])
+            return message
+
+        self.deltas += 1
+        previous = history[base]
+        updates = []
+        for det_id, detection in current.items():
+            old = previous.get(det_id)
+            if old is None:
+                continue
+            changed = {k: v for k, v in detection.items() if k not in VOLATILE and old.get(k) != v}
+            if changed:
+                changed["id"] = det_id
+                updates.append(changed)
+        message.update(
+            keyframe=False,
+            base=base,
+            add=[d for det_id, d in current.items() if det_id not in previous],
+            update=updates,
+            remove=[det_id for det_id in previous if det_id not in current]
+        )
+        return message
+
+    def get_stats(self) -> Dict:
+        return {
+            "streams": len(self.states),
+            "keyframes": self.keyframes,
+            "deltas": self.deltas,
+            "keyframe_interval": self.keyframe_interval,
+            "bbox_quantum": self.bbox_quantum
+        }
+
+
+def apply_delta(tracks: Dict[str, Dict], message: Dict) -> Dict[str, Dict]:
+    """Client-side reconstruction: fold a frame_delta into {id: detection}"""
+    if message["keyframe"]:
+        tracks = {}
+    for det_id in message["remove"]:
+        tracks.pop(str(det_id), None)
+    for detection in message["add"]:
+        tracks[str(detection["id"])] = dict(detection)
+    for change in message["update"]:
+        tracks.setdefault(str(change["id"]), {}).update(change)
+    return tracks
@@ -242,22 +242,25 @@ class VideoStream:
             self.is_connected = False
             print("📹 Video stream closed")
 
-import urllib.request
-import numpy as np
+from mjpeg_stream import MJPEGStreamReader
 
 class SnapshotStream:
     """
-    Robust video stream that polls snapshots instead of continuous video
-    Much more stable for WiFi phone cameras
+    Robust video stream for WiFi phone cameras (IP Webcam)
+    Keeps one persistent connection to the MJPEG `/video` endpoint instead
+    of opening a new HTTP connection per frame.
     """
     def __init__(self, url):
         self.url = url
-        if not self.url.endswith("/shot.jpg"):
-            # Convert video URL to snapshot URL for IP Webcam
-            # http://x.x.x.x:8080/video -> http://x.x.x.x:8080/shot.jpg
+        if self.url.endswith("/shot.jpg"):
+            # Convert snapshot URL to the MJPEG stream URL for IP Webcam
+            # http://x.x.x.x:8080/shot.jpg -> http://x.x.x.x:8080/video
             base = self.url.rsplit('/', 1)[0]
-            self.url = f"{base}/shot.jpg"
+            self.url = f"{base}/video"
             
+        self.reader = MJPEGStreamReader(self.url)
+        self.last_seq = 0
+        self.resolution = (0, 0)
         self.frame_count = 0
         self.is_connected = False
         
@@ -273,28 +276,27 @@ class SnapshotStream:
             return False
 
     def connect(self):
-        print(f"📷 Connecting to Snapshot Poller: {self.url}")
-        try:
-            # Test connection
-            with urllib.request.urlopen(self.url, timeout=2) as stream:
-                if stream.status == 200:
-                    print("✅ Snapshot connection successful")
-                    self.is_connected = True
-                    return True
-        except Exception as e:
-            print(f"❌ Snapshot connection failed: {e}")
+        print(f"📷 Connecting to MJPEG stream: {self.url}")
+        self.reader.start()
+        # Wait for the first frame
+        frame, self.last_seq = self.reader.wait_for_frame(0, timeout=5)
+        if frame is not None:
+            print("✅ MJPEG stream connection successful")
+            self.resolution = (frame.shape[1], frame.shape[0])
+            self.is_connected = True
+            return True
+        print(f"❌ MJPEG stream connection failed: {self.reader.last_error}")
+        self.reader.stop()
         return False
         
     def get_frame(self):
-        try:
-            with urllib.request.urlopen(self.url, timeout=2) as stream:
-                bytes_data = stream.read()
-                arr = np.frombuffer(bytes_data, np.uint8)
-                frame = cv2.imdecode(arr, -1)
-                return frame
-        except Exception as e:
-            # print(f"⚠️ Snapshot frame failed: {e}")
+        """Newest decoded frame (waits up to 2s for one newer than the last)"""
+        frame, seq = self.reader.wait_for_frame(self.last_seq, timeout=2)
+        if frame is None:
             return None
+        self.last_seq = seq
+        self.resolution = (frame.shape[1], frame.shape[0])
+        return frame
             
     def detect(self, frame):
         # Re-use the detect logic from VideoStream
@@ -332,14 +334,19 @@ class SnapshotStream:
         return detections
         
     def get_stats(self):
+        stats = self.reader.get_stats()
         return {
-            "connected": self.is_connected,
-            "resolution": "Variable (Snapshot)",
-            "fps": "~10 (Polling)",
-            "mode": "Snapshot Protocol"
+            "connected": self.is_connected and stats["connected"],
+            "resolution": f"{self.resolution[0]}x{self.resolution[1]}",
+            "fps": stats["fps"],
+            "frames_processed": self.frame_count,
+            "frames_dropped": stats["frames_dropped"],
+            "reconnects": stats["reconnects"],
+            "mode": "MJPEG Stream"
         }
         
     def release(self):
+        self.reader.stop()
         self.is_connected = False
 
 
@@ -5,13 +5,21 @@ Ensures UI never stutters due to camera lag.
 """
 
 import cv2
+import asyncio
 import threading
 import time
 import queue
+from collections import deque
 from typing import Optional, List, Dict, Union
 from datetime import datetime
 import numpy as np
-import urllib.request
+
+from adaptive_quality import AdaptiveQualityController
+from frame_ring import FrameRing
+from mjpeg_stream import MJPEGStreamReader
+from snapshot_poller import get_snapshot_poller
+from motion_gate import MotionGate
+from face_gallery import DirectoryWatcher, FaceGalleryCache, GallerySnapshot, IVFIndex, file_hash
 
 try:
     from ultralytics import YOLO
@@ -22,11 +30,31 @@ except ImportError:
 class ThreadedCamera:
     """
     Background thread for capturing frames.
-    Always holds the latest frame in memory.
+    Frames are decoded into preallocated rings; readers get read-only
+    views that stay valid while at most `ring_slots - 2` newer frames have
+    arrived. Hold a full frame (hold_full_frame) to keep it longer than
+    that.
+
+    Two resolutions per frame, sharing one sequence number:
+    - `ring`: downscaled inference frame (<= inference_width wide)
+    - `full_ring`: native resolution, only read for crops (face, plate,
+      evidence) and display
+    Frames are stored unmirrored; mirroring is applied for display only.
+    By default only local devices (webcams) are mirrored; `mirror` overrides.
     """
-    def __init__(self, source: Union[int, str]):
+    def __init__(
+        self,
+        source: Union[int, str],
+        frame_listener: Optional[threading.Event] = None,
+        ring_slots: int = 4,
+        inference_width: int = 640,
+        mirror: Optional[bool] = None,
+        poll_interval: float = 0.1
+    ):
         # Store the original source for reference
         self.source = source
+        # Optional event set on every new frame (used by CameraPool to batch cameras)
+        self.frame_listener = frame_listener
         
         # Check if source is an integer string (e.g., "0")
         processed_src = source
@@ -35,41 +63,113 @@ class ThreadedCamera:
             
         print(f"📷 Initializing Camera Source: {processed_src}")
         
-        # Win32 backend is more stable for IP cameras on Windows
-        if isinstance(processed_src, str) and processed_src.startswith("http"):
-             self.cap = cv2.VideoCapture(processed_src)
+        # Snapshot mode: poll single JPEGs (".../shot.jpg") on the shared asyncio poller
+        self.is_snapshot = isinstance(source, str) and source.startswith("http") and source.endswith(".jpg")
+        self.poll_interval = poll_interval
+        # MJPEG mode: one persistent connection to an HTTP multipart stream (".../video")
+        self.is_mjpeg = isinstance(source, str) and source.startswith("http") and not self.is_snapshot
+        self.mjpeg = None
+        
+        if self.is_snapshot or self.is_mjpeg:
+             self.cap = None # HTTP sources are read by this class, not VideoCapture
         else:
              # Use DirectShow for local cameras on Windows, if available
              self.cap = cv2.VideoCapture(processed_src, cv2.CAP_DSHOW) 
              
-        # Initialization check
-        if not self.cap.isOpened():
-            print(f"❌ FAILED to open camera source: {processed_src}")
-            # The thread will handle the error state, no need to set self.status here
-        else:
-            print(f"✅ Camera opened successfully: {processed_src}")
+             # Initialization check
+             if not self.cap.isOpened():
+                 print(f"❌ FAILED to open camera source: {processed_src}")
+                 # The thread will handle the error state, no need to set self.status here
+             else:
+                 print(f"✅ Camera opened successfully: {processed_src}")
             
         self.lock = threading.Lock()
+        self.frame_ready = threading.Condition(self.lock)
         self.running = False
-        self.latest_frame = None
+        self.ring = FrameRing(ring_slots)
+        self.full_ring = FrameRing(ring_slots)
+        self.inference_width = inference_width
+        # Display is mirrored; detections are reported in display coordinates
+        self.mirror = isinstance(processed_src, int) if mirror is None else bool(mirror)
         self.status = "stopped"
         self.fps = 0
         self.frame_count = 0
         self.thread = None
         self.resolution = (0, 0)
-        
-        # Snapshot mode support
-        self.is_snapshot = isinstance(source, str) and (source.startswith("http") or source.endswith(".jpg"))
+
+    @property
+    def frame_seq(self) -> int:
+        """Bumped every time a new frame is stored"""
+        return self.ring.seq
+
+    @property
+    def frame_time(self) -> float:
+        """Capture timestamp of the latest frame"""
+        return self.ring.latest_timestamp
+
+    def _commit(self, frame: Optional[np.ndarray] = None, full_frame=None, captured_at: Optional[float] = None):
+        timestamp = captured_at or time.time()
+        with self.lock:
+            self.full_ring.commit(full_frame, timestamp)
+            self.ring.commit(frame, timestamp)
+            self.frame_ready.notify_all()
+        if self.frame_listener: self.frame_listener.set()
+
+    def _inference_size(self, width: int, height: int):
+        if width <= self.inference_width:
+            return width, height
+        return self.inference_width, max(1, int(round(height * self.inference_width / width)))
+
+    def _decode_jpeg(self, data: bytes):
+        """
+        Decode a JPEG snapshot / MJPEG part at inference size using libjpeg's DCT scaling
+        (IMREAD_REDUCED_COLOR_2/4/8). The full-resolution decode is deferred
+        until a crop actually needs it.
+        Returns: (inference frame, full frame or None, encoded bytes)
+        """
+        arr = np.frombuffer(data, np.uint8)
+        width = self.resolution[0]
+        reduction = next((f for f in (8, 4, 2) if width and width // f >= self.inference_width), 1)
+
+        if reduction == 1:
+            full = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+            if full is None:
+                return None, None, data
+            self.resolution = (full.shape[1], full.shape[0])
+            small = cv2.resize(full, self._inference_size(*self.resolution), interpolation=cv2.INTER_AREA)
+            return small, full, data
+
+        flag = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}[reduction]
+        small = cv2.imdecode(arr, flag)
+        if small is None:
+            return None, None, data
+        expected = (-(-self.resolution[0] // reduction), -(-self.resolution[1] // reduction))
+        if (small.shape[1], small.shape[0]) != expected:
+            # Source changed resolution; re-probe with a full decode next time
+            self.resolution = (small.shape[1] * reduction, small.shape[0] * reduction)
+        return small, None, data
 
     def start(self):
         if self.running: return
         self.running = True
+        if self.is_snapshot:
+            # No thread of our own: the shared poller fetches, its decode pool calls back
+            self._fps_window = (time.time(), 0)
+            get_snapshot_poller().add_camera(
+                str(id(self)), self.source, self._on_snapshot, interval=self.poll_interval
+            )
+            self.status = "active"
+            return
         self.thread = threading.Thread(target=self._update, daemon=True)
         self.thread.start()
         self.status = "starting"
 
     def stop(self):
         self.running = False
+        if self.is_snapshot:
+            get_snapshot_poller().remove_camera(str(id(self)))
+        if self.mjpeg:
+            self.mjpeg.stop()
         if self.thread:
             self.thread.join(timeout=1.0)
         if self.cap:
@@ -79,7 +179,12 @@ class ThreadedCamera:
     def _update(self):
         print(f"📷 Camera Thread Started: {self.source}")
         
-        if not self.is_snapshot:
+        if self.is_mjpeg:
+            # Socket reading + multipart parsing run on the reader's thread;
+            # this thread is the decoder
+            self.mjpeg = MJPEGStreamReader(self.source, decode=False)
+            self.mjpeg.start()
+        else:
             self.cap = cv2.VideoCapture(self.source)
             # Try to force MAX resolution (4K) to get camera's best
             try:
@@ -104,34 +209,37 @@ class ThreadedCamera:
         self.status = "active"
         last_time = time.time()
         frames_this_sec = 0
+        scratch = None  # Raw capture buffer, reused every frame
+        jpeg_seq = 0
 
         while self.running:
             try:
-                if self.is_snapshot:
-                    # Polling Mode
-                    try:
-                        with urllib.request.urlopen(self.source, timeout=2) as stream:
-                            arr = np.frombuffer(stream.read(), np.uint8)
-                            frame = cv2.imdecode(arr, -1)
-                            if frame is not None:
-                                with self.lock:
-                                    self.latest_frame = frame
-                                    self.resolution = (frame.shape[1], frame.shape[0])
-                    except Exception as e:
-                        # print(f"Snapshot error: {e}")
-                        time.sleep(0.5)
-                    
-                    time.sleep(0.1) # Limit poll rate
+                if self.is_mjpeg:
+                    # Streaming MJPEG: decode the newest part, skip any we fell behind on
+                    jpeg, jpeg_seq = self.mjpeg.wait_for_jpeg(jpeg_seq, timeout=1.0)
+                    self.status = "active" if self.mjpeg.connected else "reconnecting"
+                    if jpeg is None:
+                        continue
+                    small, full, data = self._decode_jpeg(jpeg)
+                    if small is not None:
+                        self._commit(small, full if full is not None else data)
                 else:
                     # Streaming Mode
-                    ret, frame = self.cap.read()
+                    # Decode straight into the next full-resolution slot (no allocation once sized)
+                    ret, frame = self.cap.read(scratch) if scratch is not None else self.cap.read()
                     if ret:
-                        # Mirror effect
-                        frame = cv2.flip(frame, 1)
-                        # Ensure memory layout is compatible with YOLO/OpenCV
-                        frame = np.ascontiguousarray(frame)
+                        h, w = frame.shape[:2]
+                        self.resolution = (w, h)
+                        size = self._inference_size(w, h)
+                        # Downscale once for inference; output is contiguous for YOLO/OpenCV
+                        cv2.resize(
+                            frame, size, dst=self.ring.next_buffer((size[1], size[0]) + frame.shape[2:], frame.dtype),
+                            interpolation=cv2.INTER_AREA
+                        )
+                        self._commit(full_frame=None if frame is scratch else frame)
+                        # Next read goes into the slot after this one (under the lock: holds)
                         with self.lock:
-                            self.latest_frame = frame
+                            scratch = self.full_ring.next_buffer(frame.shape, frame.dtype)
                     else:
                         print("⚠️ Camera stream lost, retrying...")
                         self.cap.release()
@@ -152,21 +260,234 @@ class ThreadedCamera:
 
         print("📷 Camera Thread Stopped")
 
+    def _on_snapshot(self, jpeg: bytes, captured_at: float):
+        """Snapshot poller callback (runs on its decode pool, one call at a time per camera)"""
+        if not self.running:
+            return
+        small, full, data = self._decode_jpeg(jpeg)
+        if small is None:
+            return
+        # imdecode allocates anyway; adopt the arrays as the next slots
+        self._commit(small, full if full is not None else data, captured_at)
+
+        # FPS Counter
+        self.frame_count += 1
+        window_start, frames = self._fps_window
+        if captured_at - window_start >= 1.0:
+            self.fps = frames + 1
+            self._fps_window = (captured_at, 0)
+        else:
+            self._fps_window = (window_start, frames + 1)
+
     def get_frame(self) -> Optional[np.ndarray]:
+        """Read-only view of the latest inference-size frame (no copy, unmirrored)"""
+        with self.lock:
+            return self.ring.latest()[0]
+
+    def get_full_frame(self, seq: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Native-resolution frame `seq` (default: latest) for crops.
+        Snapshot sources are decoded here on first use.
+        Returns None once the ring has wrapped past `seq`.
+        """
         with self.lock:
-            if self.latest_frame is not None:
-                return self.latest_frame.copy()
+            seq = seq or self.full_ring.seq
+            item = self.full_ring.get(seq)
+        if not isinstance(item, (bytes, bytearray)):
+            return item
+
+        frame = cv2.imdecode(np.frombuffer(item, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return None
+        with self.lock:
+            self.full_ring.replace(seq, frame)
+        frame = frame.view()
+        frame.flags.writeable = False
+        return frame
+
+    def hold_full_frame(self, seq: int):
+        """
+        Crop source for frame `seq` that survives the ring wrapping, without
+        copying it: capture writes later frames around a held slot. A
+        snapshot's frame is its encoded bytes (decoded on first use by
+        decode_full_frame). None if the frame is already gone.
+        Every non-None hold must be paired with release_full_frame(seq).
+        """
+        with self.lock:
+            return self.full_ring.hold(seq)
+
+    def release_full_frame(self, seq: int):
+        with self.lock:
+            self.full_ring.release(seq)
+
+    @staticmethod
+    def decode_full_frame(item) -> Optional[np.ndarray]:
+        if isinstance(item, (bytes, bytearray)):
+            return cv2.imdecode(np.frombuffer(item, np.uint8), cv2.IMREAD_COLOR)
+        return item
+
+    def get_display_frame(self, max_width: int = 1280) -> Optional[np.ndarray]:
+        """Latest frame for viewers: mirrored (if enabled) and capped at `max_width`"""
+        frame = self.get_full_frame()
+        if frame is None:
             return None
+        h, w = frame.shape[:2]
+        if w > max_width:
+            frame = cv2.resize(frame, (max_width, int(round(h * max_width / w))), interpolation=cv2.INTER_AREA)
+        return cv2.flip(frame, 1) if self.mirror else frame
+
+    def wait_for_frame(self, after_seq: int, timeout: float = 1.0):
+        """
+        Block until a frame newer than `after_seq` is captured.
+        Returns: (read-only frame view or None on timeout, frame_seq, capture timestamp)
+        """
+        with self.frame_ready:
+            self.frame_ready.wait_for(lambda: self.frame_seq > after_seq or not self.running, timeout)
+            frame, seq, captured_at = self.ring.latest()
+            if seq > after_seq:
+                return frame, seq, captured_at
+            return None, seq, captured_at
+
+
+def _resolve_waiter(future: asyncio.Future, result: Dict):
+    if not future.done():
+        future.set_result(result)
+
+
+class ResultPublisher:
+    """
+    Holds the most recent inference result with a sequence number.
+    The inference thread publishes; any number of consumers (threads or
+    asyncio tasks) wait for the next sequence without re-running the model.
+    With `history` > 1 the last results are retained so a consumer can
+    drain everything published since it last looked (next_results), e.g.
+    a fan-in publisher fed by several cameras in one batch.
+    """
+    def __init__(self, history: int = 1):
+        self.lock = threading.Lock()
+        self.updated = threading.Condition(self.lock)
+        self.seq = 0
+        self.latest = None
+        self.recent = deque(maxlen=history)
+        self._async_waiters = []  # [(loop, future)]
+
+    def publish(self, result: Dict) -> int:
+        with self.lock:
+            self.seq += 1
+            result["seq"] = self.seq
+            self.latest = result
+            self.recent.append(result)
+            waiters, self._async_waiters = self._async_waiters, []
+            self.updated.notify_all()
+
+        # Wake asyncio consumers on their own loops
+        for loop, future in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve_waiter, future, result)
+            except RuntimeError:
+                pass  # Loop already closed
+        return result["seq"]
+
+    def wait(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Blocking wait for a result newer than `after_seq` (None on timeout)."""
+        with self.updated:
+            self.updated.wait_for(lambda: self.seq > after_seq, timeout)
+            return self.latest if self.seq > after_seq else None
+
+    async def next_result(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[Dict]:
+        """Await a result newer than `after_seq` (None on timeout)."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout is not None else None
+
+        while True:
+            with self.lock:
+                if self.seq > after_seq:
+                    return self.latest
+                future = loop.create_future()
+                self._async_waiters.append((loop, future))
+
+            remaining = None if deadline is None else max(0.0, deadline - loop.time())
+            try:
+                await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                with self.lock:
+                    if (loop, future) in self._async_waiters:
+                        self._async_waiters.remove((loop, future))
+
+    async def next_results(self, after_seq: int = 0, timeout: Optional[float] = None) -> List[Dict]:
+        """
+        Await results newer than `after_seq` and return all retained ones,
+        oldest first (empty on timeout). Results older than `history` are lost.
+        """
+        if await self.next_result(after_seq, timeout) is None:
+            return []
+        with self.lock:
+            return [result for result in self.recent if result["seq"] > after_seq]
+
+class TrackState:
+    """Per-camera tracking bookkeeping, keyed by track_id"""
+    def __init__(self):
+        # Behavior Analytics State
+        self.track_history = {} # {track_id: start_timestamp}
+        
+        # Optimization Cache
+        self.result_cache = {} # {track_id: {'name': str, 'plate': str, 'last_update': timestamp}}
+        
+        # Detections from the last detector run (reused while the scene is static)
+        self.last_detections = None
+
+
+def boxes_to_arrays(boxes):
+    """
+    Convert an ultralytics Boxes object to numpy arrays in one transfer.
+    Returns: (xyxy [N,4], conf [N], cls [N], track_ids [N] or None)
+    """
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64), None
+    xyxy = boxes.xyxy.cpu().numpy()
+    confs = boxes.conf.cpu().numpy()
+    cls_ids = boxes.cls.cpu().numpy().astype(np.int64)
+    track_ids = boxes.id.cpu().numpy().astype(np.int64) if boxes.id is not None else None
+    return xyxy, confs, cls_ids, track_ids
+
 
 class VisionEngine:
     """
     Main Intelligence Engine.
     Manages Camera Thread and YOLO Inference.
+    A single background inference loop runs once per new camera frame and
+    publishes results through `self.results`, so the model cost does not
+    grow with the number of connected consoles.
     """
-    def __init__(self, source: Union[int, str] = 0):
-        self.camera = ThreadedCamera(source)
+    def __init__(
+        self,
+        source: Union[int, str] = 0,
+        camera_id: str = "camera_main",
+        performance_config: Optional[Dict] = None,
+        face_config: Optional[Dict] = None,
+        detection_log=None
+    ):
+        self.camera_id = camera_id
+        # Optional DetectionLog: every published result's detections are appended
+        self.detection_log = detection_log
+        # Frames kept per camera ring (performance.ring_slots)
+        self.ring_slots = (performance_config or {}).get("ring_slots", 4)
+        # Mirror the display (performance.mirror; null = local webcams only)
+        self.mirror = (performance_config or {}).get("mirror")
+        self.camera = ThreadedCamera(source, ring_slots=self.ring_slots, mirror=self.mirror)
+        # Honors performance.target_fps / max_latency_ms / adaptive_quality
+        self.quality = AdaptiveQualityController.from_config(performance_config)
+        # Skips the detector on static scenes (performance.motion_gate)
+        self.motion_config = (performance_config or {}).get("motion_gate", {})
+        self.motion_gate = MotionGate.from_config(self.motion_config)
         self.model = None
         self.is_ready = False
+        self.results = ResultPublisher()
+        self.running = False
+        self.inference_thread = None
+        self.inference_fps = 0
         
         if YOLO_AVAILABLE:
             print("🧠 Loading YOLOv8...")
@@ -180,182 +501,320 @@ class VisionEngine:
             print("❌ YOLO module not found")
 
         # Initialize Facial Recognition
-        self.face_recognizer = FaceRecognizer()
+        self.face_recognizer = FaceRecognizer.from_config(face_config)
         
         
         # Initialize ALPR
         self.alpr = ALPRSystem()
         
-        # Behavior Analytics State
-        self.track_history = {} # {track_id: start_timestamp}
-        
-        # Optimization Cache
-        self.result_cache = {} # {track_id: {'name': str, 'plate': str, 'last_update': timestamp}}
+        # Behavior Analytics State + Optimization Cache (per camera)
+        self.state = TrackState()
 
     def start(self):
         self.camera.start()
+        if self.running: return
+        self.running = True
+        self.face_recognizer.start_watching()
+        self.inference_thread = threading.Thread(target=self._inference_loop, daemon=True)
+        self.inference_thread.start()
 
     def stop(self):
+        self.running = False
+        self.face_recognizer.stop_watching()
+        if self.inference_thread:
+            self.inference_thread.join(timeout=2.0)
         self.camera.stop()
 
-    def analyze(self) -> Dict:
+    def _inference_loop(self):
+        """Single producer: run inference once per new camera frame and publish it."""
+        print("🧠 Inference Loop Started")
+        last_seq = 0   # Last frame processed (drives the frame stride)
+        seen_seq = 0   # Last frame looked at, processed or skipped
+        last_time = time.time()
+        frames_this_sec = 0
+
+        while self.running:
+            try:
+                frame, seq, captured_at = self.camera.wait_for_frame(seen_seq, timeout=0.5)
+                if frame is None:
+                    if not self.camera.running:
+                        time.sleep(0.5)  # Camera thread died; don't spin
+                    continue
+                seen_seq = seq  # Skipped frames must not be returned again
+                if not self.quality.should_process(seq, last_seq):
+                    continue # Adaptive frame skipping
+                last_seq = seq
+
+                start = time.time()
+                result = self.analyze(frame, seq)
+                result["frame_seq"] = seq
+                self.results.publish(result)
+                if self.detection_log and result["detections"]:
+                    self.detection_log.append(self.camera_id, result["detections"], frame_id=seq)
+                self.quality.record(captured_at, (time.time() - start) * 1000)
+
+                frames_this_sec += 1
+                if time.time() - last_time >= 1.0:
+                    self.inference_fps = frames_this_sec
+                    frames_this_sec = 0
+                    last_time = time.time()
+            except Exception as e:
+                print(f"Inference Loop Error: {e}")
+                time.sleep(0.5)
+
+        print("🧠 Inference Loop Stopped")
+
+    def get_stats(self) -> Dict:
+        """Cheap status snapshot (does not run inference)"""
+        return {
+            "camera_id": self.camera_id,
+            "fps": self.camera.fps,
+            "inference_fps": self.inference_fps,
+            "status": self.camera.status,
+            "res": f"{self.camera.resolution[0]}x{self.camera.resolution[1]}",
+            "seq": self.results.seq,
+            "adaptive_quality": self.quality.get_status(),
+            "motion_gate": self.motion_gate.get_stats(),
+            "face_recognition": self.face_recognizer.get_stats()
+        }
+
+    def analyze(self, frame: Optional[np.ndarray] = None, frame_seq: Optional[int] = None) -> Dict:
         """
-        Get latest frame and run inference.
+        Run inference on `frame` (defaults to the latest camera frame).
+        `frame` is the inference-size frame; `frame_seq` locates its
+        full-resolution counterpart for face/plate crops.
+        Called by the inference loop; consumers should read `self.results`
+        instead of calling this directly.
         Returns: {
             "frame": np.array (or None),
             "detections": List[Dict],
             "metadata": Dict
         }
         """
-        frame = self.camera.get_frame()
+        if frame is None:
+            frame, frame_seq = self.camera.get_frame(), self.camera.frame_seq
         detections = []
+        motion_skipped = False
         
         if frame is not None and self.is_ready and self.model:
-            try:
-                # Run Tracking (instead of just detection)
-                results = self.model.track(frame, conf=0.5, persist=True, verbose=False, max_det=20)[0]
-                
-                if results and results.boxes:
-                    print(f"👀 Detections: {len(results.boxes)}", flush=True)
-                
-                # Crowd Detection
-                person_count = 0
-                
-                if results.boxes:
-                    for box in results.boxes:
-                        if int(box.cls[0]) == 0: # 0 is person class in COCO
-                            person_count += 1
-                            
-                    is_crowd = person_count >= 5
-                else:
-                    is_crowd = False
-
-                for idx, box in enumerate(results.boxes):
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    conf = float(box.conf[0])
-                    cls_id = int(box.cls[0])
-                    label = results.names[cls_id]
-                    
-                    # Track ID
-                    track_id = int(box.id[0]) if box.id is not None else None
-                    
-                    # Behavioral Analytics (Loitering)
-                    is_loitering = False
-                    if track_id is not None and label == 'person':
-                        now = time.time()
-                        if track_id not in self.track_history:
-                            self.track_history[track_id] = now
-                        
-                        duration = now - self.track_history[track_id]
-                        if duration > 10: # 10 seconds threshold for demo
-                            is_loitering = True
-
-                    # ---------------------------------------------------------
-                    # OPTIMIZATION: CACHING & FRAME SKIPPING
-                    # ---------------------------------------------------------
-                    # Only run heavy AI (Face/OCR) if:
-                    # 1. We have a track ID (so we can cache it)
-                    # 2. It's a "check frame" (every 30 frames) OR we haven't identified this ID yet
-                    
-                    should_run_ai = False
-                    cached_data = self.result_cache.get(track_id) if track_id is not None else None
-                    
-                    if track_id is not None:
-                         # If we don't have data, run AI immediately
-                         if cached_data is None:
-                             should_run_ai = True
-                         # If we have data, refresh it every 30 frames (approx 1 sec)
-                         elif self.camera.frame_count % 30 == 0:
-                             should_run_ai = True
-                    else:
-                        # No track ID (tracking lost or failed), run AI every 5 frames to be safe?
-                        # Or just skip optimization for untracked objects
-                        if self.camera.frame_count % 5 == 0:
-                            should_run_ai = True
-
-                    final_label = label
-                    threat_level = self._classify(label, conf)
-                    
-                    # Initialize variables from cache if available
-                    person_name = cached_data.get('name') if cached_data else None
-                    plate_text = cached_data.get('plate') if cached_data else None
-
-                    # Run Heavy AI if needed
-                    if should_run_ai:
-                        # Facial Recognition Hook
-                        if label == 'person':
-                             # Debug: Print status once every 60 frames to avoid spam, or just print always for now
-                             # print(f"👤 Person detected. Active: {self.face_recognizer.is_active} | Conf: {conf:.2f}") 
-                             
-                             if self.face_recognizer.is_active and conf > 0.4: 
-                                 print(f"👤 Calling Identify... (Conf: {conf:.2f})") # FORCE PRINT
-                                 name = self.face_recognizer.identify(frame, [int(x1), int(y1), int(x2), int(y2)])
-                                 if name != "Unknown":
-                                     person_name = name
-                                     print(f"🎯 FACE RECOGNIZED: {name}")  # Debug log
-
-                        # ALPR Hook (Vehicle Recognition)
-                        vehicle_classes = ['car', 'truck', 'bus', 'motorcycle']
-                        if label in vehicle_classes and self.alpr.is_active:
-                             if conf > 0.6:
-                                text = self.alpr.read_plate(frame, [int(x1), int(y1), int(x2), int(y2)])
-                                if text:
-                                    plate_text = text
-                        
-                        # Update Cache
-                        if track_id is not None:
-                            self.result_cache[track_id] = {
-                                'name': person_name,
-                                'plate': plate_text,
-                                'last_update': time.time()
-                            }
-                    
-                    # Apply Logic (using either new or cached data)
-                    if person_name and person_name != "Unknown":
-                        final_label = f"SUSPECT: {person_name}"
-                        threat_level = "critical"  # All recognized suspects are critical threats
-                    
-                    if plate_text:
-                        final_label = f"{label} [{plate_text}]"
-                        if "STOLEN" in plate_text or "BAD" in plate_text: threat_level = "critical"
-                    
-                    if is_loitering:
-                        final_label += " [Loitering]"
-                        threat_level = "suspicious"
-                        
-                    if is_crowd and label == 'person':
-                        threat_level = "warning"
-
-                    # Use track_id for stable ID if available, otherwise fallback to index
-                    detection_id = str(track_id) if track_id is not None else f"det_{self.camera.frame_count}_{idx}"
-
-                    detections.append({
-                        "id": detection_id,
-                        "track_id": track_id,
-                        "class": final_label,
-                        "confidence": round(conf, 2),
-                        "bbox": [int(x1), int(y1), int(x2), int(y2)],
-                        "bbox_normalized": [
-                            float(x1 / self.camera.resolution[0]), 
-                            float(y1 / self.camera.resolution[1]), 
-                            float((x2 - x1) / self.camera.resolution[0]), 
-                            float((y2 - y1) / self.camera.resolution[1])
-                        ],
-                        "threat_level": threat_level
-                    })
-            except Exception as e:
-                print(f"Inference Error: {e}")
+            if not self.motion_gate.should_run(frame, self.state.last_detections is not None):
+                # Static scene: reuse the last detections, skip the detector
+                detections = self.state.last_detections
+                motion_skipped = True
+            else:
+                detections = self._detect(frame, frame_seq)
+                self.state.last_detections = detections
 
         return {
             "frame": frame,
+            "camera_id": self.camera_id,
             "detections": detections,
             "stats": {
                 "fps": self.camera.fps,
+                "inference_fps": self.inference_fps,
                 "status": self.camera.status,
-                "res": f"{self.camera.resolution[0]}x{self.camera.resolution[1]}"
+                "res": f"{self.camera.resolution[0]}x{self.camera.resolution[1]}",
+                "motion_skipped": motion_skipped
             }
         }
 
+    def _detect(self, frame: np.ndarray, frame_seq: Optional[int]) -> List[Dict]:
+        """Run the tracker on one frame and enrich the boxes"""
+        try:
+            # Hold the crop source (no copy): the ring may wrap while the tracker runs
+            enrichment = self.quality.enrichment
+            held_frame = self.camera.hold_full_frame(frame_seq) if enrichment and frame_seq else None
+
+            # Run Tracking (instead of just detection)
+            results = self.model.track(
+                frame, conf=0.5, persist=True, verbose=False, max_det=20, imgsz=self.quality.imgsz
+            )[0]
+            
+            if results and results.boxes:
+                print(f"👀 Detections: {len(results.boxes)}", flush=True)
+            
+            xyxy, confs, cls_ids, track_ids = boxes_to_arrays(results.boxes)
+            return self.build_detections(
+                frame, xyxy, confs, cls_ids, track_ids, results.names, self.camera, self.state,
+                enrichment=enrichment, frame_seq=frame_seq, held_frame=held_frame
+            )
+        except Exception as e:
+            print(f"Inference Error: {e}")
+            return []
+        finally:
+            if held_frame is not None:
+                self.camera.release_full_frame(frame_seq)
+
+    def build_detections(
+        self,
+        frame: np.ndarray,
+        xyxy: np.ndarray,
+        confs: np.ndarray,
+        cls_ids: np.ndarray,
+        track_ids: Optional[np.ndarray],
+        names: Dict[int, str],
+        camera: "ThreadedCamera",
+        state: "TrackState",
+        enrichment: bool = True,
+        frame_seq: Optional[int] = None,
+        held_frame=None
+    ) -> List[Dict]:
+        """
+        Turn raw boxes for one camera frame into enriched detections
+        (loitering, crowd, face recognition, ALPR, threat level).
+        Shared by the single-camera loop and the multi-camera CameraPool.
+        With enrichment=False (adaptive quality under load) face/ALPR are
+        paused and only cached identities are applied.
+
+        `xyxy` is in `frame` (inference-size) pixels. Boxes are reported in
+        native-resolution display coordinates (mirrored if the camera is),
+        and crops are read in place from `held_frame` (camera.hold_full_frame,
+        taken before inference) or else frame `frame_seq` if the ring still
+        has it. Nothing is decoded or fetched unless a box needs a crop.
+        """
+        detections = []
+
+        # Inference frame -> native resolution
+        width, height = camera.resolution
+        if len(xyxy) and width and height:
+            xyxy = xyxy * np.array(
+                [width / frame.shape[1], height / frame.shape[0]] * 2, np.float32
+            )
+        else:
+            width, height = frame.shape[1], frame.shape[0]
+        full_frame = None  # Decoded / fetched on the first crop only
+
+        # Crowd Detection
+        person_count = int(np.count_nonzero(cls_ids == 0)) # 0 is person class in COCO
+        is_crowd = person_count >= 5
+
+        for idx in range(len(xyxy)):
+            x1, y1, x2, y2 = xyxy[idx]
+            conf = float(confs[idx])
+            cls_id = int(cls_ids[idx])
+            label = names[cls_id]
+            
+            # Track ID
+            track_id = int(track_ids[idx]) if track_ids is not None and track_ids[idx] >= 0 else None
+            
+            # Behavioral Analytics (Loitering)
+            is_loitering = False
+            if track_id is not None and label == 'person':
+                now = time.time()
+                if track_id not in state.track_history:
+                    state.track_history[track_id] = now
+                
+                duration = now - state.track_history[track_id]
+                if duration > 10: # 10 seconds threshold for demo
+                    is_loitering = True
+
+            # ---------------------------------------------------------
+            # OPTIMIZATION: CACHING & FRAME SKIPPING
+            # ---------------------------------------------------------
+            # Only run heavy AI (Face/OCR) if:
+            # 1. We have a track ID (so we can cache it)
+            # 2. It's a "check frame" (every 30 frames) OR we haven't identified this ID yet
+            
+            should_run_ai = False
+            cached_data = state.result_cache.get(track_id) if track_id is not None else None
+            
+            if track_id is not None:
+                 # If we don't have data, run AI immediately
+                 if cached_data is None:
+                     should_run_ai = True
+                 # If we have data, refresh it every 30 frames (approx 1 sec)
+                 elif camera.frame_count % 30 == 0:
+                     should_run_ai = True
+            else:
+                # No track ID (tracking lost or failed), run AI every 5 frames to be safe?
+                # Or just skip optimization for untracked objects
+                if camera.frame_count % 5 == 0:
+                    should_run_ai = True
+            
+            if not enrichment:
+                should_run_ai = False
+
+            final_label = label
+            threat_level = self._classify(label, conf)
+            
+            # Initialize variables from cache if available
+            person_name = cached_data.get('name') if cached_data else None
+            plate_text = cached_data.get('plate') if cached_data else None
+
+            # Run Heavy AI if needed
+            if should_run_ai:
+                # Facial Recognition Hook
+                if label == 'person':
+                     # Debug: Print status once every 60 frames to avoid spam, or just print always for now
+                     # print(f"👤 Person detected. Active: {self.face_recognizer.is_active} | Conf: {conf:.2f}") 
+                     
+                     if self.face_recognizer.is_active and conf > 0.4: 
+                         print(f"👤 Calling Identify... (Conf: {conf:.2f})") # FORCE PRINT
+                         if full_frame is None:
+                             full_frame = camera.decode_full_frame(held_frame) if held_frame is not None else camera.get_full_frame(frame_seq)
+                         name = self.face_recognizer.identify(full_frame, [int(x1), int(y1), int(x2), int(y2)]) if full_frame is not None else "Unknown"
+                         if name != "Unknown":
+                             person_name = name
+                             print(f"🎯 FACE RECOGNIZED: {name}")  # Debug log
+
+                # ALPR Hook (Vehicle Recognition)
+                vehicle_classes = ['car', 'truck', 'bus', 'motorcycle']
+                if label in vehicle_classes and self.alpr.is_active:
+                     if conf > 0.6:
+                        if full_frame is None:
+                            full_frame = camera.decode_full_frame(held_frame) if held_frame is not None else camera.get_full_frame(frame_seq)
+                        text = self.alpr.read_plate(full_frame, [int(x1), int(y1), int(x2), int(y2)]) if full_frame is not None else None
+                        if text:
+                            plate_text = text
+                
+                # Update Cache
+                if track_id is not None:
+                    state.result_cache[track_id] = {
+                        'name': person_name,
+                        'plate': plate_text,
+                        'last_update': time.time()
+                    }
+            
+            # Apply Logic (using either new or cached data)
+            if person_name and person_name != "Unknown":
+                final_label = f"SUSPECT: {person_name}"
+                threat_level = "critical"  # All recognized suspects are critical threats
+            
+            if plate_text:
+                final_label = f"{label} [{plate_text}]"
+                if "STOLEN" in plate_text or "BAD" in plate_text: threat_level = "critical"
+            
+            if is_loitering:
+                final_label += " [Loitering]"
+                threat_level = "suspicious"
+                
+            if is_crowd and label == 'person':
+                threat_level = "warning"
+
+            # Use track_id for stable ID if available, otherwise fallback to index
+            detection_id = str(track_id) if track_id is not None else f"det_{camera.frame_count}_{idx}"
+
+            # Report in display coordinates (viewers see the mirrored stream)
+            if camera.mirror:
+                x1, x2 = width - x2, width - x1
+
+            detections.append({
+                "id": detection_id,
+                "track_id": track_id,
+                "class": final_label,
+                "confidence": round(conf, 2),
+                "bbox": [int(x1), int(y1), int(x2), int(y2)],
+                "bbox_normalized": [
+                    float(x1 / width), 
+                    float(y1 / height), 
+                    float((x2 - x1) / width), 
+                    float((y2 - y1) / height)
+                ],
+                "threat_level": threat_level
+            })
+
+        return detections
+
     def _classify(self, label: str, conf: float) -> str:
         critical = ['gun', 'knife', 'plliers', 'scissors']
         suspicious = ['person', 'backpack']
@@ -382,10 +841,41 @@ except ImportError:
 import os
 
 class FaceRecognizer:
-    def __init__(self, known_faces_dir="assets/known_faces"):
-        self.known_faces = {}  # {name: face_image}
-        self.known_names = []
-        self.is_active = False
+    """
+    Known faces live in one gallery matrix: row i is identity i's 100x100
+    face, flattened and normalized to zero mean / unit norm. For same-size
+    images TM_CCOEFF_NORMED is exactly the dot product of such vectors, so
+    scoring a probe against the whole watchlist is one matrix-vector product.
+
+    Templates are cached on disk by image hash (face_gallery.py), so startup
+    and reload() only run the cascade on new images. Past `ann_threshold`
+    identities, lookups go through an IVF index instead of the full product.
+
+    The watchlist is an immutable GallerySnapshot: add()/remove() (and the
+    directory watcher) build a new one and swap it in, while identify()
+    keeps using whichever snapshot it started with.
+    """
+    FACE_SIZE = (100, 100)
+
+    def __init__(
+        self,
+        known_faces_dir="assets/known_faces",
+        threshold: float = 0.5,
+        cache_dir: Optional[str] = "assets/face_gallery",
+        ann_threshold: int = 2000,
+        nprobe: int = 8,
+        watch_interval: float = 2.0
+    ):
+        self.known_faces_dir = known_faces_dir
+        self.snapshot = GallerySnapshot.empty(self.FACE_SIZE[0] * self.FACE_SIZE[1])
+        self.update_lock = threading.Lock()  # Serializes snapshot updates; readers never take it
+        self.threshold = threshold  # 0.5 is a reasonable starting point for faces
+        self.cache = FaceGalleryCache(cache_dir) if cache_dir else None
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.watcher = DirectoryWatcher(
+            known_faces_dir, self.add_file, self.remove, interval=watch_interval
+        ) if watch_interval else None
         self.face_cascade = None
         
         # Load Haar Cascade for face detection
@@ -400,13 +890,57 @@ class FaceRecognizer:
         except Exception as e:
             print(f"❌ Face Cascade Load Failed: {e}")
             
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> "FaceRecognizer":
+        return cls(**(config or {}))
+
+    # Views of the current snapshot
+    @property
+    def is_active(self) -> bool:
+        return len(self.snapshot) > 0
+
+    @property
+    def known_names(self) -> List[str]:
+        return list(self.snapshot.names)
+
+    @property
+    def gallery(self) -> np.ndarray:
+        return self.snapshot.gallery
+
+    @property
+    def index(self) -> Optional[IVFIndex]:
+        return self.snapshot.index
+
+    @staticmethod
+    def name_for(filename: str) -> str:
+        return os.path.splitext(filename)[0].replace("_", " ").title()
+
     def reload(self):
-        """Reload known faces from disk"""
+        """Re-sync the whole directory (only new or changed images are processed)"""
         print("🔄 Reloading Facial Database...")
-        self.known_faces = {}
-        self.known_names = []
-        self.is_active = False
-        self._load_known_faces("assets/known_faces")
+        self._load_known_faces(self.known_faces_dir)
+
+    def start_watching(self):
+        """Pick up suspects added to / removed from known_faces_dir out of band"""
+        if self.watcher:
+            self.watcher.start()
+
+    def stop_watching(self):
+        if self.watcher:
+            self.watcher.stop()
+
+    @classmethod
+    def normalize(cls, faces: np.ndarray) -> np.ndarray:
+        """
+        (N, 100, 100) or (100, 100) grayscale -> (N, 10000) / (10000,) float32
+        rows with zero mean and unit norm. Flat images become zero rows.
+        """
+        vectors = faces.reshape(-1, cls.FACE_SIZE[0] * cls.FACE_SIZE[1]).astype(np.float32)
+        vectors -= vectors.mean(axis=1, keepdims=True)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 1e-6)
+        vectors[norms[:, 0] <= 1e-6] = 0
+        return vectors if faces.ndim == 3 else vectors[0]
 
     def _load_known_faces(self, directory):
         if not os.path.exists(directory):
@@ -415,121 +949,208 @@ class FaceRecognizer:
             return
 
         print(f"👤 Loading Known Faces from {directory}...")
-        for filename in os.listdir(directory):
-            if filename.endswith((".jpg", ".png", ".jpeg")):
-                path = os.path.join(directory, filename)
-                try:
-                    # Load image
-                    image = cv2.imread(path)
-                    if image is None:
-                        print(f"  ❌ Failed to load {filename}: Invalid image")
-                        continue
-                    
-                    # Convert to grayscale
-                    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-                    
-                    # Detect face
-                    faces = self.face_cascade.detectMultiScale(gray, 1.3, 5)
-                    
-                    if len(faces) == 0:
-                        print(f"  ❌ No face detected in {filename}")
-                        continue
-                    
-                    # Use the first detected face
-                    (x, y, w, h) = faces[0]
-                    face_roi = gray[y:y+h, x:x+w]
-                    face_roi = cv2.resize(face_roi, (100, 100))  # Normalize size
-                    
-                    name = os.path.splitext(filename)[0].replace("_", " ").title()
-                    self.known_faces[name] = face_roi
-                    self.known_names.append(name)
-                    print(f"  ✅ Loaded: {name}")
-                    
-                except Exception as e:
-                    print(f"  ❌ Failed to load {filename}: {e}")
+        with self.update_lock:
+            if self.cache:
+                files, hashes, gallery = self.cache.sync(directory, self._extract_template)
+                stats = self.cache.get_stats()
+                print(f"  💾 Gallery cache: {stats['cache_hits']} cached, {stats['processed']} processed")
+            else:
+                files, hashes, templates = [], [], []
+                for filename in sorted(os.listdir(directory)):
+                    if filename.endswith((".jpg", ".png", ".jpeg")):
+                        path = os.path.join(directory, filename)
+                        template = self._extract_template(path)
+                        if template is not None:
+                            files.append(filename)
+                            hashes.append(file_hash(path))
+                            templates.append(template)
+                gallery = np.array(templates, dtype=np.float32).reshape(len(files), -1)
+
+            snapshot = GallerySnapshot(files, [self.name_for(f) for f in files], hashes, gallery)
+            self.snapshot = self._indexed(snapshot)
+
+        if self.is_active:
+            mode = f"IVF {self.index.nlist} lists" if self.index else "exact"
+            print(f"✅ Facial Recognition Active: {len(self.snapshot)} identities loaded ({mode}).")
+
+    def _face_template(self, image, label: str):
+        """Normalized template of the first face in a BGR image, or None"""
+        # Convert to grayscale
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        
+        # Detect face
+        detected = self.face_cascade.detectMultiScale(gray, 1.3, 5)
         
-        if self.known_faces:
-            self.is_active = True
-            print(f"✅ Facial Recognition Active: {len(self.known_names)} identities loaded.")
+        if len(detected) == 0:
+            print(f"  ❌ No face detected in {label}")
+            return None
+        
+        # Use the first detected face
+        (x, y, w, h) = detected[0]
+        face_roi = cv2.resize(gray[y:y+h, x:x+w], self.FACE_SIZE)  # Normalize size
+        print(f"  ✅ Loaded: {label}")
+        return self.normalize(face_roi)
 
-    def identify(self, frame, bbox):
+    def _extract_template(self, path):
+        filename = os.path.basename(path)
+        try:
+            # Load image
+            image = cv2.imread(path)
+            if image is None:
+                print(f"  ❌ Failed to load {filename}: Invalid image")
+                return None
+            return self._face_template(image, filename)
+        except Exception as e:
+            print(f"  ❌ Failed to load {filename}: {e}")
+            return None
+
+    def _indexed(self, snapshot: GallerySnapshot) -> GallerySnapshot:
+        """Attach / drop the IVF index as the snapshot crosses ann_threshold"""
+        if len(snapshot) < self.ann_threshold:
+            return snapshot.with_index(None) if snapshot.index is not None else snapshot
+        if snapshot.index is not None:
+            return snapshot
+        if self.cache:
+            return snapshot.with_index(self.cache.index(snapshot.gallery, snapshot.fingerprint, self.nprobe))
+        return snapshot.with_index(IVFIndex.build(snapshot.gallery, nprobe=self.nprobe))
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def add(self, filename: str, image: np.ndarray, digest: str = "") -> bool:
         """
-        Identify a person within a bounding box using template matching.
-        bbox: [x1, y1, x2, y2]
+        Add (or replace) one suspect from a BGR image without touching the
+        rest of the watchlist. Returns: False if no face was found
         """
-        if not self.is_active or not self.known_faces:
-            return "Unknown"
+        template = self._face_template(image, filename) if self.face_cascade is not None else None
+        if template is None:
+            return False
+        with self.update_lock:
+            snapshot = self.snapshot.with_row(filename, self.name_for(filename), digest, template)
+            self.snapshot = self._indexed(snapshot)
+        print(f"➕ Suspect added: {self.name_for(filename)} ({len(self.snapshot)} identities)")
+        return True
+
+    def add_file(self, path: str) -> bool:
+        """add() for an image file in known_faces_dir"""
+        filename = os.path.basename(path)
+        image = cv2.imread(path)
+        if image is None:
+            print(f"  ❌ Failed to load {filename}: Invalid image")
+            return False
+        if self.watcher:
+            self.watcher.mark(filename)
+        return self.add(filename, image, file_hash(path))
+
+    def remove(self, filename: str) -> bool:
+        """Drop one suspect. Returns: False if it was not in the watchlist"""
+        if self.watcher:
+            self.watcher.forget(filename)
+        with self.update_lock:
+            if filename not in self.snapshot.files:
+                return False
+            self.snapshot = self._indexed(self.snapshot.without(filename))
+        print(f"➖ Suspect removed: {self.name_for(filename)} ({len(self.snapshot)} identities)")
+        return True
 
+    def set_gallery(self, names: List[str], faces: np.ndarray):
+        """Replace the watchlist with (N, 100, 100) grayscale faces"""
+        with self.update_lock:
+            self.snapshot = self._indexed(GallerySnapshot(names, names, [""] * len(names), self.normalize(faces)))
+
+    def get_stats(self) -> Dict:
+        snapshot = self.snapshot
+        return {
+            "identities": len(snapshot),
+            "index": {"nlist": snapshot.index.nlist, "nprobe": snapshot.index.nprobe} if snapshot.index else None,
+            "cache": self.cache.get_stats() if self.cache else None,
+            "watcher": self.watcher.get_stats() if self.watcher else None
+        }
+
+    def _extract_face(self, frame, bbox):
+        """Grayscale face inside a person bbox, or None"""
         x1, y1, x2, y2 = bbox
         
         # Strategy 1: Crop Detection (Fast)
         face_img = frame[y1:y2, x1:x2]
-        if face_img.size == 0: return "Unknown"
+        if face_img.size == 0: return None
         
         gray_face = cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
         faces = self.face_cascade.detectMultiScale(gray_face, 1.1, 4, minSize=(30, 30))
         
-        target_face = None
-        
         if len(faces) > 0:
             (fx, fy, fw, fh) = faces[0]
-            target_face = gray_face[fy:fy+fh, fx:fx+fw]
-        else:
-            # Strategy 2: Full Frame Context (Slower but Robust)
-            gray_full = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            # Enhance contrast
-            gray_full = cv2.equalizeHist(gray_full)
-            
-            # Detect faces in the whole image
-            full_faces = self.face_cascade.detectMultiScale(gray_full, 1.1, 3, minSize=(20, 20))
-            
-            for (fx, fy, fw, fh) in full_faces:
-                # Check if face center is inside person bbox
-                cx = fx + fw // 2
-                cy = fy + fh // 2
-                
-                # Check with some margin (expand bbox by 10% for matching)
-                bx1, by1, bx2, by2 = x1 * 0.9, y1 * 0.9, x2 * 1.1, y2 * 1.1
-                
-                if bx1 < cx < bx2 and by1 < cy < by2:
-                    target_face = gray_full[fy:fy+fh, fx:fx+fw]
-                    print(f"✅ Found face in full frame context! ({fx},{fy})")
-                    break
-            
-            if target_face is None:
-                h, w, _ = frame.shape
-                print(f"⚠️ Face Rec: No face found (tried crop & full context) | Frame: {w}x{h}")
-                return "Unknown"
-        
-        # Resize to match known faces
-        face_roi = cv2.resize(target_face, (100, 100))
+            return gray_face[fy:fy+fh, fx:fx+fw]
+
+        # Strategy 2: Full Frame Context (Slower but Robust)
+        gray_full = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        # Enhance contrast
+        gray_full = cv2.equalizeHist(gray_full)
         
-        # Template matching with all known faces
-        best_match = "Unknown"
-        best_score = -1.0 # Higher is better for TM_CCOEFF_NORMED
-        threshold = 0.5   # 0.5 is a reasonable starting point for faces
+        # Detect faces in the whole image
+        full_faces = self.face_cascade.detectMultiScale(gray_full, 1.1, 3, minSize=(20, 20))
         
-        for name, known_face in self.known_faces.items():
-            # Use Normalized Cross Correlation (robust to lighting)
-            # We need to ensure known_face is <= face_roi in size for matchTemplate?
-            # Actually matchTemplate expects the template to be smaller than the image.
-            # Here both are 100x100.
-            # So we can just use simple correlation or resize if needed.
-            # But if they are same size, result is 1x1.
+        for (fx, fy, fw, fh) in full_faces:
+            # Check if face center is inside person bbox
+            cx = fx + fw // 2
+            cy = fy + fh // 2
             
-            res = cv2.matchTemplate(face_roi, known_face, cv2.TM_CCOEFF_NORMED)
-            score = res[0][0]
+            # Check with some margin (expand bbox by 10% for matching)
+            bx1, by1, bx2, by2 = x1 * 0.9, y1 * 0.9, x2 * 1.1, y2 * 1.1
             
-            if score > best_score:
-                best_score = score
-                best_match = name
+            if bx1 < cx < bx2 and by1 < cy < by2:
+                print(f"✅ Found face in full frame context! ({fx},{fy})")
+                return gray_full[fy:fy+fh, fx:fx+fw]
+        
+        h, w, _ = frame.shape
+        print(f"⚠️ Face Rec: No face found (tried crop & full context) | Frame: {w}x{h}")
+        return None
+
+    def match(self, face, k: int = 1) -> List[Dict]:
+        """
+        Top-k identities for a grayscale face crop (any size), best first.
+        Returns: [{"name", "score"}] with score = normalized cross-correlation
+        """
+        snapshot = self.snapshot  # One consistent gallery for the whole lookup
+        names, gallery, index = snapshot.names, snapshot.gallery, snapshot.index
+        if not names:
+            return []
+        probe = self.normalize(cv2.resize(face, self.FACE_SIZE))
+        if index is not None:
+            rows, scores = index.search(gallery, probe, k)
+            return [{"name": names[i], "score": float(score)} for i, score in zip(rows, scores)]
+
+        scores = gallery @ probe  # One GEMV over the whole watchlist
+
+        k = min(k, len(names))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(names) else np.arange(len(names))
+        top = top[np.argsort(-scores[top])]
+        return [{"name": names[i], "score": float(scores[i])} for i in top]
+
+    def identify_top_k(self, frame, bbox, k: int = 5) -> List[Dict]:
+        """Top-k candidates for the person in bbox [x1, y1, x2, y2], with scores"""
+        if not self.is_active:
+            return []
+        face = self._extract_face(frame, bbox)
+        return self.match(face, k) if face is not None else []
+
+    def identify(self, frame, bbox):
+        """
+        Identify a person within a bounding box by normalized cross-correlation.
+        bbox: [x1, y1, x2, y2]
+        """
+        candidates = self.identify_top_k(frame, bbox, k=1)
+        if not candidates:
+            return "Unknown"
+        best = candidates[0]
         
         # Debug Log for tuning
-        print(f"🔍 Face Check: Best Score: {best_score:.4f} | Match: {best_match} | Thresh: {threshold}")
+        print(f"🔍 Face Check: Best Score: {best['score']:.4f} | Match: {best['name']} | Thresh: {self.threshold}")
 
         # Only return match if confidence is high enough
-        if best_score > threshold:
-            return best_match
+        if best["score"] > self.threshold:
+            return best["name"]
         
         return "Unknown"
 
@@ -0,0 +1,217 @@
+"""
+Wire Format - Encodings for /api/ai/stream messages
+JSON stays the default. Clients that offer the `shield.msgpack.v1`
+WebSocket subprotocol (or connect with `?format=msgpack`) get binary
+msgpack frames instead:
+
+- frame_analysis timestamps are epoch seconds instead of ISO strings
+- Lists of dicts (detections, radar blips) are sent column-wise as a map
+  tagged "~t": numeric columns become typed arrays, repeated strings are
+  sent once
+- Numeric arrays (boxes, confidences, seismic waveform) are little-endian
+  typed arrays in msgpack ext types: 1 = float32[], 2 = int32[], 4 = int16[]
+- Everything is packed by a single msgpack.packb call
+
+decode_msgpack() turns a binary frame back into the JSON shape.
+"""
+
+import json
+import struct
+from datetime import datetime
+from itertools import chain
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+JSON = "json"
+MSGPACK = "msgpack"
+SUBPROTOCOLS = {"shield.msgpack.v1": MSGPACK, "shield.json.v1": JSON}
+
+EXT_FLOAT32 = 1
+EXT_INT32 = 2
+EXT_INT16 = 4
+
+TABLE = "~t"  # Map key marking a column-wise table (value: row count)
+MIN_TYPED_ARRAY = 8  # Shorter plain lists are smaller as native msgpack ints/floats
+
+
+def negotiate(websocket) -> Tuple[str, Optional[str]]:
+    """Pick the wire format for a new connection. Returns: (format, subprotocol to accept)"""
+    for name in websocket.scope.get("subprotocols", []):
+        fmt = SUBPROTOCOLS.get(name)
+        if fmt == MSGPACK and not MSGPACK_AVAILABLE:
+            continue
+        if fmt:
+            return fmt, name
+    if websocket.query_params.get("format") == MSGPACK and MSGPACK_AVAILABLE:
+        return MSGPACK, None
+    return JSON, None
+
+
+def encode(message: Dict, fmt: str):
+    """str for JSON, bytes for msgpack"""
+    if fmt == MSGPACK:
+        return encode_msgpack(message)
+    return json.dumps(message, default=str)
+
+
+# ==============================================================================
+# ENCODE
+# ==============================================================================
+
+def encode_msgpack(message: Dict) -> bytes:
+    """One packb call: tables and typed arrays are built in place, never packed twice"""
+    compact = {key: _compact(value) for key, value in message.items()}
+    if message.get("type") == "frame_analysis" and isinstance(message.get("timestamp"), str):
+        compact["timestamp"] = datetime.fromisoformat(message["timestamp"]).timestamp()
+    return msgpack.packb(compact, default=_default, use_bin_type=True)
+
+
+def _default(value):
+    if isinstance(value, np.ndarray):
+        return _typed(value.ravel().tolist()) or value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def _typed(values) -> Optional["msgpack.ExtType"]:
+    """
+    Flat list of numbers -> int16[] / int32[] / float32[] ext, packed by
+    struct in C (it also does the range checks); None if it is not all numbers
+    """
+    types = set(map(type, values))
+    n = len(values)
+    try:
+        if types == {int}:
+            try:
+                return msgpack.ExtType(EXT_INT16, struct.pack(f"<{n}h", *values))
+            except struct.error:
+                return msgpack.ExtType(EXT_INT32, struct.pack(f"<{n}i", *values))
+        if types == {float} or types == {int, float}:
+            return msgpack.ExtType(EXT_FLOAT32, struct.pack(f"<{n}f", *values))
+    except (struct.error, OverflowError):
+        pass
+    return None
+
+
+def _compact(value):
+    if isinstance(value, dict):
+        return {key: _compact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)) and value:
+        first = value[0]
+        if isinstance(first, dict) and all(isinstance(item, dict) for item in value):
+            return _table(value)
+        if len(value) >= MIN_TYPED_ARRAY and isinstance(first, (int, float)):
+            typed = _typed(value)
+            if typed is not None:
+                return typed
+        return [_compact(item) for item in value]
+    return value
+
+
+def _table(rows) -> Dict:
+    """List of dicts -> {"~t": rows, key: column, ...}"""
+    table = {TABLE: len(rows)}
+    keys = rows[0].keys()
+    if all(row.keys() == keys for row in rows):
+        # Same keys everywhere (detections): transpose in one zip, preserving order
+        if all(list(row) == list(keys) for row in rows):
+            for key, values in zip(keys, zip(*map(dict.values, rows))):
+                table[key] = _column(values)
+            return table
+    merged = dict.fromkeys(keys)
+    for row in rows:
+        merged.update(dict.fromkeys(row))
+    for key in merged:
+        table[key] = _column(tuple(row.get(key) for row in rows))
+    return table
+
+
+def _column(values: tuple):
+    """
+    One table column:
+        ext            numbers, one per row
+        {"c": v}       same value in every row
+        {"w", "a"}     fixed-length number lists (e.g. bbox), flattened
+        {"d": {...}}   dicts with the same keys (e.g. mock bbox), one column per key
+        {"k", "i"}     repeated strings: unique values + uint8 index per row
+        [...]          anything else, as-is
+    """
+    first = values[0]
+    kind = type(first)
+    if kind is not list and kind is not dict and values.count(first) == len(values):
+        return {"c": first}
+
+    if kind is int or kind is float:
+        typed = _typed(values)
+        if typed is not None:
+            return typed
+
+    elif kind is list or kind is tuple:
+        width = len(first)
+        if width and set(map(len, values)) == {width}:
+            typed = _typed(list(chain.from_iterable(values)))
+            if typed is not None:
+                return {"w": width, "a": typed}
+
+    elif kind is dict:
+        subkeys = first.keys()
+        if all(isinstance(v, dict) and v.keys() == subkeys for v in values):
+            return {"d": {key: _column(tuple(v[key] for v in values)) for key in subkeys}}
+
+    elif kind is str and set(map(type, values)) == {str}:
+        index = {s: i for i, s in enumerate(dict.fromkeys(values))}
+        if len(index) < min(len(values), 256):
+            return {"k": list(index), "i": bytes(map(index.__getitem__, values))}
+        return list(values)
+
+    return [_compact(v) for v in values]
+
+
+# ==============================================================================
+# DECODE (tools, tests and Python clients)
+# ==============================================================================
+
+def decode_msgpack(data: bytes) -> Dict:
+    return msgpack.unpackb(data, ext_hook=_ext_hook, object_hook=_object_hook, raw=False)
+
+
+def _ext_hook(code: int, data: bytes):
+    if code == EXT_FLOAT32:
+        return np.frombuffer(data, dtype="<f4").tolist()
+    if code == EXT_INT32:
+        return np.frombuffer(data, dtype="<i4").tolist()
+    if code == EXT_INT16:
+        return np.frombuffer(data, dtype="<i2").tolist()
+    return msgpack.ExtType(code, data)
+
+
+def _object_hook(value: Dict):
+    """Maps are decoded innermost first, so a table's columns are still raw here"""
+    n = value.get(TABLE)
+    if n is None:
+        return value
+    columns = {key: _expand(column, n) for key, column in value.items() if key != TABLE}
+    return [{key: column[i] for key, column in columns.items()} for i in range(n)]
+
+
+def _expand(column, n: int) -> list:
+    if isinstance(column, dict):
+        if "c" in column:
+            return [column["c"]] * n
+        if "w" in column:
+            width, flat = column["w"], column["a"]
+            return [flat[i * width:(i + 1) * width] for i in range(n)]
+        if "d" in column:
+            parts = {key: _expand(sub, n) for key, sub in column["d"].items()}
+            return [{key: part[i] for key, part in parts.items()} for i in range(n)]
+        if "k" in column:
+            return [column["k"][i] for i in column["i"]]
+    return column
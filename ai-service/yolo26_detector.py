@@ -25,22 +25,55 @@ class YOLO26Detector:
         self,
         model_path: str = "yolov8n.pt",  # Will upgrade to yolo26n.pt when available
         confidence_threshold: float = 0.50,
-        device: str = "cpu"
+        device: str = "cpu",
+        batch_size: int = 1,
+        backend: str = "torch",
+        torch_free: bool = False,
+        imgsz: int = 640,
+        precision: str = "fp32",
+        calibration_dir: str = "assets/calibration",
+        calibration_samples: int = 100
     ):
         self.confidence_threshold = confidence_threshold
-        self.device = self._detect_device(device)
+        self.batch_size = max(1, int(batch_size))
+        self.precision = precision
+        self.calibration_dir = calibration_dir
+        self.calibration_samples = calibration_samples
+        self.quantization_report = None
+        # INT8 models are produced by ONNX Runtime static quantization
+        self.backend = "onnxruntime" if precision == "int8" else backend
+        # Torch-free mode only makes sense with an exported backend
+        self.torch_free = torch_free and self.backend != "torch"
+        self.imgsz = imgsz
+        self.device = "cpu" if self.torch_free else self._detect_device(device)
         self.model = None
+        self.runtime = None  # Exported runtime (ONNX Runtime / OpenVINO / OpenCV DNN)
+        self.weights_path = model_path
         self.model_loaded = False
         
         logger.info(f"🔧 Initializing YOLO26 Detector")
         logger.info(f"   Device: {self.device}")
+        logger.info(f"   Backend: {self.backend}{' (torch-free)' if self.torch_free else ''}")
+        logger.info(f"   Precision: {self.precision}")
         logger.info(f"   Confidence Threshold: {confidence_threshold}")
+        logger.info(f"   Batch Size: {self.batch_size}")
         
         try:
-            self._load_model(model_path)
+            if self.torch_free:
+                self._load_torch_free(model_path)
+            else:
+                self._load_model(model_path)
         except Exception as e:
             logger.error(f"❌ Failed to load YOLO26: {e}")
             logger.info("💡 Falling back to simulation mode")
+            return
+        
+        if self.backend != "torch" and self.runtime is None:
+            try:
+                self._load_backend()
+            except Exception as e:
+                logger.error(f"❌ Failed to load {self.backend} backend: {e}")
+                logger.info("💡 Falling back to PyTorch inference")
     
     def _detect_device(self, preferred_device: str) -> str:
         """Auto-detect best available device"""
@@ -66,10 +99,12 @@ class YOLO26Detector:
             # Try to load YOLO26, fallback to YOLOv8
             try:
                 self.model = YOLO("yolo26n.pt")
+                self.weights_path = "yolo26n.pt"
                 logger.info("✅ Loaded YOLO26-Nano model")
             except:
                 logger.warning("⚠️  YOLO26 not found, using YOLOv8-Nano")
                 self.model = YOLO(model_path)
+                self.weights_path = model_path
                 logger.info("✅ Loaded YOLOv8-Nano model (fallback)")
             
             # Move to device
@@ -83,6 +118,60 @@ class YOLO26Detector:
             logger.info("💡 Install: pip install ultralytics")
             raise
     
+    def _load_backend(self):
+        """Export the loaded model (cached next to the weights) and switch inference to it"""
+        from inference_backends import BACKEND_FORMATS, export_model, load_backend
+        
+        if self.backend not in BACKEND_FORMATS:
+            raise ValueError(f"Unknown backend '{self.backend}'. Available: {list(BACKEND_FORMATS)}")
+        
+        weights = getattr(self.model, "ckpt_path", None) or self.weights_path
+        entry = export_model(self.model, weights, BACKEND_FORMATS[self.backend], self.imgsz)
+        
+        if self.precision == "int8":
+            from quantization import build_int8_model
+            entry = build_int8_model(
+                entry, weights, self.calibration_dir,
+                self.calibration_samples, conf=self.confidence_threshold
+            )
+            self.quantization_report = entry.get("report")
+        
+        self.runtime = load_backend(self.backend, entry, conf=self.confidence_threshold)
+        logger.info(f"✅ Inference running on {self.backend}")
+    
+    def _load_torch_free(self, model_path: str):
+        """Load a previously exported artifact without importing torch/ultralytics"""
+        from inference_backends import BACKEND_FORMATS, find_cached_export, load_backend
+        
+        if self.backend not in BACKEND_FORMATS:
+            raise ValueError(f"Unknown backend '{self.backend}'. Available: {list(BACKEND_FORMATS)}")
+        
+        fmt = "onnx_int8" if self.precision == "int8" else BACKEND_FORMATS[self.backend]
+        for weights in ("yolo26n.pt", model_path):
+            entry = find_cached_export(weights, fmt, self.imgsz)
+            if entry:
+                break
+        else:
+            raise RuntimeError(
+                f"No cached {fmt} export found - start once with torch_free=false to build it"
+            )
+        
+        self.runtime = load_backend(self.backend, entry, conf=self.confidence_threshold)
+        self.quantization_report = entry.get("report")
+        self.weights_path = weights
+        self.model_loaded = True
+        logger.info(f"✅ Loaded {entry['artifact']} on {self.backend} (torch-free)")
+    
+    def _infer(self, frames: List) -> List:
+        """Run one forward pass over `frames` on the active runtime"""
+        if self.runtime is not None:
+            return self.runtime(frames)
+        return self.model(
+            frames,
+            conf=self.confidence_threshold,
+            verbose=False
+        )
+    
     def detect_frame(self, frame=None) -> List[Dict]:
         """
         Perform object detection on a frame
@@ -99,43 +188,12 @@ class YOLO26Detector:
         
         try:
             # Run YOLO26 inference
-            results = self.model(
-                frame,
-                conf=self.confidence_threshold,
-                verbose=False
-            )
+            results = self._infer([frame])
             
             # Parse results
             detections = []
             for result in results:
-                boxes = result.boxes
-                
-                for i, box in enumerate(boxes):
-                    # Extract box data
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = float(box.conf[0])
-                    class_id = int(box.cls[0])
-                    class_name = result.names[class_id]
-                    
-                    # Determine threat level
-                    threat_level = self._classify_threat(class_name, confidence)
-                    
-                    detection = {
-                        "id": f"yolo26_{i}_{int(np.random.random() * 1000000)}",
-                        "class": class_name,
-                        "confidence": round(confidence, 2),
-                        "bbox": {
-                            "x": int(x1),
-                            "y": int(y1),
-                            "width": int(x2 - x1),
-                            "height": int(y2 - y1)
-                        },
-                        "threat_level": threat_level,
-                        "timestamp": self._get_timestamp(),
-                        "frame_id": int(np.random.random() * 1000000)
-                    }
-                    
-                    detections.append(detection)
+                detections.extend(self._parse_result(result))
             
             return detections
             
@@ -143,6 +201,81 @@ class YOLO26Detector:
             logger.error(f"❌ YOLO26 detection failed: {e}")
             return []
     
+    def detect_batch(self, frames: List) -> List[List[Dict]]:
+        """
+        Perform object detection on several frames
+        Frames are sent through the model `batch_size` at a time
+        
+        Args:
+            frames: List of image frames (numpy arrays)
+            
+        Returns:
+            One list of detection dictionaries per input frame
+        """
+        if not self.model_loaded:
+            # Simulation mode
+            return [self._simulate_detections() for _ in frames]
+        
+        batched = []
+        for start in range(0, len(frames), self.batch_size):
+            chunk = frames[start:start + self.batch_size]
+            try:
+                # One forward pass per chunk
+                results = self._infer(chunk)
+                batched.extend(self._parse_result(result) for result in results)
+            except Exception as e:
+                logger.error(f"❌ YOLO26 batch detection failed: {e}")
+                batched.extend([] for _ in chunk)
+        
+        return batched
+    
+    def _parse_result(self, result) -> List[Dict]:
+        """
+        Convert one ultralytics Results object (or exported-backend
+        BackendResult) into detection dictionaries
+        Box tensors are moved to numpy once per frame, not once per box
+        """
+        if self.runtime is not None:
+            xyxy, confidences, class_ids = result.xyxy, result.conf, result.cls
+        else:
+            boxes = result.boxes
+            if boxes is None or len(boxes) == 0:
+                return []
+            xyxy = boxes.xyxy.cpu().numpy()
+            confidences = boxes.conf.cpu().numpy()
+            class_ids = boxes.cls.cpu().numpy().astype(int)
+        
+        if len(xyxy) == 0:
+            return []
+        timestamp = self._get_timestamp()
+        frame_id = int(np.random.random() * 1000000)
+        
+        detections = []
+        for i in range(len(xyxy)):
+            x1, y1, x2, y2 = xyxy[i]
+            confidence = float(confidences[i])
+            class_name = result.names[int(class_ids[i])]
+            
+            # Determine threat level
+            threat_level = self._classify_threat(class_name, confidence)
+            
+            detections.append({
+                "id": f"yolo26_{i}_{int(np.random.random() * 1000000)}",
+                "class": class_name,
+                "confidence": round(confidence, 2),
+                "bbox": {
+                    "x": int(x1),
+                    "y": int(y1),
+                    "width": int(x2 - x1),
+                    "height": int(y2 - y1)
+                },
+                "threat_level": threat_level,
+                "timestamp": timestamp,
+                "frame_id": frame_id
+            })
+        
+        return detections
+    
     def _classify_threat(self, class_name: str, confidence: float) -> str:
         """
         Classify threat level based on detected object
@@ -217,10 +350,16 @@ class YOLO26Detector:
     def get_model_info(self) -> Dict:
         """Get information about the loaded model"""
         return {
-            "name": "YOLO26-Nano" if self.model_loaded else "YOLO26-Simulation",
+            "name": ("YOLO26-Nano" + ("-INT8" if self.precision == "int8" else "")) if self.model_loaded else "YOLO26-Simulation",
             "version": "26.0",
             "device": self.device,
+            "backend": self.backend if self.runtime is not None else "torch",
+            "torch_free": self.torch_free,
+            "precision": self.precision,
+            "quantization_report": self.quantization_report,
+            "imgsz": self.imgsz,
             "confidence_threshold": self.confidence_threshold,
+            "batch_size": self.batch_size,
             "loaded": self.model_loaded,
             "features": [
                 "NMS-free detection",